@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Benchmarks: Estatísticas e Comparação com Baseline
+
+Este arquivo agrega as latências medidas durante a simulação,
+calcula percentis por endpoint e compara o resultado com uma
+baseline salva em JSON para apontar regressões.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import json
+import math
+from datetime import datetime
+
+def percentil(valores_ordenados, p):
+    """
+    Calcula um percentil por interpolação linear.
+    
+    Args:
+        valores_ordenados (list): Valores já ordenados
+        p (float): Percentil desejado (0 a 100)
+    
+    Returns:
+        float: Valor do percentil (0 se a lista estiver vazia)
+    """
+    if not valores_ordenados:
+        return 0.0
+    
+    posicao = (len(valores_ordenados) - 1) * p / 100
+    inferior = math.floor(posicao)
+    superior = math.ceil(posicao)
+    if inferior == superior:
+        return valores_ordenados[int(posicao)]
+    
+    peso = posicao - inferior
+    return valores_ordenados[inferior] * (1 - peso) + valores_ordenados[superior] * peso
+
+class RegistroLatencias:
+    """
+    Acumula as latências de cada endpoint durante uma execução.
+    
+    As chaves são nomes de endpoint já normalizados
+    (ex.: 'POST /api/barbeiros/{id}/proximo').
+    """
+
+    def __init__(self):
+        self.latencias = {}
+        self.erros = {}
+
+    def registrar(self, endpoint, segundos, sucesso=True):
+        """
+        Registra uma requisição concluída.
+        
+        Args:
+            endpoint (str): Nome normalizado do endpoint
+            segundos (float): Latência medida
+            sucesso (bool): Se a resposta teve status esperado
+        """
+        self.latencias.setdefault(endpoint, []).append(segundos)
+        if not sucesso:
+            self.erros[endpoint] = self.erros.get(endpoint, 0) + 1
+
+    def resumir(self, duracao_total):
+        """
+        Calcula o resumo da execução.
+        
+        Args:
+            duracao_total (float): Tempo de relógio da execução, em segundos
+        
+        Returns:
+            dict: Vazão total e percentis (em milissegundos) por endpoint
+        """
+        endpoints = {}
+        total_requisicoes = 0
+        
+        for endpoint, valores in sorted(self.latencias.items()):
+            ordenados = sorted(valores)
+            total_requisicoes += len(ordenados)
+            endpoints[endpoint] = {
+                'requisicoes': len(ordenados),
+                'erros': self.erros.get(endpoint, 0),
+                'vazao_rps': round(len(ordenados) / duracao_total, 2) if duracao_total else 0,
+                'media_ms': round(sum(ordenados) / len(ordenados) * 1000, 3),
+                'p50_ms': round(percentil(ordenados, 50) * 1000, 3),
+                'p95_ms': round(percentil(ordenados, 95) * 1000, 3),
+                'p99_ms': round(percentil(ordenados, 99) * 1000, 3),
+                'max_ms': round(ordenados[-1] * 1000, 3)
+            }
+        
+        return {
+            'duracao_segundos': round(duracao_total, 3),
+            'total_requisicoes': total_requisicoes,
+            'vazao_total_rps': round(total_requisicoes / duracao_total, 2) if duracao_total else 0,
+            'endpoints': endpoints
+        }
+
+def formatar_tabela(resumo):
+    """
+    Formata o resumo como uma tabela de texto para o terminal.
+    
+    Args:
+        resumo (dict): Resultado de RegistroLatencias.resumir
+    
+    Returns:
+        str: Tabela formatada
+    """
+    cabecalho = f"{'Endpoint':<42} {'Req':>7} {'Erros':>6} {'RPS':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}"
+    linhas = [cabecalho, '-' * len(cabecalho)]
+    
+    for endpoint, dados in resumo['endpoints'].items():
+        linhas.append(
+            f"{endpoint:<42} {dados['requisicoes']:>7} {dados['erros']:>6} "
+            f"{dados['vazao_rps']:>9.1f} {dados['p50_ms']:>9.2f} "
+            f"{dados['p95_ms']:>9.2f} {dados['p99_ms']:>9.2f}"
+        )
+    
+    linhas.append('-' * len(cabecalho))
+    linhas.append(
+        f"Total: {resumo['total_requisicoes']} requisições em "
+        f"{resumo['duracao_segundos']:.2f}s ({resumo['vazao_total_rps']:.1f} req/s)"
+    )
+    return '\n'.join(linhas)
+
+def salvar_baseline(caminho, resumo, parametros):
+    """
+    Salva o resumo da execução como baseline em JSON.
+    
+    Args:
+        caminho (str): Arquivo de destino
+        resumo (dict): Resultado de RegistroLatencias.resumir
+        parametros (dict): Parâmetros usados na simulação
+    """
+    with open(caminho, 'w', encoding='utf-8') as arquivo:
+        json.dump({
+            'gerado_em': datetime.now().isoformat(),
+            'parametros': parametros,
+            'resumo': resumo
+        }, arquivo, indent=2, ensure_ascii=False)
+
+def comparar_com_baseline(caminho, resumo, tolerancia=0.2, minimo_ms=1.0, minimo_amostras=20):
+    """
+    Compara o resumo atual com uma baseline salva.
+    
+    Um endpoint regrediu quando seu p95 ou p99 superou o da baseline
+    pela tolerância relativa e também por pelo menos `minimo_ms`
+    (evita falsos alarmes em latências muito pequenas). Endpoints com
+    poucas amostras em qualquer das execuções não são comparados.
+    
+    Args:
+        caminho (str): Arquivo da baseline
+        resumo (dict): Resultado atual
+        tolerancia (float): Aumento relativo aceito (0.2 = 20%)
+        minimo_ms (float): Aumento absoluto mínimo para considerar regressão
+        minimo_amostras (int): Requisições mínimas para comparar um endpoint
+    
+    Returns:
+        list: Regressões encontradas (dicionários por endpoint e métrica)
+    """
+    with open(caminho, encoding='utf-8') as arquivo:
+        baseline = json.load(arquivo)['resumo']
+    
+    regressoes = []
+    for endpoint, atual in resumo['endpoints'].items():
+        anterior = baseline['endpoints'].get(endpoint)
+        if not anterior or min(anterior['requisicoes'], atual['requisicoes']) < minimo_amostras:
+            continue
+        
+        for metrica in ('p95_ms', 'p99_ms'):
+            limite = anterior[metrica] * (1 + tolerancia)
+            if atual[metrica] > limite and atual[metrica] - anterior[metrica] >= minimo_ms:
+                regressoes.append({
+                    'endpoint': endpoint,
+                    'metrica': metrica,
+                    'baseline': anterior[metrica],
+                    'atual': atual[metrica],
+                    'variacao_percentual': round(
+                        (atual[metrica] / anterior[metrica] - 1) * 100, 1
+                    ) if anterior[metrica] else None
+                })
+    
+    vazao_base = baseline.get('vazao_total_rps') or 0
+    if vazao_base and resumo['vazao_total_rps'] < vazao_base / (1 + tolerancia):
+        regressoes.append({
+            'endpoint': '(total)',
+            'metrica': 'vazao_total_rps',
+            'baseline': vazao_base,
+            'atual': resumo['vazao_total_rps'],
+            'variacao_percentual': round((resumo['vazao_total_rps'] / vazao_base - 1) * 100, 1)
+        })
+    
+    return regressoes
@@ -0,0 +1,375 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Benchmarks: Simulação de um Dia de Barbearia
+
+Este arquivo gera carga realista contra a API simulando um dia
+de funcionamento da barbearia:
+
+- clientes chegando segundo um processo de Poisson (POST /api/clientes);
+- barbeiros chamando o próximo cliente e concluindo atendimentos
+  com tempos de serviço log-normais;
+- N telas de TV consultando /api/fila no intervalo de atualização;
+- a recepção consultando /api/status;
+- exportações de CSV ocasionais.
+
+A simulação avança em tempo simulado (sem esperas), então um dia inteiro
+roda em segundos. Por padrão usa o Flask test client com um banco
+temporário; com --url executa via HTTP contra um servidor (ex.: gunicorn).
+
+Uso:
+    python -m benchmarks.simulacao --clientes-hora 40 --telas 4
+    python -m benchmarks.simulacao --salvar-baseline baseline.json
+    python -m benchmarks.simulacao --comparar baseline.json
+    python -m benchmarks.simulacao --url http://localhost:5000 --trabalhadores 8
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import argparse
+import heapq
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+if __package__ in (None, ''):
+    sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.estatisticas import (
+    RegistroLatencias, formatar_tabela, salvar_baseline, comparar_com_baseline
+)
+
+class TransporteFlask:
+    """Executa as requisições pelo Flask test client, no mesmo processo."""
+
+    def __init__(self, app):
+        self.cliente = app.test_client()
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        """
+        Args:
+            metodo (str): Método HTTP
+            caminho (str): Caminho da URL
+            corpo (dict): Corpo JSON opcional
+        
+        Returns:
+            tuple: (status HTTP, JSON da resposta ou None)
+        """
+        resposta = self.cliente.open(caminho, method=metodo, json=corpo)
+        dados = resposta.get_json(silent=True) if resposta.is_json else None
+        return resposta.status_code, dados
+
+class TransporteHTTP:
+    """Executa as requisições via HTTP contra um servidor em execução."""
+
+    def __init__(self, url_base, timeout=30):
+        self.url_base = url_base.rstrip('/')
+        self.timeout = timeout
+
+    def requisitar(self, metodo, caminho, corpo=None):
+        """
+        Args:
+            metodo (str): Método HTTP
+            caminho (str): Caminho da URL
+            corpo (dict): Corpo JSON opcional
+        
+        Returns:
+            tuple: (status HTTP, JSON da resposta ou None)
+        """
+        dados = json.dumps(corpo).encode('utf-8') if corpo is not None else None
+        requisicao = urllib.request.Request(
+            self.url_base + caminho, data=dados, method=metodo,
+            headers={'Content-Type': 'application/json'} if dados else {}
+        )
+        try:
+            with urllib.request.urlopen(requisicao, timeout=self.timeout) as resposta:
+                conteudo = resposta.read()
+                status = resposta.status
+                tipo = resposta.headers.get('Content-Type', '')
+        except urllib.error.HTTPError as erro:
+            conteudo = erro.read()
+            status = erro.code
+            tipo = erro.headers.get('Content-Type', '')
+        
+        if 'application/json' in tipo:
+            return status, json.loads(conteudo or b'null')
+        return status, None
+
+def criar_app_temporaria(ambiente):
+    """
+    Cria a aplicação apontando para um banco SQLite temporário.
+    
+    As variáveis de ambiente precisam ser definidas antes de importar
+    src.main, que cria a aplicação na importação.
+    
+    Args:
+        ambiente (str): Valor de FLASK_ENV (ex.: production)
+    
+    Returns:
+        tuple: (app Flask, caminho do banco temporário)
+    """
+    diretorio = tempfile.mkdtemp(prefix='bench_fila_')
+    caminho_db = os.path.join(diretorio, 'bench.db')
+    os.environ['FLASK_ENV'] = ambiente
+    os.environ['DATABASE_URL'] = f'sqlite:///{caminho_db}'
+    
+    from src.main import app
+    return app, caminho_db
+
+class SimulacaoDia:
+    """
+    Simulação de eventos discretos de um dia de barbearia.
+    
+    Os eventos são processados na ordem do tempo simulado. As operações
+    de escrita (chegadas, chamadas e conclusões) rodam em sequência,
+    preservando a ordem causal; as leituras (telas, status e CSV)
+    podem ser despachadas em paralelo quando há trabalhadores.
+    """
+
+    def __init__(self, transporte, parametros, registro, executor=None):
+        self.transporte = transporte
+        self.p = parametros
+        self.registro = registro
+        self.executor = executor
+        self.aleatorio = random.Random(parametros['semente'])
+        self.eventos = []
+        self.sequencia = 0
+        self.proxima_ficha = parametros['ficha_inicial']
+        self.barbeiros = []
+        self.pendentes = []
+
+    def agendar(self, instante, tipo, dados=None):
+        """Insere um evento na agenda de tempo simulado."""
+        self.sequencia += 1
+        heapq.heappush(self.eventos, (instante, self.sequencia, tipo, dados))
+
+    def medir(self, endpoint, metodo, caminho, corpo=None, esperado=(200, 201)):
+        """
+        Executa uma requisição registrando sua latência.
+        
+        Returns:
+            tuple: (status HTTP, JSON da resposta ou None)
+        """
+        inicio = time.perf_counter()
+        try:
+            status, dados = self.transporte.requisitar(metodo, caminho, corpo)
+        except Exception:
+            self.registro.registrar(endpoint, time.perf_counter() - inicio, sucesso=False)
+            return None, None
+        self.registro.registrar(endpoint, time.perf_counter() - inicio, sucesso=status in esperado)
+        return status, dados
+
+    def leitura(self, endpoint, caminho):
+        """Executa uma leitura, em paralelo se houver trabalhadores."""
+        if self.executor is not None:
+            self.pendentes.append(self.executor.submit(self.medir, endpoint, 'GET', caminho))
+        else:
+            self.medir(endpoint, 'GET', caminho)
+
+    def preparar(self):
+        """Carrega ou cria os barbeiros e agenda os eventos iniciais."""
+        for i in range(self.p['barbeiros_extras']):
+            self.medir('POST /api/barbeiros', 'POST', '/api/barbeiros',
+                       {'nome': f"Barbeiro Benchmark {self.p['semente']}-{i + 1}"},
+                       esperado=(201, 409))
+        
+        _, dados = self.medir('GET /api/barbeiros', 'GET', '/api/barbeiros')
+        self.barbeiros = [b['id'] for b in (dados or {}).get('barbeiros', []) if b['ativo']]
+        if not self.barbeiros:
+            raise RuntimeError('Nenhum barbeiro ativo disponível para a simulação')
+        
+        duracao = self.p['horas'] * 3600
+        taxa = self.p['clientes_hora'] / 3600
+        
+        # Chegadas de clientes: intervalos exponenciais (processo de Poisson)
+        instante = self.aleatorio.expovariate(taxa)
+        while instante < duracao:
+            self.agendar(instante, 'chegada')
+            instante += self.aleatorio.expovariate(taxa)
+        
+        # Cada barbeiro começa livre, chamando o próximo cliente
+        for barbeiro_id in self.barbeiros:
+            self.agendar(self.aleatorio.uniform(0, 60), 'proximo', barbeiro_id)
+        
+        # Telas da TV e recepção com atualização periódica
+        intervalo = self.p['intervalo_atualizacao']
+        for tela in range(self.p['telas']):
+            self.agendar(self.aleatorio.uniform(0, intervalo), 'tela', tela)
+        self.agendar(self.aleatorio.uniform(0, intervalo), 'status')
+        
+        if self.p['intervalo_csv']:
+            self.agendar(self.p['intervalo_csv'] * 60, 'csv')
+
+    def tempo_servico(self):
+        """
+        Sorteia um tempo de atendimento log-normal em segundos.
+        
+        Returns:
+            float: Duração do atendimento
+        """
+        media = self.p['tempo_medio_servico'] * 60
+        sigma = 0.35
+        mu = math.log(media) - sigma ** 2 / 2
+        return self.aleatorio.lognormvariate(mu, sigma)
+
+    def executar(self):
+        """Processa todos os eventos até o fim do dia simulado."""
+        duracao = self.p['horas'] * 3600
+        intervalo = self.p['intervalo_atualizacao']
+        
+        while self.eventos:
+            instante, _, tipo, dados = heapq.heappop(self.eventos)
+            
+            if tipo == 'chegada':
+                ficha = self.proxima_ficha
+                self.proxima_ficha += 1
+                self.medir('POST /api/clientes', 'POST', '/api/clientes', {
+                    'nome': f'Cliente {ficha}',
+                    'numero_ficha': ficha,
+                    'barbeiro_id': self.aleatorio.choice(self.barbeiros)
+                })
+            
+            elif tipo == 'proximo':
+                _, resposta = self.medir('POST /api/barbeiros/{id}/proximo', 'POST',
+                                         f'/api/barbeiros/{dados}/proximo')
+                chamado = (resposta or {}).get('cliente_chamado')
+                if chamado:
+                    self.agendar(instante + self.tempo_servico(), 'concluir',
+                                 (dados, chamado['id']))
+                elif instante < duracao:
+                    # Fila vazia: o barbeiro tenta de novo em um minuto
+                    self.agendar(instante + 60, 'proximo', dados)
+            
+            elif tipo == 'concluir':
+                barbeiro_id, cliente_id = dados
+                self.medir('PUT /api/clientes/{id}/concluir', 'PUT',
+                           f'/api/clientes/{cliente_id}/concluir')
+                self.agendar(instante + self.aleatorio.uniform(30, 120), 'proximo', barbeiro_id)
+            
+            elif tipo == 'tela':
+                self.leitura('GET /api/fila', '/api/fila')
+                if instante + intervalo < duracao:
+                    self.agendar(instante + intervalo, 'tela', dados)
+            
+            elif tipo == 'status':
+                self.leitura('GET /api/status', '/api/status')
+                if instante + intervalo < duracao:
+                    self.agendar(instante + intervalo, 'status')
+            
+            elif tipo == 'csv':
+                self.leitura('GET /api/relatorios/exportar-csv', '/api/relatorios/exportar-csv')
+                proximo = instante + self.p['intervalo_csv'] * 60
+                if proximo < duracao:
+                    self.agendar(proximo, 'csv')
+        
+        for futuro in self.pendentes:
+            futuro.result()
+
+def criar_parser():
+    """
+    Returns:
+        ArgumentParser: Parser dos argumentos de linha de comando
+    """
+    parser = argparse.ArgumentParser(
+        description='Simula um dia de barbearia contra a API e mede a latência por endpoint.'
+    )
+    parser.add_argument('--url', help='URL base de um servidor em execução (padrão: Flask test client)')
+    parser.add_argument('--ambiente', default='production',
+                        help='FLASK_ENV da aplicação local (padrão: production)')
+    parser.add_argument('--horas', type=float, default=10, help='Duração do dia simulado em horas')
+    parser.add_argument('--clientes-hora', type=float, default=30, help='Taxa média de chegadas por hora')
+    parser.add_argument('--barbeiros-extras', type=int, default=0,
+                        help='Barbeiros criados além dos já existentes')
+    parser.add_argument('--tempo-medio-servico', type=float, default=30,
+                        help='Tempo médio de atendimento em minutos')
+    parser.add_argument('--telas', type=int, default=2, help='Quantidade de telas de TV consultando a fila')
+    parser.add_argument('--intervalo-atualizacao', type=float, default=5,
+                        help='Intervalo de atualização das telas em segundos')
+    parser.add_argument('--intervalo-csv', type=float, default=120,
+                        help='Minutos entre exportações de CSV (0 desativa)')
+    parser.add_argument('--ficha-inicial', type=int, default=None,
+                        help='Primeiro número de ficha usado (padrão: 1 local, aleatório via HTTP)')
+    parser.add_argument('--trabalhadores', type=int, default=0,
+                        help='Threads para leituras concorrentes (apenas com --url)')
+    parser.add_argument('--semente', type=int, default=42, help='Semente do gerador aleatório')
+    parser.add_argument('--salvar-baseline', metavar='ARQUIVO', help='Salva o resultado como baseline JSON')
+    parser.add_argument('--comparar', metavar='ARQUIVO', help='Compara com uma baseline JSON salva')
+    parser.add_argument('--tolerancia', type=float, default=0.2,
+                        help='Aumento relativo aceito antes de apontar regressão (padrão: 0.2)')
+    parser.add_argument('--json', action='store_true', help='Imprime o resumo em JSON')
+    return parser
+
+def main(argv=None):
+    """
+    Ponto de entrada da linha de comando.
+    
+    Returns:
+        int: Código de saída (1 quando há regressões)
+    """
+    args = criar_parser().parse_args(argv)
+    
+    if args.url:
+        transporte = TransporteHTTP(args.url)
+        ficha_inicial = args.ficha_inicial or random.randint(10 ** 6, 10 ** 8)
+    else:
+        app, caminho_db = criar_app_temporaria(args.ambiente)
+        transporte = TransporteFlask(app)
+        ficha_inicial = args.ficha_inicial or 1
+        print(f'Banco temporário: {caminho_db}')
+    
+    parametros = {
+        'modo': 'http' if args.url else 'flask',
+        'horas': args.horas,
+        'clientes_hora': args.clientes_hora,
+        'barbeiros_extras': args.barbeiros_extras,
+        'tempo_medio_servico': args.tempo_medio_servico,
+        'telas': args.telas,
+        'intervalo_atualizacao': args.intervalo_atualizacao,
+        'intervalo_csv': args.intervalo_csv,
+        'ficha_inicial': ficha_inicial,
+        'semente': args.semente
+    }
+    
+    registro = RegistroLatencias()
+    executor = ThreadPoolExecutor(args.trabalhadores) if args.url and args.trabalhadores else None
+    
+    simulacao = SimulacaoDia(transporte, parametros, registro, executor)
+    simulacao.preparar()
+    
+    inicio = time.perf_counter()
+    simulacao.executar()
+    duracao = time.perf_counter() - inicio
+    
+    if executor is not None:
+        executor.shutdown()
+    
+    resumo = registro.resumir(duracao)
+    print(json.dumps(resumo, indent=2, ensure_ascii=False) if args.json else formatar_tabela(resumo))
+    
+    if args.salvar_baseline:
+        salvar_baseline(args.salvar_baseline, resumo, parametros)
+        print(f'\nBaseline salva em {args.salvar_baseline}')
+    
+    if args.comparar:
+        regressoes = comparar_com_baseline(args.comparar, resumo, args.tolerancia)
+        if regressoes:
+            print(f'\n⚠️  {len(regressoes)} regressão(ões) em relação a {args.comparar}:')
+            for r in regressoes:
+                variacao = r['variacao_percentual']
+                print(f"   • {r['endpoint']} {r['metrica']}: {r['baseline']} → {r['atual']}"
+                      + (f" ({variacao:+}%)" if variacao is not None else ''))
+            return 1
+        print(f'\n✓ Nenhuma regressão em relação a {args.comparar}')
+    
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Comandos de Linha de Comando
+
+Este arquivo registra os comandos administrativos da aplicação,
+executados pelo Flask CLI:
+
+    flask --app src.main gerar-historico --barbeiros 50 --atendimentos 5000000 --anos 3
+    flask --app src.main criar-loja loja1
+    flask --app src.main arquivar-clientes
+    flask --app src.main reparar-contadores
+    flask --app src.main preencher-periodos
+    flask --app src.main importar-atendimentos historico.csv
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import sys
+import time
+from contextlib import nullcontext
+from datetime import date, timedelta
+
+import click
+from src.models.user import db
+from src.models.barbeiro import Barbeiro
+
+def configurar_comandos(app):
+    """
+    Registra os comandos de linha de comando na aplicação.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+    """
+
+    @app.cli.command('gerar-historico')
+    @click.option('--barbeiros', default=10, show_default=True,
+                  help='Quantidade de barbeiros que recebem atendimentos (cria os que faltarem).')
+    @click.option('--atendimentos', default=100000, show_default=True,
+                  help='Quantidade aproximada de atendimentos a gerar.')
+    @click.option('--anos', default=1.0, show_default=True,
+                  help='Período coberto, em anos, terminando ontem.')
+    @click.option('--ficha-inicial', default=10_000_000, show_default=True,
+                  help='Primeiro número de ficha usado pelos clientes gerados.')
+    @click.option('--taxa-cancelamento', default=0.03, show_default=True,
+                  help='Fração de clientes que desistem antes do atendimento.')
+    @click.option('--lote', default=10000, show_default=True,
+                  help='Linhas por executemany.')
+    @click.option('--transacao', default=200000, show_default=True,
+                  help='Linhas gravadas por transação.')
+    @click.option('--semente', default=None, type=int, help='Semente do gerador aleatório.')
+    @click.option('--loja', default=None, help='Loja de destino (modo multi-loja).')
+    def gerar_historico(barbeiros, atendimentos, anos, ficha_inicial, taxa_cancelamento,
+                        lote, transacao, semente, loja):
+        """Gera histórico sintético de clientes e atendimentos para testes de carga."""
+        with usar_loja(app, loja):
+            _gerar_historico(barbeiros, atendimentos, anos, ficha_inicial, taxa_cancelamento,
+                             lote, transacao, semente)
+
+    @app.cli.command('criar-loja')
+    @click.argument('slug')
+    def criar_loja(slug):
+        """Cria o banco de uma loja (modo multi-loja)."""
+        from src.services.lojas import gerenciador_lojas, LojaNaoEncontrada
+        
+        if not app.config.get('MULTI_TENANT_ENABLED'):
+            raise click.ClickException('Modo multi-loja desativado (MULTI_TENANT_ENABLED)')
+        
+        try:
+            loja = gerenciador_lojas.obter(slug, criar=True)
+        except LojaNaoEncontrada as e:
+            raise click.ClickException(str(e))
+        
+        click.echo(f'✓ Loja {loja.slug} pronta em {loja.caminho}')
+
+    @app.cli.command('arquivar-clientes')
+    @click.option('--lote', default=5000, show_default=True,
+                  help='Clientes movidos por transação.')
+    @click.option('--loja', default=None, help='Loja de destino (modo multi-loja).')
+    def arquivar_clientes(lote, loja):
+        """Move para o arquivo os clientes concluídos e cancelados que ficaram na fila."""
+        from src.services.fila import arquivar_clientes_encerrados
+        
+        inicio = time.perf_counter()
+        with usar_loja(app, loja):
+            total = arquivar_clientes_encerrados(
+                lote=lote,
+                ao_confirmar=lambda movidos: click.echo(f'  {movidos:>12,} clientes arquivados')
+            )
+        
+        click.echo(f'✓ {total:,} clientes arquivados em {time.perf_counter() - inicio:.1f}s')
+
+    @app.cli.command('reparar-contadores')
+    @click.option('--loja', default=None, help='Loja de destino (modo multi-loja).')
+    def reparar_contadores(loja):
+        """Recalcula os contadores da fila de cada barbeiro a partir dos clientes."""
+        from src.services.fila import recalcular_contadores_barbeiros
+        
+        with usar_loja(app, loja):
+            corrigidos = recalcular_contadores_barbeiros()
+            db.session.commit()
+        
+        if corrigidos:
+            click.echo(f'✓ Contadores de {corrigidos} barbeiro(s) corrigidos')
+        else:
+            click.echo('✓ Contadores de todos os barbeiros já estavam corretos')
+
+    @app.cli.command('preencher-periodos')
+    @click.option('--lote', default=50000, show_default=True,
+                  help='IDs de atendimentos atualizados por transação.')
+    @click.option('--recalcular', is_flag=True,
+                  help='Recalcula também os atendimentos já preenchidos (ex.: após alterar SHOP_TIMEZONE).')
+    @click.option('--loja', default=None, help='Loja de destino (modo multi-loja).')
+    def preencher_periodos(lote, recalcular, loja):
+        """Preenche dia, dia da semana e hora do histórico e cria seus índices."""
+        from src.models.migracoes import criar_indices_atendimentos, preencher_periodo_atendimentos
+        
+        inicio = time.perf_counter()
+        with usar_loja(app, loja):
+            total = preencher_periodo_atendimentos(
+                db.engine,
+                tamanho_bloco=lote,
+                recalcular=recalcular,
+                ao_confirmar=lambda preenchidos: click.echo(f'  {preenchidos:>12,} atendimentos preenchidos')
+            )
+            click.echo('  Criando índices do histórico...')
+            criar_indices_atendimentos(db.engine)
+        
+        click.echo(f'✓ {total:,} atendimentos preenchidos em {time.perf_counter() - inicio:.1f}s')
+
+    @app.cli.command('importar-atendimentos')
+    @click.argument('caminho', type=click.Path(exists=True, dir_okay=False, allow_dash=True))
+    @click.option('--formato', type=click.Choice(['csv', 'ndjson']), default=None,
+                  help='Formato do arquivo (padrão: pela extensão; csv para a entrada padrão).')
+    @click.option('--criar-barbeiros/--sem-criar-barbeiros', default=True, show_default=True,
+                  help='Cria (inativos) os barbeiros que não existem.')
+    @click.option('--lote', default=10000, show_default=True,
+                  help='Linhas por executemany.')
+    @click.option('--transacao', default=200000, show_default=True,
+                  help='Linhas gravadas entre commits.')
+    @click.option('--loja', default=None, help='Loja de destino (modo multi-loja).')
+    def importar_atendimentos(caminho, formato, criar_barbeiros, lote, transacao, loja):
+        """Importa atendimentos históricos de um CSV (layout da exportação) ou NDJSON ('-' lê a entrada padrão)."""
+        if formato is None:
+            formato = 'ndjson' if caminho.endswith(('.ndjson', '.jsonl')) else 'csv'
+        
+        arquivo = nullcontext(sys.stdin) if caminho == '-' else open(caminho, encoding='utf-8-sig', newline='')
+        with arquivo as arquivo, usar_loja(app, loja):
+            _importar_atendimentos(arquivo, caminho, formato, criar_barbeiros, lote, transacao)
+
+def usar_loja(app, slug):
+    """
+    Direciona os comandos para o banco de uma loja.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+        slug (str): Identificador da loja (None para o banco principal)
+    
+    Returns:
+        Gerenciador de contexto que aplica a loja
+    """
+    if slug is None:
+        return nullcontext()
+    
+    from src.services.lojas import gerenciador_lojas, LojaNaoEncontrada
+    
+    if not app.config.get('MULTI_TENANT_ENABLED'):
+        raise click.ClickException('Modo multi-loja desativado (MULTI_TENANT_ENABLED)')
+    
+    try:
+        return gerenciador_lojas.usar(gerenciador_lojas.obter(slug))
+    except LojaNaoEncontrada as e:
+        raise click.ClickException(str(e))
+
+def _gerar_historico(barbeiros, atendimentos, anos, ficha_inicial, taxa_cancelamento,
+                     lote, transacao, semente):
+    """Executa o comando gerar-historico no banco atual."""
+    from src.services.historico import InseridorHistorico
+    from src.services.gerador_historico import GeradorHistorico
+    
+    barbeiro_ids = garantir_barbeiros(barbeiros)
+    dias = max(1, int(anos * 365))
+    data_inicial = date.today() - timedelta(days=dias)
+    
+    click.echo(f'Gerando ~{atendimentos:,} atendimentos para {len(barbeiro_ids)} barbeiros '
+               f'de {data_inicial:%d/%m/%Y} a {date.today() - timedelta(days=1):%d/%m/%Y}...')
+
+    def progresso(inseridor):
+        click.echo(f'  {inseridor.total_atendimentos:>12,} atendimentos  '
+                   f'{inseridor.total_clientes:>12,} clientes  '
+                   f'({inseridor.linhas_por_segundo():,.0f} linhas/s)')
+    
+    inicio = time.perf_counter()
+    with db.engine.connect() as conexao:
+        inseridor = InseridorHistorico(conexao, tamanho_lote=lote,
+                                       linhas_por_transacao=transacao,
+                                       ao_confirmar=progresso)
+        GeradorHistorico(inseridor, barbeiro_ids, atendimentos, data_inicial, dias,
+                         ficha_inicial=ficha_inicial,
+                         taxa_cancelamento=taxa_cancelamento,
+                         semente=semente).gerar()
+    
+    click.echo(f'✓ {inseridor.total_atendimentos:,} atendimentos e '
+               f'{inseridor.total_clientes:,} clientes gerados em '
+               f'{time.perf_counter() - inicio:.1f}s')
+
+def _importar_atendimentos(arquivo, caminho, formato, criar_barbeiros, lote, transacao):
+    """Executa o comando importar-atendimentos no banco atual."""
+    from src.services.historico import InseridorHistorico
+    from src.services.importacao import ErroImportacao, ImportadorAtendimentos
+    
+    click.echo(f'Importando atendimentos de {caminho} ({formato})...')
+
+    def progresso(inseridor):
+        click.echo(f'  {inseridor.total_atendimentos:>12,} atendimentos  '
+                   f'({inseridor.linhas_por_segundo():,.0f} linhas/s)')
+    
+    inicio = time.perf_counter()
+    with db.engine.connect() as conexao:
+        inseridor = InseridorHistorico(conexao, tamanho_lote=lote,
+                                       linhas_por_transacao=transacao,
+                                       ao_confirmar=progresso)
+        importador = ImportadorAtendimentos(inseridor, criar_barbeiros=criar_barbeiros)
+        try:
+            importador.importar(arquivo, formato)
+        except ErroImportacao as e:
+            if importador.confirmadas:
+                raise click.ClickException(f'{e} ({importador.confirmadas:,} atendimentos já gravados)')
+            raise click.ClickException(str(e))
+    
+    for nome in importador.barbeiros_criados:
+        click.echo(f'  Barbeiro criado (inativo): {nome}')
+    for erro in importador.erros:
+        click.echo(f'  Linha {erro["linha"]}: {erro["erro"]}')
+    
+    click.echo(f'✓ {importador.importadas:,} atendimentos importados e '
+               f'{importador.rejeitadas:,} linhas rejeitadas em '
+               f'{time.perf_counter() - inicio:.1f}s')
+
+def garantir_barbeiros(quantidade):
+    """
+    Garante que existam pelo menos `quantidade` barbeiros cadastrados.
+    
+    Args:
+        quantidade (int): Quantidade desejada
+    
+    Returns:
+        list: IDs dos primeiros `quantidade` barbeiros
+    """
+    existentes = [b.id for b in Barbeiro.query.order_by(Barbeiro.id).limit(quantidade)]
+    nomes = {nome for (nome,) in db.session.query(Barbeiro.nome)}
+    
+    numero = 1
+    novos = []
+    while len(existentes) + len(novos) < quantidade:
+        nome = f'Barbeiro {numero:03d}'
+        numero += 1
+        if nome not in nomes:
+            novos.append(Barbeiro(nome=nome))
+    
+    if novos:
+        db.session.add_all(novos)
+        db.session.commit()
+    
+    return existentes + [b.id for b in novos]
@@ -35,6 +35,18 @@ class Config:
         'pool_pre_ping': True
     }
     
+    # Modo multi-loja: um banco SQLite por barbearia, escolhido pela requisição
+    MULTI_TENANT_ENABLED = os.environ.get('MULTI_TENANT_ENABLED', 'False').lower() == 'true'
+    TENANT_RESOLUTION = os.environ.get('TENANT_RESOLUTION', 'caminho')  # 'caminho' ou 'host'
+    TENANT_PATH_PREFIX = '/lojas'             # /lojas/<loja>/api/...
+    TENANT_HOST_SUFFIX = os.environ.get('TENANT_HOST_SUFFIX')  # ex.: '.fila.exemplo.com'
+    TENANT_DATABASE_DIR = os.environ.get('TENANT_DATABASE_DIR') or \
+        os.path.join(os.path.dirname(__file__), 'database', 'lojas')
+    TENANT_MAX_ENGINES = 64      # Bancos de lojas mantidos abertos (cache LRU)
+    TENANT_POOL_SIZE = 2         # Conexões mantidas por loja
+    TENANT_POOL_OVERFLOW = 2     # Conexões extras por loja em picos
+    TENANT_AUTO_CREATE = False   # Cria o banco de uma loja desconhecida na primeira requisição
+    
     # Configurações da aplicação
     DEBUG = os.environ.get('FLASK_DEBUG', 'False').lower() == 'true'
     TESTING = False
@@ -47,13 +59,90 @@ class Config:
     
     # Configurações de atualização em tempo real
     REFRESH_INTERVAL = 5  # Intervalo de atualização da fila em segundos
+    STATUS_RECONCILE_INTERVAL = 60  # Segundos entre reconciliações dos contadores de /api/status
+    
+    # Barramento de eventos entre workers (sockets Unix, sem broker externo)
+    EVENT_BUS_ENABLED = os.environ.get('EVENT_BUS_ENABLED', 'True').lower() == 'true'
+    EVENT_BUS_DIR = os.environ.get('EVENT_BUS_DIR')  # Padrão: diretório temporário por banco
+    EVENT_BUS_RECONCILE_DELAY = 0.05  # Agrupa eventos próximos antes de reconciliar os contadores
+    
+    # Instantâneo de /api/fila em memória compartilhada entre os workers
+    SNAPSHOT_ENABLED = os.environ.get('SNAPSHOT_ENABLED', 'True').lower() == 'true'
+    SNAPSHOT_SHM_SIZE = 1024 * 1024  # Bytes por segmento (um por banco/loja)
+    SNAPSHOT_MAX_AGE = 60  # Segundos até reconstruir (alterações feitas fora da aplicação)
+    
+    # Escalonador "qualquer barbeiro" (clientes sem preferência)
+    SCHEDULER_DEFAULT_SERVICE_MINUTES = 30  # Tempo de atendimento assumido sem histórico
+    SCHEDULER_HISTORY_DAYS = 30             # Dias de atendimentos usados no tempo médio
+    SCHEDULER_AVERAGE_TTL = 300             # Segundos até recalcular os tempos médios
+    
+    # Agendamentos (horários marcados)
+    APPOINTMENT_DEFAULT_MINUTES = 30  # Duração reservada quando não informada
+    APPOINTMENT_EARLY_MINUTES = 10    # Antes disso, o agendado só é chamado se a fila estiver vazia
+    
+    # Comandos em lote (POST /api/comandos)
+    COMMAND_KEY_RETENTION_HOURS = 48  # Horas em que uma chave de idempotência é lembrada
+    
+    # Importação de histórico (POST /api/atendimentos/importar)
+    IMPORT_BATCH_SIZE = 10000               # Linhas por executemany
+    IMPORT_ROWS_PER_TRANSACTION = 200000    # Linhas gravadas entre commits
+    
+    # Relatórios sobre o histórico: as datas são gravadas em UTC; dias e
+    # horários dos relatórios são os do fuso da barbearia (nome IANA)
+    SHOP_TIMEZONE = os.environ.get('SHOP_TIMEZONE', 'America/Sao_Paulo')
+    BUSINESS_OPENING_HOUR = 9          # Hora local de abertura usada na utilização dos barbeiros
+    BUSINESS_CLOSING_HOUR = 20         # Hora de fechamento
+    REPORT_CACHE_MAX_ENTRIES = 20000   # Resultados de dias encerrados mantidos em memória
+    
+    # Busca de clientes por nome (GET /api/busca)
+    SEARCH_RANK_LIMIT = 5000  # Acima disso os resultados vêm por recência, sem calcular relevância
+    
+    # Sonda de prontidão (/readyz)
+    READINESS_CACHE_SECONDS = 5    # Resultado reaproveitado por este tempo
+    READINESS_TIMEOUT_SECONDS = 2  # Tempo limite da verificação do banco
     
     # Configurações de proteção
     PROTECT_SOURCE = True  # Ativa proteção do código fonte
     
     # Configurações de logs
-    LOG_LEVEL = 'INFO'
-    LOG_FILE = 'sistema_fila.log'
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+    LOG_FILE = os.environ.get('LOG_FILE') or None  # Caminho absoluto do arquivo; sem valor, apenas stderr
+    # Rotação feita pela própria aplicação (RotatingFileHandler): apenas com
+    # um único processo gravando o arquivo. Com vários workers (gunicorn -w 4)
+    # o arquivo é reaberto quando o logrotate o move (WatchedFileHandler)
+    LOG_ROTATE_BY_SIZE = os.environ.get('LOG_ROTATE_BY_SIZE', 'False').lower() == 'true'
+    LOG_MAX_BYTES = 10 * 1024 * 1024  # Tamanho máximo do arquivo antes da rotação (LOG_ROTATE_BY_SIZE)
+    LOG_BACKUP_COUNT = 5              # Arquivos antigos mantidos na rotação (LOG_ROTATE_BY_SIZE)
+    LOG_QUEUE_SIZE = 10000            # Registros pendentes antes de começar a descartar
+    ACCESS_LOG_SAMPLE_RATE = 0.05     # Fração das requisições registradas no log de acesso
+    
+    # Registro de consultas lentas (com captura do plano de execução)
+    SLOW_QUERY_LOG_ENABLED = True
+    SLOW_QUERY_THRESHOLD_MS = 100  # Consultas acima deste tempo são registradas
+    SLOW_QUERY_MAX_ENTRIES = 200   # Entradas mantidas em memória para /api/debug/slow-queries
+    # /api/debug/slow-queries expõe SQL e planos (o esquema do banco): só
+    # responde a quem enviar o header X-Debug-Secret com este segredo
+    SLOW_QUERY_SECRET = os.environ.get('SLOW_QUERY_SECRET', '')
+    SLOW_QUERY_HEADER = 'X-Debug-Secret'
+    
+    # Configurações de métricas de desempenho
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'True').lower() == 'true'
+    METRICS_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+    SERVER_TIMING_ENABLED = True  # Adiciona o cabeçalho Server-Timing nas respostas
+    
+    # Guarda de orçamento de consultas (detecção de N+1)
+    QUERY_BUDGET_ENABLED = False
+    QUERY_BUDGET_DEFAULT = 20  # Máximo de consultas quando a rota não declara orçamento
+    QUERY_REPEAT_LIMIT = 5     # Repetições da mesma consulta que indicam N+1
+    QUERY_BUDGET_RAISE = False  # True: falha a requisição; False: apenas registra aviso
+    
+    # Perfilador sob demanda: perfila a requisição que enviar o header
+    # X-Profile com o segredo (sem o segredo o perfilador não é ativado)
+    PROFILING_ENABLED = os.environ.get('PROFILING_ENABLED', 'False').lower() == 'true'
+    PROFILING_SECRET = os.environ.get('PROFILING_SECRET', '')
+    PROFILING_HEADER = 'X-Profile'
+    PROFILING_TOP_N = 30          # Funções mais custosas guardadas em cada perfil
+    PROFILING_MAX_PROFILES = 50   # Perfis mantidos em memória
     
     # Configurações de backup
     BACKUP_ENABLED = True
@@ -72,7 +161,14 @@ class Config:
 class DevelopmentConfig(Config):
     """Configurações para ambiente de desenvolvimento"""
     DEBUG = True
-    SQLALCHEMY_ECHO = True  # Mostra queries SQL no console
+    # Mostra todas as queries SQL no console (SQLALCHEMY_ECHO=true); para achar
+    # consultas problemáticas prefira o registro de consultas lentas
+    SQLALCHEMY_ECHO = os.environ.get('SQLALCHEMY_ECHO', 'False').lower() == 'true'
+    SLOW_QUERY_THRESHOLD_MS = 20
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'DEBUG')
+    ACCESS_LOG_SAMPLE_RATE = 1.0  # Registra todas as requisições
+    QUERY_BUDGET_ENABLED = True  # Avisa sobre rotas acima do orçamento de consultas
+    TENANT_AUTO_CREATE = True
 
 class ProductionConfig(Config):
     """Configurações para ambiente de produção"""
@@ -88,7 +184,15 @@ class TestingConfig(Config):
     """Configurações para ambiente de testes"""
     TESTING = True
     SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SQLALCHEMY_ENGINE_OPTIONS = {}  # Banco em memória usa StaticPool, sem opções de pool
     WTF_CSRF_ENABLED = False
+    QUERY_BUDGET_ENABLED = True
+    QUERY_BUDGET_RAISE = True  # Testes falham ao exceder o orçamento de consultas
+    STATUS_RECONCILE_INTERVAL = 0  # Sem reconciliação em segundo plano nos testes
+    LOG_FILE = None  # Testes não gravam arquivo de log
+    EVENT_BUS_ENABLED = False
+    SNAPSHOT_ENABLED = False  # Testes não criam segmentos em /dev/shm
+    ACCESS_LOG_SAMPLE_RATE = 0
 
 # Dicionário de configurações disponíveis
 config = {
@@ -20,13 +20,22 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
 from flask import Flask, send_from_directory, jsonify
 from flask_cors import CORS
 from src.models.user import db
+from src.models.migracoes import aplicar_migracoes
 from src.config import get_config, verificar_licenca, MENSAGEM_PROTECAO
+from src.utils.orcamento_consultas import orcamento_consultas
+from src.services.estatisticas import estatisticas_fila
+from src.utils.logs import configurar_logs
+from src.comandos import configurar_comandos
 
 # Importação das rotas (blueprints)
 from src.routes.user import user_bp
 from src.routes.barbeiro import barbeiro_bp
 from src.routes.cliente import cliente_bp
 from src.routes.atendimento import atendimento_bp
+from src.routes.agendamento import agendamento_bp
+from src.routes.comando import comando_bp
+from src.routes.busca import busca_bp
+from src.routes.monitoramento import monitoramento_bp
 
 def criar_aplicacao():
     """
@@ -52,6 +61,9 @@ def criar_aplicacao():
     config_class = get_config()
     app.config.from_object(config_class)
     
+    # Logs estruturados em JSON (fila + listener, fora do caminho da requisição)
+    configurar_logs(app)
+    
     # Configuração do CORS (Cross-Origin Resource Sharing)
     # Permite que o frontend acesse a API de qualquer origem
     CORS(app, resources={
@@ -69,14 +81,40 @@ def criar_aplicacao():
     with app.app_context():
         db.create_all()
         
+        # Ajustes de esquema em bancos criados por versões anteriores
+        aplicar_migracoes(db.engine)
+        
         # Inserção de dados iniciais (barbeiros padrão)
         inserir_dados_iniciais()
+        
+        # Contadores de /api/status partem dos valores do banco
+        estatisticas_fila.reconciliar()
+    
+    # Reconciliação periódica (corrige alterações feitas por outros processos)
+    estatisticas_fila.iniciar_reconciliacao_periodica(app, app.config.get('STATUS_RECONCILE_INTERVAL'))
+    
+    # Modo multi-loja: um banco SQLite por barbearia
+    if app.config.get('MULTI_TENANT_ENABLED'):
+        configurar_lojas(app)
+    
+    # Avisos de alteração entre os workers do mesmo servidor
+    configurar_notificacoes(app)
+    
+    # Instantâneo de /api/fila compartilhado entre os workers
+    configurar_instantaneo_fila(app)
+    
+    # Escolha de barbeiro para clientes sem preferência e agenda de horários
+    configurar_escalonador(app)
     
     # Registro dos blueprints (rotas da API)
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(barbeiro_bp, url_prefix='/api')
     app.register_blueprint(cliente_bp, url_prefix='/api')
     app.register_blueprint(atendimento_bp, url_prefix='/api')
+    app.register_blueprint(agendamento_bp, url_prefix='/api')
+    app.register_blueprint(comando_bp, url_prefix='/api')
+    app.register_blueprint(busca_bp, url_prefix='/api')
+    app.register_blueprint(monitoramento_bp, url_prefix='/api')
     
     # Configuração de rotas especiais
     configurar_rotas_especiais(app)
@@ -87,6 +125,9 @@ def criar_aplicacao():
     # Middleware personalizado
     configurar_middleware(app)
     
+    # Comandos de linha de comando (flask --app src.main <comando>)
+    configurar_comandos(app)
+    
     return app
 
 def inserir_dados_iniciais():
@@ -96,6 +137,7 @@ def inserir_dados_iniciais():
     Esta função cria barbeiros padrão para facilitar os testes
     e demonstração do sistema.
     """
+    from flask import current_app
     from src.models.barbeiro import Barbeiro
     
     try:
@@ -112,12 +154,201 @@ def inserir_dados_iniciais():
                 db.session.add(barbeiro)
             
             db.session.commit()
-            print("✓ Barbeiros padrão criados com sucesso!")
+            current_app.logger.info('Barbeiros padrão criados com sucesso',
+                                    extra={'dados': {'barbeiros': len(barbeiros_padrao)}})
             
-    except Exception as e:
-        print(f"Erro ao inserir dados iniciais: {e}")
+    except Exception:
+        current_app.logger.exception('Erro ao inserir dados iniciais')
         db.session.rollback()
 
+def configurar_lojas(app):
+    """
+    Ativa o modo multi-loja.
+    
+    Cada requisição tem sua loja identificada pelo host ou pelo prefixo
+    do caminho (TENANT_RESOLUTION) e passa a usar o banco dessa loja.
+    Requisições sem loja continuam usando o banco principal.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+    """
+    from flask import g, request
+    from src.services.lojas import (
+        gerenciador_lojas, MiddlewareLojas, LojaNaoEncontrada, CHAVE_AMBIENTE
+    )
+    
+    gerenciador_lojas.configurar(app)
+    gerenciador_lojas.iniciar_reconciliacao_periodica(app, app.config.get('STATUS_RECONCILE_INTERVAL'))
+    
+    app.wsgi_app = MiddlewareLojas(
+        app.wsgi_app,
+        modo=app.config.get('TENANT_RESOLUTION', 'caminho'),
+        prefixo=app.config.get('TENANT_PATH_PREFIX', '/lojas'),
+        sufixo_host=app.config.get('TENANT_HOST_SUFFIX')
+    )
+    
+    @app.before_request
+    def selecionar_loja():
+        """Associa a requisição ao banco da loja identificada pelo middleware."""
+        slug = request.environ.get(CHAVE_AMBIENTE)
+        if slug is None:
+            return None
+        
+        try:
+            g.loja = gerenciador_lojas.obter(slug)
+        except LojaNaoEncontrada as e:
+            return jsonify({
+                'erro': str(e),
+                'status': 'erro'
+            }), 404
+        
+        return None
+
+def configurar_notificacoes(app):
+    """
+    Configura o barramento de eventos entre workers.
+    
+    Após cada commit que altera clientes, barbeiros ou atendimentos, um
+    evento é publicado para todos os workers. Quando o evento vem de
+    outro worker, os contadores de /api/status da loja afetada são
+    reconciliados com o banco.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+    """
+    import atexit
+    from src.services.notificacoes import barramento, diretorio_padrao, instalar_ouvintes_sessao
+    from src.services.estatisticas import estatisticas_principal
+    
+    instalar_ouvintes_sessao()
+    
+    if not app.config.get('EVENT_BUS_ENABLED'):
+        return
+    
+    barramento.configurar(
+        app.config.get('EVENT_BUS_DIR') or diretorio_padrao(app.config['SQLALCHEMY_DATABASE_URI'])
+    )
+    atexit.register(barramento.fechar)
+    atraso = app.config.get('EVENT_BUS_RECONCILE_DELAY', 0.05)
+    
+    def reconciliar_contadores(evento, remoto):
+        """Reconcilia os contadores quando outro worker altera a fila ou os barbeiros."""
+        if not remoto or evento.get('tipo') not in ('fila', 'barbeiros'):
+            return
+        
+        slug = evento.get('loja')
+        if slug:
+            from src.services.lojas import gerenciador_lojas
+            loja = gerenciador_lojas.lojas.get(slug)
+            if loja is None:
+                return  # loja sem engine aberto neste worker: contadores são lidos ao abrir
+            estatisticas = loja.estatisticas
+        else:
+            loja = None
+            estatisticas = estatisticas_principal
+        
+        def executar():
+            try:
+                with app.app_context():
+                    if loja is None:
+                        estatisticas.reconciliar()
+                    else:
+                        from src.services.lojas import gerenciador_lojas
+                        with gerenciador_lojas.usar(loja):
+                            estatisticas.reconciliar()
+            except Exception as e:
+                app.logger.warning('Falha ao reconciliar contadores após evento: %s', e)
+        
+        estatisticas.agendar_reconciliacao(executar, atraso)
+    
+    barramento.inscrever(reconciliar_contadores)
+    
+    @app.before_request
+    def iniciar_barramento():
+        """Abre o socket do worker na primeira requisição (depois do fork)."""
+        barramento.garantir_iniciado()
+
+def configurar_instantaneo_fila(app):
+    """
+    Configura o instantâneo de /api/fila em memória compartilhada.
+    
+    Quando uma requisição altera a fila ou os barbeiros, o instantâneo
+    da loja é reconstruído uma única vez ao final da requisição, mesmo
+    que ela tenha feito vários commits. Alterações feitas fora de uma
+    requisição (comandos de linha de comando) apenas invalidam o
+    instantâneo, que é reconstruído na próxima leitura.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+    """
+    import atexit
+    from flask import g, has_request_context
+    from src.services.instantaneo_fila import instantaneos_fila
+    from src.services.notificacoes import barramento
+    
+    instantaneos_fila.configurar(app)
+    if not instantaneos_fila.ativo:
+        return
+    
+    atexit.register(instantaneos_fila.fechar)
+    
+    def marcar_instantaneo(evento, remoto):
+        """Anota a loja cujo instantâneo ficou desatualizado por um commit deste processo."""
+        if remoto or evento.get('tipo') not in ('fila', 'barbeiros'):
+            return
+        
+        loja = evento.get('loja', '')
+        if has_request_context():
+            g.setdefault('instantaneos_pendentes', set()).add(loja)
+        else:
+            instantaneos_fila.invalidar(loja)
+    
+    barramento.inscrever(marcar_instantaneo)
+    
+    @app.after_request
+    def publicar_instantaneo(response):
+        """Reconstrói os instantâneos alterados pela requisição."""
+        for loja in g.pop('instantaneos_pendentes', ()):
+            try:
+                instantaneos_fila.reconstruir(loja)
+            except Exception as e:
+                app.logger.warning('Falha ao reconstruir o instantâneo da fila: %s', e)
+                instantaneos_fila.invalidar(loja)
+        return response
+
+def configurar_escalonador(app):
+    """
+    Configura o escalonador de clientes sem preferência de barbeiro e a
+    agenda de horários marcados.
+    
+    Os tempos médios de atendimento, os índices de agendamentos e os
+    relatórios de dias encerrados guardados em memória são descartados
+    quando os atendimentos, os agendamentos ou o histórico mudam, por
+    este ou por outro worker.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+    """
+    from src.services.agenda import agenda
+    from src.services.escalonador import escalonador
+    from src.services.notificacoes import barramento
+    from src.services.relatorios import cache_relatorios
+    
+    escalonador.configurar(app)
+    agenda.configurar(app)
+    cache_relatorios.configurar(app)
+    
+    def descartar_caches(evento, remoto):
+        """Descarta os tempos médios ou os índices da agenda da loja alterada."""
+        if evento.get('tipo') == 'atendimentos':
+            escalonador.invalidar(evento.get('loja', ''))
+        elif evento.get('tipo') == 'agendamentos':
+            agenda.invalidar(evento.get('loja', ''))
+        elif evento.get('tipo') == 'historico':
+            cache_relatorios.invalidar(evento.get('loja', ''))
+    
+    barramento.inscrever(descartar_caches)
+
 def configurar_rotas_especiais(app):
     """
     Configura rotas especiais da aplicação.
@@ -125,25 +356,63 @@ def configurar_rotas_especiais(app):
     Args:
         app (Flask): Instância da aplicação Flask
     """
+    from src.utils.saude import verificador_prontidao, nome_banco
+    
+    verificador_prontidao.configurar(app)
+    
+    @app.route('/healthz', methods=['GET'])
+    @orcamento_consultas(0)
+    def verificar_vivacidade():
+        """
+        Sonda de vivacidade: o processo está de pé e respondendo.
+        
+        Não faz nenhum acesso a banco ou disco.
+        
+        Returns:
+            JSON: Status 'ok'
+        """
+        return jsonify({'status': 'ok'}), 200
+    
+    @app.route('/readyz', methods=['GET'])
+    @orcamento_consultas(0)
+    def verificar_prontidao():
+        """
+        Sonda de prontidão: o banco responde e aceita escrita.
+        
+        O resultado fica em cache por READINESS_CACHE_SECONDS e apenas uma
+        verificação roda por vez, então sondas frequentes não geram carga.
+        
+        Returns:
+            JSON: Resultado da verificação (200 se pronto, 503 caso contrário)
+        """
+        resultado = verificador_prontidao.verificar(db.engine)
+        
+        return jsonify({
+            'status': 'pronto' if resultado['pronto'] else 'indisponivel',
+            'banco_dados': resultado
+        }), 200 if resultado['pronto'] else 503
     
     @app.route('/api/status', methods=['GET'])
+    @orcamento_consultas(0)
     def status_sistema():
         """
         Endpoint para verificar o status do sistema.
         
+        Os contadores vêm da memória (mantidos pelas rotas e reconciliados
+        periodicamente com o banco), sem nenhuma consulta SQL.
+        
         Returns:
             JSON: Informações sobre o status do sistema
         """
-        from src.models.barbeiro import Barbeiro
-        from src.models.cliente import Cliente
         from src.config import SISTEMA_NOME, SISTEMA_VERSAO, SISTEMA_AUTOR
         
         try:
-            # Contadores básicos
-            total_barbeiros = Barbeiro.query.count()
-            barbeiros_ativos = Barbeiro.query.filter_by(ativo=True).count()
-            clientes_aguardando = Cliente.query.filter_by(status='aguardando').count()
-            clientes_atendendo = Cliente.query.filter_by(status='atendendo').count()
+            # Estado do banco segundo a última verificação de /readyz (sem nova consulta)
+            ultima_verificacao = verificador_prontidao.resultado
+            if ultima_verificacao is None:
+                banco_status = 'nao_verificado'
+            else:
+                banco_status = 'conectado' if ultima_verificacao['conectado'] else 'erro'
             
             return jsonify({
                 'sistema': {
@@ -153,15 +422,10 @@ def configurar_rotas_especiais(app):
                     'status': 'online',
                     'timestamp': datetime.utcnow().isoformat()
                 },
-                'estatisticas': {
-                    'total_barbeiros': total_barbeiros,
-                    'barbeiros_ativos': barbeiros_ativos,
-                    'clientes_aguardando': clientes_aguardando,
-                    'clientes_atendendo': clientes_atendendo
-                },
+                'estatisticas': estatisticas_fila.obter(),
                 'banco_dados': {
-                    'status': 'conectado',
-                    'tipo': 'SQLite'
+                    'status': banco_status,
+                    'tipo': nome_banco(db.engine)
                 }
             }), 200
             
@@ -252,9 +516,62 @@ def configurar_middleware(app):
     """
     Configura middleware personalizado da aplicação.
     
+    Além dos headers de segurança, mede a duração de cada requisição,
+    a quantidade de consultas SQL e o tempo gasto no banco, alimentando
+    os histogramas expostos em /api/metrics e o header Server-Timing.
+    Em desenvolvimento e testes também verifica o orçamento de consultas,
+    e em todos os ambientes registra as consultas lentas. Com
+    PROFILING_ENABLED, perfila as requisições que enviarem o segredo.
+    
     Args:
         app (Flask): Instância da aplicação Flask
     """
+    import logging
+    import random
+    from time import perf_counter
+    from flask import g, request
+    from src.utils.instrumentacao import (
+        iniciar_contexto, obter_contexto, encerrar_contexto,
+        instalar_ouvintes_sql, registrar_observador_sql
+    )
+    from src.utils.metricas import metricas, formatar_server_timing
+    from src.utils.orcamento_consultas import (
+        observar_consulta, verificar_orcamento, OrcamentoConsultasExcedido
+    )
+    from src.utils.consultas_lentas import consultas_lentas
+    from src.utils.perfilador import perfilador, segredo_confere
+    
+    metricas_ativas = app.config.get('METRICS_ENABLED', False)
+    server_timing = app.config.get('SERVER_TIMING_ENABLED', False)
+    guarda_consultas = app.config.get('QUERY_BUDGET_ENABLED', False)
+    registro_lentas = app.config.get('SLOW_QUERY_LOG_ENABLED', False)
+    taxa_log_acesso = app.config.get('ACCESS_LOG_SAMPLE_RATE', 0)
+    log_acesso = logging.getLogger('sistema_fila.acesso')
+    perfilador_ativo = bool(app.config.get('PROFILING_ENABLED') and app.config.get('PROFILING_SECRET'))
+    instrumentacao_ativa = metricas_ativas or guarda_consultas or registro_lentas or perfilador_ativo
+    
+    if metricas_ativas:
+        metricas.configurar_buckets(app.config.get('METRICS_BUCKETS'))
+    
+    if guarda_consultas:
+        registrar_observador_sql(observar_consulta)
+    
+    if registro_lentas:
+        consultas_lentas.configurar(app)
+        registrar_observador_sql(consultas_lentas.observar)
+    
+    if perfilador_ativo:
+        perfilador.configurar(app)
+        registrar_observador_sql(perfilador.observar)
+    
+    if instrumentacao_ativa:
+        # Ouvintes do SQLAlchemy que contam as consultas de cada requisição
+        with app.app_context():
+            instalar_ouvintes_sql(db.engine)
+        
+        if app.config.get('MULTI_TENANT_ENABLED'):
+            from src.services.lojas import gerenciador_lojas
+            gerenciador_lojas.ao_criar_engine(instalar_ouvintes_sql)
     
     @app.before_request
     def antes_requisicao():
@@ -263,10 +580,8 @@ def configurar_middleware(app):
         
         Pode ser usado para logging, autenticação, etc.
         """
-        # Log básico das requisições (apenas em desenvolvimento)
-        if app.config.get('DEBUG'):
-            from flask import request
-            print(f"[{datetime.utcnow()}] {request.method} {request.path}")
+        if instrumentacao_ativa:
+            iniciar_contexto()
     
     @app.after_request
     def depois_requisicao(response):
@@ -284,7 +599,110 @@ def configurar_middleware(app):
         response.headers['X-Frame-Options'] = 'DENY'
         response.headers['X-XSS-Protection'] = '1; mode=block'
         
+        contexto = obter_contexto()
+        if contexto is None:
+            return response
+        
+        # Verificação do orçamento de consultas (desenvolvimento e testes)
+        if guarda_consultas:
+            violacoes = verificar_orcamento(
+                contexto,
+                app.view_functions.get(request.endpoint),
+                app.config.get('QUERY_BUDGET_DEFAULT'),
+                app.config.get('QUERY_REPEAT_LIMIT')
+            )
+            if violacoes:
+                mensagem = f"{request.method} {request.path}: " + '; '.join(violacoes)
+                if app.config.get('QUERY_BUDGET_RAISE'):
+                    raise OrcamentoConsultasExcedido(mensagem)
+                app.logger.warning('Orçamento de consultas excedido - %s', mensagem)
+        
+        # Registro das métricas da requisição
+        if metricas_ativas:
+            duracao = contexto.duracao()
+            rota = request.url_rule.rule if request.url_rule else 'nao_encontrada'
+            metricas.registrar(request.method, rota, duracao,
+                               contexto.tempo_db, contexto.consultas)
+            
+            if server_timing:
+                response.headers['Server-Timing'] = formatar_server_timing(
+                    duracao, contexto.tempo_db, contexto.consultas
+                )
+        
         return response
+    
+    @app.teardown_request
+    def finalizar_requisicao(error=None):
+        """Descarta o contexto de medição ao final da requisição."""
+        if instrumentacao_ativa:
+            encerrar_contexto()
+    
+    if taxa_log_acesso > 0:
+        # Log de acesso amostrado: apenas uma fração das requisições bem-sucedidas
+        # é registrada; erros do servidor são sempre registrados
+        @app.before_request
+        def marcar_inicio_requisicao():
+            """Guarda o instante de início para o log de acesso."""
+            g.inicio_requisicao = perf_counter()
+        
+        @app.after_request
+        def registrar_acesso(response):
+            """Envia a requisição para o log de acesso, conforme a amostragem."""
+            if response.status_code < 500 and random.random() >= taxa_log_acesso:
+                return response
+            
+            inicio = g.get('inicio_requisicao')
+            log_acesso.info('%s %s %s', request.method, request.path, response.status_code, extra={'dados': {
+                'metodo': request.method,
+                'caminho': request.path,
+                'rota': request.url_rule.rule if request.url_rule else None,
+                'status': response.status_code,
+                'duracao_ms': round((perf_counter() - inicio) * 1000, 3) if inicio else None,
+                'ip': request.remote_addr,
+                'amostragem': taxa_log_acesso
+            }})
+            return response
+    
+    if perfilador_ativo:
+        # Hooks registrados só com o perfilador ativo: desativado, não há custo algum
+        cabecalho_perfil = app.config.get('PROFILING_HEADER', 'X-Profile')
+        segredo_perfil = app.config['PROFILING_SECRET']
+        
+        @app.before_request
+        def iniciar_perfil():
+            """Inicia o cProfile se a requisição trouxer o segredo do perfilador."""
+            if not segredo_confere(request.headers.get(cabecalho_perfil), segredo_perfil):
+                return
+            
+            contexto = obter_contexto()
+            perfil = perfilador.iniciar()
+            if perfil is None:
+                contexto.dados['perfil_ocupado'] = True
+            else:
+                contexto.dados['perfil'] = perfil
+        
+        @app.after_request
+        def encerrar_perfil(response):
+            """Guarda o perfil e informa seu ID no header X-Profile-Id."""
+            contexto = obter_contexto()
+            perfil = contexto.dados.pop('perfil', None) if contexto else None
+            
+            if perfil is not None:
+                rota = request.url_rule.rule if request.url_rule else request.path
+                perfilador.encerrar(perfil, request.method, rota, response.status_code)
+                response.headers['X-Profile-Id'] = perfil.id
+            elif contexto is not None and contexto.dados.get('perfil_ocupado'):
+                response.headers['X-Profile-Id'] = 'ocupado'
+            
+            return response
+        
+        @app.teardown_request
+        def descartar_perfil(error=None):
+            """Interrompe o perfil de uma requisição que terminou em exceção."""
+            contexto = obter_contexto()
+            perfil = contexto.dados.pop('perfil', None) if contexto else None
+            if perfil is not None:
+                perfilador.descartar(perfil)
 
 # Criação da instância da aplicação
 app = criar_aplicacao()
@@ -307,6 +725,9 @@ if __name__ == '__main__':
     print()
     print("📋 ENDPOINTS DISPONÍVEIS:")
     print("   • GET  /api/status           - Status do sistema")
+    print("   • GET  /healthz              - Sonda de vivacidade")
+    print("   • GET  /readyz               - Sonda de prontidão (banco)")
+    print("   • GET  /api/metrics          - Métricas (Prometheus)")
     print("   • GET  /api/barbeiros        - Lista barbeiros")
     print("   • POST /api/barbeiros        - Criar barbeiro")
     print("   • GET  /api/barbeiros/{id}/fila - Fila do barbeiro")
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Modelo de Dados: Agendamento
+
+Este arquivo contém a definição do modelo de dados para os horários
+marcados com antecedência. Quando o cliente agendado chega à barbearia,
+o agendamento vira um cliente da fila com prioridade de agendado.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from datetime import datetime, timedelta
+from src.models.user import db
+
+class Agendamento(db.Model):
+    """
+    Classe modelo para representar um horário agendado com um barbeiro.
+    
+    Os agendamentos de um mesmo barbeiro nunca se sobrepõem: a criação
+    verifica os conflitos no índice de intervalos (src/services/agenda.py).
+    
+    Atributos da tabela no banco de dados:
+        id (Integer): Chave primária única para identificar cada agendamento
+        nome (String): Nome do cliente
+        barbeiro_id (Integer): Chave estrangeira referenciando o barbeiro
+        inicio (DateTime): Data e hora marcadas
+        duracao_minutos (Integer): Duração reservada para o atendimento
+        status (String): Situação do agendamento
+        cliente_id (Integer): Cliente criado na fila quando o agendado chegou
+        criado_em (DateTime): Data e hora em que o horário foi marcado
+    
+    Status possíveis:
+        - 'agendado': Horário marcado, cliente ainda não chegou
+        - 'presente': Cliente chegou e entrou na fila
+        - 'cancelado': Horário desmarcado
+    """
+    
+    # Nome da tabela no banco de dados SQLite
+    __tablename__ = 'agendamentos'
+    
+    # Agendamentos de um barbeiro em ordem de horário (consultas da agenda)
+    __table_args__ = (
+        db.Index('ix_agendamentos_barbeiro_inicio', 'barbeiro_id', 'inicio'),
+    )
+    
+    # Definição das colunas da tabela
+    id = db.Column(db.Integer, primary_key=True, comment='Identificador único do agendamento')
+    nome = db.Column(db.String(100), nullable=False, comment='Nome do cliente')
+    barbeiro_id = db.Column(db.Integer, db.ForeignKey('barbeiros.id'), nullable=False,
+                           comment='ID do barbeiro')
+    inicio = db.Column(db.DateTime, nullable=False, comment='Data e hora marcadas')
+    duracao_minutos = db.Column(db.Integer, nullable=False, comment='Duração reservada em minutos')
+    status = db.Column(db.String(20), default='agendado', nullable=False,
+                      comment='Situação do agendamento')
+    cliente_id = db.Column(db.Integer, nullable=True, comment='Cliente criado na chegada')
+    criado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False,
+                          comment='Data e hora em que o horário foi marcado')
+
+    def __repr__(self):
+        """
+        Representação em string do objeto Agendamento para debug e logs.
+        
+        Returns:
+            str: Representação formatada do agendamento
+        """
+        return f'<Agendamento ID:{self.id} Nome:{self.nome} Inicio:{self.inicio} Status:{self.status}>'
+
+    @property
+    def fim(self):
+        """
+        Returns:
+            datetime: Horário em que o atendimento reservado termina
+        """
+        return self.inicio + timedelta(minutes=self.duracao_minutos)
+
+    def to_dict(self):
+        """
+        Converte o objeto Agendamento para um dicionário Python.
+        
+        Returns:
+            dict: Dicionário contendo os dados do agendamento
+        """
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'barbeiro_id': self.barbeiro_id,
+            'inicio': self.inicio.isoformat() if self.inicio else None,
+            'fim': self.fim.isoformat() if self.inicio and self.duracao_minutos else None,
+            'duracao_minutos': self.duracao_minutos,
+            'status': self.status,
+            'cliente_id': self.cliente_id,
+            'criado_em': self.criado_em.isoformat() if self.criado_em else None
+        }
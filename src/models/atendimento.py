@@ -14,6 +14,33 @@ Uso não autorizado é proibido por lei.
 from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
+from src.utils.fuso_horario import para_local
+
+def periodo_entrada(data_entrada, local=None):
+    """
+    Calcula as colunas de período de um atendimento a partir da entrada na fila.
+    
+    O dia e a hora são os do fuso da barbearia (SHOP_TIMEZONE): uma
+    chegada às 22h de sexta no horário local conta na sexta, mesmo que
+    em UTC já seja sábado.
+    
+    Args:
+        data_entrada (datetime): Data e hora de entrada na fila (UTC sem fuso)
+        local (ConversorLocal): Conversor para o horário local, reaproveitado
+            em cargas em massa (padrão: para_local)
+    
+    Returns:
+        dict: dia, dia_semana (0 = segunda-feira) e hora da entrada, locais
+    """
+    entrada = local(data_entrada) if local else para_local(data_entrada)
+    return {'dia': entrada.date(), 'dia_semana': entrada.weekday(), 'hora': entrada.hour}
+
+def _periodo_padrao(campo):
+    """Valor padrão de uma coluna de período, calculado da data de entrada da linha inserida."""
+    def calcular(contexto):
+        data_entrada = contexto.get_current_parameters().get('data_entrada')
+        return periodo_entrada(data_entrada)[campo] if data_entrada else None
+    return calcular
 
 class Atendimento(db.Model):
     """
@@ -34,6 +61,9 @@ class Atendimento(db.Model):
         data_fim (DateTime): Data e hora de fim do atendimento
         tempo_espera (Integer): Tempo de espera em minutos
         tempo_atendimento (Integer): Tempo de atendimento em minutos
+        dia (Date): Dia da entrada na fila (fuso da barbearia)
+        dia_semana (Integer): Dia da semana da entrada (0 = segunda-feira, fuso da barbearia)
+        hora (Integer): Hora da entrada na fila (fuso da barbearia)
     
     Métricas calculadas:
         - Tempo de espera: Diferença entre entrada na fila e início do atendimento
@@ -44,10 +74,18 @@ class Atendimento(db.Model):
     # Nome da tabela no banco de dados SQLite
     __tablename__ = 'atendimentos'
     
+    # Varredura do histórico em ordem de início (relatórios por período)
+    __table_args__ = (
+        db.Index('ix_atendimentos_data_inicio', 'data_inicio'),
+        # Agregações por período sem ler a tabela (mapa de calor)
+        db.Index('ix_atendimentos_periodo', 'dia', 'barbeiro_id', 'dia_semana', 'hora', 'tempo_espera'),
+    )
+    
     # Definição das colunas da tabela
     id = db.Column(db.Integer, primary_key=True, comment='Identificador único do atendimento')
-    cliente_id = db.Column(db.Integer, db.ForeignKey('clientes.id'), nullable=False,
-                          comment='ID do cliente atendido')
+    # Sem chave estrangeira: o cliente pode estar em clientes ou, depois de
+    # sair da fila, em clientes_arquivados (com o mesmo ID)
+    cliente_id = db.Column(db.Integer, nullable=False, comment='ID do cliente atendido')
     barbeiro_id = db.Column(db.Integer, db.ForeignKey('barbeiros.id'), nullable=False,
                            comment='ID do barbeiro que realizou o atendimento')
     numero_ficha = db.Column(db.Integer, nullable=False, comment='Número da ficha do cliente')
@@ -58,6 +96,13 @@ class Atendimento(db.Model):
     data_fim = db.Column(db.DateTime, nullable=True, comment='Data e hora de fim do atendimento')
     tempo_espera = db.Column(db.Integer, nullable=True, comment='Tempo de espera em minutos')
     tempo_atendimento = db.Column(db.Integer, nullable=True, comment='Tempo de atendimento em minutos')
+    
+    # Período da entrada, preenchido na inserção: os relatórios agrupam por
+    # essas colunas em vez de aplicar funções de data em cada linha
+    dia = db.Column(db.Date, nullable=True, default=_periodo_padrao('dia'), comment='Dia da entrada na fila')
+    dia_semana = db.Column(db.Integer, nullable=True, default=_periodo_padrao('dia_semana'),
+                           comment='Dia da semana da entrada (0 = segunda-feira)')
+    hora = db.Column(db.Integer, nullable=True, default=_periodo_padrao('hora'), comment='Hora da entrada na fila')
 
     def __repr__(self):
         """
@@ -68,6 +113,29 @@ class Atendimento(db.Model):
         """
         return f'<Atendimento ID:{self.id} Ficha:{self.numero_ficha} Cliente:{self.nome_cliente}>'
 
+    @classmethod
+    def de_cliente(cls, cliente):
+        """
+        Cria o atendimento de um cliente que está sendo atendido.
+        
+        O início do atendimento é o momento em que o cliente foi chamado;
+        clientes chamados antes desse registro existir usam o momento atual.
+        
+        Args:
+            cliente (Cliente): Cliente em atendimento
+        
+        Returns:
+            Atendimento: Atendimento ainda não finalizado
+        """
+        return cls(
+            cliente_id=cliente.id,
+            barbeiro_id=cliente.barbeiro_id,
+            numero_ficha=cliente.numero_ficha,
+            nome_cliente=cliente.nome,
+            data_entrada=cliente.data_entrada,
+            data_inicio=cliente.inicio_atendimento or datetime.utcnow()
+        )
+
     def calcular_tempos(self):
         """
         Calcula automaticamente os tempos de espera e atendimento.
@@ -25,6 +25,14 @@ class Barbeiro(db.Model):
         id (Integer): Chave primária única para identificar cada barbeiro
         nome (String): Nome completo do barbeiro (máximo 100 caracteres)
         ativo (Boolean): Indica se o barbeiro está ativo no sistema
+        clientes_aguardando (Integer): Clientes aguardando na fila do barbeiro
+        cliente_atual_id (Integer): Cliente em atendimento no momento (ou nulo)
+        fila_atualizada_em (DateTime): Última alteração na fila do barbeiro
+    
+    Os três últimos campos são mantidos pelas operações da fila
+    (src/services/fila.py) na mesma transação de cada mudança, de modo
+    que o resumo da fila de todos os barbeiros sai de uma única leitura
+    desta tabela. O comando `flask reparar-contadores` os recalcula.
     
     Relacionamentos:
         atendimentos: Lista de todos os atendimentos realizados por este barbeiro
@@ -37,11 +45,17 @@ class Barbeiro(db.Model):
     id = db.Column(db.Integer, primary_key=True, comment='Identificador único do barbeiro')
     nome = db.Column(db.String(100), unique=True, nullable=False, comment='Nome completo do barbeiro')
     ativo = db.Column(db.Boolean, default=True, nullable=False, comment='Status ativo/inativo do barbeiro')
+    clientes_aguardando = db.Column(db.Integer, default=0, server_default='0', nullable=False,
+                                    comment='Clientes aguardando na fila')
+    cliente_atual_id = db.Column(db.Integer, nullable=True, comment='Cliente em atendimento no momento')
+    fila_atualizada_em = db.Column(db.DateTime, nullable=True, comment='Última alteração na fila')
     
     # Relacionamento um-para-muitos com a tabela de atendimentos
-    # Um barbeiro pode ter vários atendimentos
+    # Um barbeiro pode ter vários atendimentos. Com passive_deletes, excluir
+    # o barbeiro não carrega o histórico na sessão: a rota de exclusão
+    # remove os atendimentos com um DELETE em massa antes do barbeiro
     atendimentos = db.relationship('Atendimento', backref='barbeiro', lazy=True, 
-                                 cascade='all, delete-orphan')
+                                 cascade='all, delete-orphan', passive_deletes=True)
 
     def __repr__(self):
         """
@@ -65,7 +79,10 @@ class Barbeiro(db.Model):
         return {
             'id': self.id,
             'nome': self.nome,
-            'ativo': self.ativo
+            'ativo': self.ativo,
+            'clientes_aguardando': self.clientes_aguardando or 0,
+            'cliente_atual_id': self.cliente_atual_id,
+            'fila_atualizada_em': self.fila_atualizada_em.isoformat() if self.fila_atualizada_em else None
         }
     
     def ativar(self):
@@ -15,6 +15,14 @@ from flask_sqlalchemy import SQLAlchemy
 from datetime import datetime
 from src.models.user import db
 
+# Classes de prioridade da fila (menor valor é chamado antes)
+PRIORIDADES = {
+    'preferencial': 0,  # idosos, gestantes, pessoas com deficiência
+    'agendado': 1,      # clientes com horário marcado, já presentes
+    'normal': 2         # ordem de chegada
+}
+NOMES_PRIORIDADES = {valor: nome for nome, valor in PRIORIDADES.items()}
+
 class Cliente(db.Model):
     """
     Classe modelo para representar um cliente na fila da barbearia.
@@ -31,17 +39,35 @@ class Cliente(db.Model):
         data_entrada (DateTime): Data e hora de entrada na fila
         status (String): Status atual do atendimento
         posicao_fila (Integer): Posição atual do cliente na fila do barbeiro
+        qualquer_barbeiro (Boolean): Cliente sem preferência, atribuído pelo
+            escalonador e que pode ser chamado por outro barbeiro que fique livre
+        inicio_atendimento (DateTime): Data e hora em que foi chamado para o atendimento
+        prioridade (Integer): Classe de prioridade (ver PRIORIDADES)
+        horario_agendado (DateTime): Horário marcado, para clientes agendados
+    
+    A fila de cada barbeiro é ordenada por (prioridade, horário agendado
+    ou de chegada, chegada); ver src/services/fila.py.
     
     Status possíveis:
         - 'aguardando': Cliente está na fila aguardando atendimento
         - 'atendendo': Cliente está sendo atendido no momento
         - 'concluido': Atendimento foi finalizado
         - 'cancelado': Cliente desistiu ou não compareceu
+    
+    Clientes concluídos e cancelados são movidos para ClienteArquivado
+    na mesma transação em que saem da fila.
     """
     
     # Nome da tabela no banco de dados SQLite
     __tablename__ = 'clientes'
     
+    # AUTOINCREMENT: IDs de clientes arquivados nunca são reaproveitados;
+    # o índice cobre a busca da fila de um barbeiro por status e prioridade
+    __table_args__ = (
+        db.Index('ix_clientes_fila', 'barbeiro_id', 'status', 'prioridade'),
+        {'sqlite_autoincrement': True}
+    )
+    
     # Definição das colunas da tabela
     id = db.Column(db.Integer, primary_key=True, comment='Identificador único do cliente')
     nome = db.Column(db.String(100), nullable=False, comment='Nome completo do cliente')
@@ -53,10 +79,12 @@ class Cliente(db.Model):
     status = db.Column(db.String(20), default='aguardando', nullable=False,
                       comment='Status atual do atendimento')
     posicao_fila = db.Column(db.Integer, nullable=True, comment='Posição atual na fila')
-    
-    # Relacionamento um-para-muitos com a tabela de atendimentos
-    # Um cliente pode ter vários atendimentos (histórico)
-    atendimentos = db.relationship('Atendimento', backref='cliente', lazy=True)
+    qualquer_barbeiro = db.Column(db.Boolean, default=False, server_default='0', nullable=False,
+                                  comment='Cliente sem preferência de barbeiro')
+    inicio_atendimento = db.Column(db.DateTime, nullable=True, comment='Data e hora de início do atendimento')
+    prioridade = db.Column(db.Integer, default=PRIORIDADES['normal'], server_default=str(PRIORIDADES['normal']),
+                           nullable=False, comment='Classe de prioridade na fila')
+    horario_agendado = db.Column(db.DateTime, nullable=True, comment='Horário marcado (clientes agendados)')
 
     def __repr__(self):
         """
@@ -84,18 +112,23 @@ class Cliente(db.Model):
             'barbeiro_id': self.barbeiro_id,
             'data_entrada': self.data_entrada.isoformat() if self.data_entrada else None,
             'status': self.status,
-            'posicao_fila': self.posicao_fila
+            'posicao_fila': self.posicao_fila,
+            'qualquer_barbeiro': bool(self.qualquer_barbeiro),
+            'inicio_atendimento': self.inicio_atendimento.isoformat() if self.inicio_atendimento else None,
+            'prioridade': NOMES_PRIORIDADES.get(self.prioridade, 'normal'),
+            'horario_agendado': self.horario_agendado.isoformat() if self.horario_agendado else None
         }
     
     def iniciar_atendimento(self):
         """
         Marca o cliente como sendo atendido no momento.
         
-        Este método atualiza o status do cliente para 'atendendo'
-        e remove sua posição da fila.
+        Este método atualiza o status do cliente para 'atendendo',
+        remove sua posição da fila e registra o início do atendimento.
         """
         self.status = 'atendendo'
         self.posicao_fila = None
+        self.inicio_atendimento = datetime.utcnow()
     
     def concluir_atendimento(self):
         """
@@ -125,3 +158,79 @@ class Cliente(db.Model):
         """
         self.posicao_fila = nova_posicao
 
+class ClienteArquivado(db.Model):
+    """
+    Cliente que saiu da fila (concluído ou cancelado).
+    
+    Apenas clientes 'aguardando' e 'atendendo' ficam na tabela clientes;
+    ao concluir ou cancelar, a linha é movida para clientes_arquivados na
+    mesma transação, mantendo o mesmo ID. Assim as consultas da fila
+    percorrem apenas a fila atual, não todos os clientes já atendidos.
+    
+    Atributos da tabela no banco de dados:
+        id (Integer): Mesmo ID que o cliente tinha na tabela clientes
+        nome (String): Nome completo do cliente
+        numero_ficha (Integer): Número da ficha física (pode se repetir no arquivo)
+        barbeiro_id (Integer): ID do barbeiro
+        data_entrada (DateTime): Data e hora de entrada na fila
+        status (String): 'concluido' ou 'cancelado'
+        arquivado_em (DateTime): Data e hora em que saiu da fila
+    """
+    
+    __tablename__ = 'clientes_arquivados'
+    
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False,
+                   comment='ID original do cliente')
+    nome = db.Column(db.String(100), nullable=False, comment='Nome completo do cliente')
+    numero_ficha = db.Column(db.Integer, nullable=False, index=True, comment='Número da ficha física')
+    barbeiro_id = db.Column(db.Integer, nullable=False, index=True, comment='ID do barbeiro')
+    data_entrada = db.Column(db.DateTime, nullable=False, comment='Data e hora de entrada na fila')
+    status = db.Column(db.String(20), nullable=False, comment='Status final do atendimento')
+    arquivado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False,
+                             comment='Data e hora em que saiu da fila')
+
+    def __repr__(self):
+        """
+        Returns:
+            str: Representação formatada do cliente arquivado
+        """
+        return f'<ClienteArquivado ID:{self.id} Nome:{self.nome} Ficha:{self.numero_ficha} Status:{self.status}>'
+
+    @classmethod
+    def de_cliente(cls, cliente):
+        """
+        Cria o registro de arquivo de um cliente que saiu da fila.
+        
+        Args:
+            cliente (Cliente): Cliente concluído ou cancelado
+        
+        Returns:
+            ClienteArquivado: Registro com os mesmos dados e ID
+        """
+        return cls(
+            id=cliente.id,
+            nome=cliente.nome,
+            numero_ficha=cliente.numero_ficha,
+            barbeiro_id=cliente.barbeiro_id,
+            data_entrada=cliente.data_entrada,
+            status=cliente.status,
+            arquivado_em=datetime.utcnow()
+        )
+
+    def to_dict(self):
+        """
+        Converte para o mesmo formato de Cliente.to_dict().
+        
+        Returns:
+            dict: Dicionário contendo os dados do cliente
+        """
+        return {
+            'id': self.id,
+            'nome': self.nome,
+            'numero_ficha': self.numero_ficha,
+            'barbeiro_id': self.barbeiro_id,
+            'data_entrada': self.data_entrada.isoformat() if self.data_entrada else None,
+            'status': self.status,
+            'posicao_fila': None,
+            'arquivado_em': self.arquivado_em.isoformat() if self.arquivado_em else None
+        }
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Modelo de Dados: Comando Processado
+
+Este arquivo contém a definição do modelo de dados que guarda as chaves
+de idempotência dos comandos em lote (POST /api/comandos). Um tablet que
+reenvia um comando já aplicado recebe a resposta guardada em vez de
+aplicá-lo de novo.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import json
+from datetime import datetime
+from src.models.user import db
+
+class ComandoProcessado(db.Model):
+    """
+    Classe modelo para representar um comando em lote já processado.
+    
+    Atributos da tabela no banco de dados:
+        chave (String): Chave de idempotência enviada pelo cliente da API
+        tipo (String): Operação do comando ('concluir', 'cancelar', 'proximo')
+        resposta (Text): Resultado do comando, em JSON
+        processado_em (DateTime): Data e hora em que o comando foi aplicado
+    """
+    
+    # Nome da tabela no banco de dados SQLite
+    __tablename__ = 'comandos_processados'
+    
+    # Definição das colunas da tabela
+    chave = db.Column(db.String(64), primary_key=True, comment='Chave de idempotência')
+    tipo = db.Column(db.String(20), nullable=False, comment='Operação do comando')
+    resposta = db.Column(db.Text, nullable=False, comment='Resultado do comando em JSON')
+    processado_em = db.Column(db.DateTime, default=datetime.utcnow, nullable=False, index=True,
+                              comment='Data e hora em que o comando foi aplicado')
+
+    def __repr__(self):
+        """
+        Representação em string do objeto ComandoProcessado para debug e logs.
+        
+        Returns:
+            str: Representação formatada do comando
+        """
+        return f'<ComandoProcessado Chave:{self.chave} Tipo:{self.tipo}>'
+
+    def to_dict(self):
+        """
+        Converte o objeto ComandoProcessado para um dicionário Python.
+        
+        Returns:
+            dict: Resultado guardado do comando
+        """
+        return json.loads(self.resposta)
@@ -0,0 +1,454 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Modelo de Dados: Migrações de Esquema
+
+O db.create_all() cria tabelas que ainda não existem, mas não altera
+tabelas de bancos criados por versões anteriores. Este arquivo contém as
+migrações aplicadas a esses bancos na inicialização (banco principal e
+banco de cada loja). Cada migração verifica se já foi aplicada, então
+pode ser executada por vários workers ao mesmo tempo e a cada início.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import logging
+from contextlib import contextmanager
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateColumn, CreateIndex, CreateTable
+
+# Status que mantêm o cliente na tabela clientes
+STATUS_NA_FILA = ('aguardando', 'atendendo')
+
+logger = logging.getLogger('sistema_fila.migracoes')
+
+@contextmanager
+def transacao_imediata_sqlite(engine):
+    """
+    Abre uma transação BEGIN IMMEDIATE direto na conexão do sqlite3.
+    
+    A trava de escrita é obtida antes de qualquer leitura, de modo que
+    dois workers iniciando juntos não aplicam a mesma migração, e os
+    comandos DDL ficam dentro da transação.
+    
+    Args:
+        engine (Engine): Engine SQLite
+    
+    Yields:
+        sqlite3.Connection: Conexão em transação
+    """
+    bruta = engine.raw_connection()
+    try:
+        conexao = bruta.driver_connection
+        nivel_anterior = conexao.isolation_level
+        conexao.isolation_level = None
+        try:
+            conexao.execute('BEGIN IMMEDIATE')
+            try:
+                yield conexao
+                conexao.execute('COMMIT')
+            except BaseException:
+                conexao.execute('ROLLBACK')
+                raise
+        finally:
+            conexao.isolation_level = nivel_anterior
+    finally:
+        bruta.close()
+
+def _sql_tabela(conexao, nome):
+    """Retorna o CREATE TABLE de uma tabela SQLite (None se não existir)."""
+    linha = conexao.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (nome,)
+    ).fetchone()
+    return linha[0] if linha else None
+
+def migrar_clientes_arquivados(engine):
+    """
+    Separa a fila atual dos clientes encerrados (bancos SQLite antigos).
+    
+    A tabela clientes é recriada com AUTOINCREMENT (para que o ID de um
+    cliente arquivado nunca seja reaproveitado) contendo apenas os
+    clientes 'aguardando' e 'atendendo'; os concluídos e cancelados vão
+    para clientes_arquivados com o mesmo ID.
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se a migração foi aplicada agora
+    """
+    from src.models.cliente import Cliente
+    
+    if engine.dialect.name != 'sqlite':
+        return False  # nos demais bancos os IDs vêm de sequências, que não reaproveitam valores
+    
+    with transacao_imediata_sqlite(engine) as conexao:
+        sql = _sql_tabela(conexao, 'clientes')
+        if sql is None or 'AUTOINCREMENT' in sql.upper():
+            return False
+        
+        tabela = Cliente.__table__
+        # Colunas do modelo que o banco antigo já tem; as novas ficam com o padrão
+        existentes = {linha[1] for linha in conexao.execute('PRAGMA table_info(clientes)')}
+        colunas = ', '.join(coluna.name for coluna in tabela.columns if coluna.name in existentes)
+        filtro = ', '.join(f"'{status}'" for status in STATUS_NA_FILA)
+        agora = datetime.utcnow().isoformat(sep=' ', timespec='microseconds')
+        
+        ddl = str(CreateTable(tabela).compile(dialect=engine.dialect))
+        conexao.execute(ddl.replace('CREATE TABLE clientes', 'CREATE TABLE clientes_nova', 1))
+        
+        arquivados = conexao.execute(
+            'INSERT INTO clientes_arquivados '
+            '(id, nome, numero_ficha, barbeiro_id, data_entrada, status, arquivado_em) '
+            'SELECT id, nome, numero_ficha, barbeiro_id, data_entrada, status, ? '
+            f'FROM clientes WHERE status NOT IN ({filtro})', (agora,)
+        ).rowcount
+        conexao.execute(
+            f'INSERT INTO clientes_nova ({colunas}) '
+            f'SELECT {colunas} FROM clientes WHERE status IN ({filtro})'
+        )
+        maior_id = conexao.execute(
+            'SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM clientes '
+            'UNION ALL SELECT MAX(id) FROM clientes_arquivados)'
+        ).fetchone()[0] or 0
+        
+        conexao.execute('DROP TABLE clientes')
+        conexao.execute('ALTER TABLE clientes_nova RENAME TO clientes')
+        for indice in tabela.indexes:
+            conexao.execute(str(CreateIndex(indice).compile(dialect=engine.dialect)))
+        # A cópia para clientes_nova já criou a entrada; ela passa a valer também para o arquivo
+        conexao.execute("DELETE FROM sqlite_sequence WHERE name = 'clientes'")
+        conexao.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('clientes', ?)", (maior_id,))
+    
+    logger.info('Clientes encerrados movidos para clientes_arquivados',
+                extra={'dados': {'arquivados': arquivados, 'banco': str(engine.url)}})
+    return True
+
+def remover_chave_cliente_atendimentos(engine):
+    """
+    Remove a chave estrangeira atendimentos.cliente_id -> clientes.id.
+    
+    Depois de arquivado, o cliente de um atendimento fica em
+    clientes_arquivados; em bancos que verificam chaves estrangeiras a
+    restrição impediria a movimentação. O SQLite não as verifica
+    (PRAGMA foreign_keys desligado), então nada é feito nele.
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se a restrição foi removida agora
+    """
+    if engine.dialect.name == 'sqlite':
+        return False
+    
+    restricoes = [
+        chave['name'] for chave in inspect(engine).get_foreign_keys('atendimentos')
+        if chave['referred_table'] == 'clientes' and chave.get('name')
+    ]
+    if not restricoes:
+        return False
+    
+    comando = 'DROP FOREIGN KEY' if engine.dialect.name in ('mysql', 'mariadb') else 'DROP CONSTRAINT'
+    with engine.begin() as conexao:
+        for nome in restricoes:
+            conexao.execute(text(f'ALTER TABLE atendimentos {comando} {nome}'))
+    return True
+
+def adicionar_colunas(engine, tabela, nomes):
+    """
+    Adiciona à tabela do banco as colunas do modelo que ainda não existem.
+    
+    Args:
+        engine (Engine): Engine do banco
+        tabela (Table): Tabela do modelo (ex.: Barbeiro.__table__)
+        nomes (tuple): Colunas a verificar
+    
+    Returns:
+        list: Colunas adicionadas agora
+    """
+    def ausentes(existentes):
+        return [nome for nome in nomes if nome not in existentes]
+
+    def ddl(nome):
+        coluna = str(CreateColumn(tabela.c[nome]).compile(dialect=engine.dialect))
+        return f'ALTER TABLE {tabela.name} ADD COLUMN {coluna}'
+    
+    if engine.dialect.name == 'sqlite':
+        with transacao_imediata_sqlite(engine) as conexao:
+            existentes = {linha[1] for linha in conexao.execute(f'PRAGMA table_info({tabela.name})')}
+            adicionadas = ausentes(existentes)
+            for nome in adicionadas:
+                conexao.execute(ddl(nome))
+        return adicionadas
+    
+    adicionadas = ausentes({coluna['name'] for coluna in inspect(engine).get_columns(tabela.name)})
+    if adicionadas:
+        with engine.begin() as conexao:
+            for nome in adicionadas:
+                conexao.execute(text(ddl(nome)))
+    return adicionadas
+
+def adicionar_contadores_barbeiros(engine):
+    """
+    Adiciona os contadores da fila aos barbeiros e os calcula a partir dos clientes.
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se a migração foi aplicada agora
+    """
+    from sqlalchemy import update
+    from src.models.barbeiro import Barbeiro
+    from src.services.fila import expressoes_contadores
+    
+    adicionadas = adicionar_colunas(engine, Barbeiro.__table__,
+                                    ('clientes_aguardando', 'cliente_atual_id', 'fila_atualizada_em'))
+    if not adicionadas:
+        return False
+    
+    aguardando, atual = expressoes_contadores()
+    with engine.begin() as conexao:
+        conexao.execute(update(Barbeiro.__table__).values(clientes_aguardando=aguardando,
+                                                          cliente_atual_id=atual))
+    return True
+
+def adicionar_colunas_escalonador(engine):
+    """
+    Adiciona aos clientes as colunas usadas pelo escalonador de barbeiros.
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se a migração foi aplicada agora
+    """
+    from src.models.cliente import Cliente
+    
+    return bool(adicionar_colunas(engine, Cliente.__table__, ('qualquer_barbeiro', 'inicio_atendimento')))
+
+def adicionar_prioridades_clientes(engine):
+    """
+    Adiciona aos clientes a classe de prioridade e o horário agendado,
+    e o índice usado na busca da fila de cada barbeiro.
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se a migração foi aplicada agora
+    """
+    from src.models.cliente import Cliente
+    
+    adicionadas = adicionar_colunas(engine, Cliente.__table__, ('prioridade', 'horario_agendado'))
+    
+    indices = {indice['name'] for indice in inspect(engine).get_indexes('clientes')}
+    criados = [indice for indice in Cliente.__table__.indexes if indice.name not in indices]
+    for indice in criados:
+        indice.create(engine, checkfirst=True)
+    
+    return bool(adicionadas or criados)
+
+def adicionar_periodo_atendimentos(engine):
+    """
+    Adiciona aos atendimentos as colunas de período (dia, dia_semana, hora).
+    
+    Só o ALTER TABLE roda na inicialização; o histórico já gravado é
+    preenchido por preencher_periodo_atendimentos, no comando
+    preencher-periodos.
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se a migração foi aplicada agora
+    """
+    from src.models.atendimento import Atendimento
+    
+    return bool(adicionar_colunas(engine, Atendimento.__table__, ('dia', 'dia_semana', 'hora')))
+
+def preencher_periodo_atendimentos(engine, tamanho_bloco=50000, recalcular=False, ao_confirmar=None):
+    """
+    Preenche as colunas de período dos atendimentos a partir da data de
+    entrada, no fuso da barbearia (comando preencher-periodos).
+    
+    Não roda na inicialização: em históricos de milhões de linhas leva
+    mais que o timeout dos workers. O preenchimento é feito em blocos de
+    IDs, cada um em sua transação, para não manter o banco travado
+    durante todo o histórico. Blocos já preenchidos são ignorados, então
+    um preenchimento interrompido continua de onde parou.
+    
+    No SQLite o bloco é um único UPDATE; a conversão para o horário
+    local (que o SQLite não conhece) é uma função Python registrada na
+    conexão, a mesma usada por periodo_entrada.
+    
+    Args:
+        engine (Engine): Engine do banco
+        tamanho_bloco (int): IDs atualizados por transação
+        recalcular (bool): Recalcula também as linhas já preenchidas
+            (ex.: depois de alterar SHOP_TIMEZONE)
+        ao_confirmar (callable): Chamado com o total de atendimentos
+            preenchidos após cada bloco confirmado
+    
+    Returns:
+        int: Quantidade de atendimentos preenchidos
+    """
+    from sqlalchemy import bindparam, func, select, true, update
+    from src.models.atendimento import Atendimento, periodo_entrada
+    from src.utils.fuso_horario import ConversorLocal
+    
+    tabela = Atendimento.__table__
+    pendentes = true() if recalcular else tabela.c.dia.is_(None)
+    with engine.connect() as conexao:
+        menor, maior = conexao.execute(
+            select(func.min(tabela.c.id), func.max(tabela.c.id)).where(pendentes)
+        ).one()
+    if menor is None:
+        return 0
+    
+    local = ConversorLocal()
+    
+    def hora_local(texto):
+        """Data gravada pelo SQLAlchemy (texto em UTC) -> texto no horário local."""
+        return local(datetime.fromisoformat(texto)).isoformat(' ') if texto else None
+    
+    if engine.dialect.name == 'sqlite':
+        valores = {
+            'dia': text('date(hora_local(data_entrada))'),
+            'dia_semana': text("(CAST(strftime('%w', hora_local(data_entrada)) AS INTEGER) + 6) % 7"),
+            'hora': text("CAST(strftime('%H', hora_local(data_entrada)) AS INTEGER)")
+        }
+    
+    total = 0
+    for inicio in range(menor, maior + 1, tamanho_bloco):
+        bloco = (tabela.c.id >= inicio, tabela.c.id < inicio + tamanho_bloco, pendentes)
+        with engine.begin() as conexao:
+            if engine.dialect.name == 'sqlite':
+                conexao.connection.driver_connection.create_function('hora_local', 1, hora_local, deterministic=True)
+                total += conexao.execute(update(tabela).where(*bloco).values(valores)).rowcount
+            else:
+                linhas = [
+                    {'id_linha': atendimento_id, **periodo_entrada(data_entrada, local)}
+                    for atendimento_id, data_entrada in conexao.execute(select(tabela.c.id, tabela.c.data_entrada).where(*bloco))
+                ]
+                if linhas:
+                    conexao.execute(
+                        update(tabela).where(tabela.c.id == bindparam('id_linha'))
+                        .values(dia=bindparam('dia'), dia_semana=bindparam('dia_semana'), hora=bindparam('hora')),
+                        linhas
+                    )
+                total += len(linhas)
+        if ao_confirmar:
+            ao_confirmar(total)
+    
+    logger.info('Colunas de período preenchidas nos atendimentos',
+                extra={'dados': {'ids': [menor, maior], 'atendimentos': total, 'banco': str(engine.url)}})
+    return total
+
+def criar_indices_atendimentos(engine):
+    """
+    Cria os índices do histórico de atendimentos que ainda não existem.
+    
+    Em bancos antigos a criação percorre todo o histórico, por isso roda
+    no comando preencher-periodos, depois do preenchimento, e não na
+    inicialização (bancos novos já recebem os índices no create_all).
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se algum índice foi criado agora
+    """
+    from src.models.atendimento import Atendimento
+    
+    indices = {indice['name'] for indice in inspect(engine).get_indexes('atendimentos')}
+    criados = [indice for indice in Atendimento.__table__.indexes if indice.name not in indices]
+    for indice in criados:
+        indice.create(engine, checkfirst=True)
+    
+    return bool(criados)
+
+# Índice de texto dos nomes de clientes (fila e histórico), só no SQLite.
+# O rowid codifica a origem: ID * 2 para clientes e ID * 2 + 1 para atendimentos
+TABELA_BUSCA = 'busca_clientes'
+ORIGENS_BUSCA = (('clientes', 'nome', 0), ('atendimentos', 'nome_cliente', 1))
+
+# Com uma linha nesta tabela (só dentro da transação de uma carga em massa)
+# os gatilhos de inserção não indexam: a carga indexa cada lote de uma vez
+TABELA_PAUSA_BUSCA = 'busca_clientes_pausa'
+
+def criar_busca_clientes(engine):
+    """
+    Cria o índice FTS5 dos nomes de clientes e os gatilhos que o mantêm.
+    
+    A tabela é contentless (guarda só o índice, os nomes ficam nas
+    tabelas de origem). Acentos e maiúsculas são ignorados (unicode61
+    com remove_diacritics) e os prefixos de 2 a 4 letras são indexados
+    para a busca enquanto o nome é digitado. Na criação, os nomes já
+    gravados são indexados.
+    
+    O FTS5 descarrega o índice em memória ao fim de cada comando, então
+    um gatilho por linha em um executemany de milhares de linhas fica
+    dezenas de vezes mais lento que indexar o lote com um só INSERT ...
+    SELECT; por isso o gatilho de inserção respeita TABELA_PAUSA_BUSCA
+    (ver src/services/busca.py, IndexacaoEmLote).
+    
+    Args:
+        engine (Engine): Engine do banco
+    
+    Returns:
+        bool: True se o índice foi criado agora
+    """
+    if engine.dialect.name != 'sqlite':
+        return False
+    
+    with transacao_imediata_sqlite(engine) as conexao:
+        if _sql_tabela(conexao, TABELA_BUSCA) is not None:
+            return False
+        
+        conexao.execute(
+            f"CREATE VIRTUAL TABLE {TABELA_BUSCA} USING fts5("
+            f"nome, content='', tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+        )
+        conexao.execute(f'CREATE TABLE {TABELA_PAUSA_BUSCA} (pausada INTEGER NOT NULL)')
+        for tabela, coluna, origem in ORIGENS_BUSCA:
+            linha = f'{{registro}}.id * 2 + {origem}'
+            inserir = (f'INSERT INTO {TABELA_BUSCA} (rowid, nome) '
+                       f'VALUES ({linha.format(registro="new")}, new.{coluna});')
+            remover = (f"INSERT INTO {TABELA_BUSCA} ({TABELA_BUSCA}, rowid, nome) "
+                       f"VALUES ('delete', {linha.format(registro='old')}, old.{coluna});")
+            conexao.execute(f'CREATE TRIGGER {tabela}_busca_ai AFTER INSERT ON {tabela} '
+                            f'WHEN NOT EXISTS (SELECT 1 FROM {TABELA_PAUSA_BUSCA}) BEGIN {inserir} END')
+            conexao.execute(f'CREATE TRIGGER {tabela}_busca_ad AFTER DELETE ON {tabela} BEGIN {remover} END')
+            conexao.execute(f'CREATE TRIGGER {tabela}_busca_au AFTER UPDATE OF {coluna} ON {tabela} '
+                            f'BEGIN {remover} {inserir} END')
+            conexao.execute(f'INSERT INTO {TABELA_BUSCA} (rowid, nome) '
+                            f'SELECT id * 2 + {origem}, {coluna} FROM {tabela}')
+    
+    logger.info('Índice de busca de clientes criado', extra={'dados': {'banco': str(engine.url)}})
+    return True
+
+# Migrações na ordem em que devem ser aplicadas
+MIGRACOES = (
+    remover_chave_cliente_atendimentos,
+    migrar_clientes_arquivados,
+    adicionar_contadores_barbeiros,
+    adicionar_colunas_escalonador,
+    adicionar_prioridades_clientes,
+    adicionar_periodo_atendimentos,
+    criar_busca_clientes,
+)
+
+def aplicar_migracoes(engine):
+    """
+    Aplica as migrações pendentes (chamado após o create_all).
+    
+    Args:
+        engine (Engine): Engine do banco
+    """
+    for migracao in MIGRACOES:
+        migracao(engine)
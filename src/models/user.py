@@ -1,6 +1,23 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
 
-db = SQLAlchemy()
+class SQLAlchemyLojas(SQLAlchemy):
+    """
+    SQLAlchemy que usa o banco da loja atual no modo multi-loja.
+    
+    Quando uma loja foi associada ao contexto (g.loja), a sessão, db.engine
+    e as consultas passam a usar o engine dessa loja; caso contrário, o
+    banco configurado em SQLALCHEMY_DATABASE_URI.
+    """
+
+    @property
+    def engines(self):
+        loja = g.get('loja') if has_app_context() else None
+        if loja is not None:
+            return loja.engines
+        return super().engines
+
+db = SQLAlchemyLojas()
 
 class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -0,0 +1,363 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Rotas da API: Agendamentos
+
+Este arquivo contém as rotas da API REST para marcar, listar e
+cancelar horários e para registrar a chegada do cliente agendado,
+que então entra na fila com prioridade.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from flask import Blueprint, jsonify, request
+from src.models.user import db
+from src.models.agendamento import Agendamento
+from src.models.barbeiro import Barbeiro
+from src.models.cliente import Cliente, PRIORIDADES
+from src.services.agenda import STATUS_AGENDA, agenda
+from src.services.estatisticas import estatisticas_fila
+from src.services.fila import posicionar_cliente, registrar_entrada_fila
+from src.utils.orcamento_consultas import orcamento_consultas
+from datetime import datetime, timedelta, timezone
+
+# Criação do blueprint para as rotas de agendamentos
+agendamento_bp = Blueprint('agendamento', __name__)
+
+# Duração máxima de um agendamento (o índice de intervalos depende dela)
+DURACAO_MAXIMA_MINUTOS = 24 * 60
+
+def converter_horario(valor):
+    """
+    Converte um horário ISO 8601 para o formato gravado no banco (UTC sem fuso).
+    
+    Horários sem fuso são considerados UTC, como as demais datas do sistema.
+    
+    Args:
+        valor (str): Horário, ex.: '2024-05-10T15:30' ou '2024-05-10T15:30-03:00'
+    
+    Returns:
+        datetime: Horário em UTC, ou None se inválido
+    """
+    try:
+        horario = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        return None
+    if horario.tzinfo is not None:
+        horario = horario.astimezone(timezone.utc).replace(tzinfo=None)
+    return horario
+
+@agendamento_bp.route('/agendamentos', methods=['POST'])
+@orcamento_consultas(7)
+def criar_agendamento():
+    """
+    Marca um horário com um barbeiro.
+    
+    Endpoint: POST /api/agendamentos
+    
+    Body (JSON):
+    {
+        "nome": "Nome do Cliente",
+        "barbeiro_id": 1,
+        "inicio": "2024-05-10T15:30",
+        "duracao_minutos": 30          // opcional
+    }
+    
+    Horários que se sobrepõem a outro agendamento do barbeiro são
+    recusados (409). Se a fila prevista do barbeiro ainda não tiver
+    terminado no horário marcado, o agendamento é criado e a resposta
+    traz o conflito em 'conflitos.fila'.
+    
+    Returns:
+        JSON: Dados do agendamento e conflitos com a fila
+    """
+    try:
+        dados = request.get_json()
+        
+        # Validação dos dados obrigatórios
+        for campo in ['nome', 'barbeiro_id', 'inicio']:
+            if not dados or campo not in dados:
+                return jsonify({
+                    'erro': f'Campo {campo} é obrigatório',
+                    'status': 'erro'
+                }), 400
+        
+        nome = str(dados['nome']).strip()
+        barbeiro_id = dados['barbeiro_id']
+        inicio = converter_horario(dados['inicio'])
+        duracao = dados.get('duracao_minutos', agenda.duracao_padrao)
+        
+        if len(nome) < 2:
+            return jsonify({
+                'erro': 'Nome deve ter pelo menos 2 caracteres',
+                'status': 'erro'
+            }), 400
+        
+        if inicio is None:
+            return jsonify({
+                'erro': 'Horário inválido. Use o formato ISO 8601 (ex.: 2024-05-10T15:30)',
+                'status': 'erro'
+            }), 400
+        
+        agora = datetime.utcnow()
+        if inicio <= agora:
+            return jsonify({
+                'erro': 'O horário deve estar no futuro',
+                'status': 'erro'
+            }), 400
+        
+        if not isinstance(duracao, int) or isinstance(duracao, bool) or not 0 < duracao <= DURACAO_MAXIMA_MINUTOS:
+            return jsonify({
+                'erro': f'duracao_minutos deve ser um número inteiro entre 1 e {DURACAO_MAXIMA_MINUTOS}',
+                'status': 'erro'
+            }), 400
+        
+        barbeiro = db.session.get(Barbeiro, barbeiro_id)
+        if not barbeiro:
+            return jsonify({
+                'erro': 'Barbeiro não encontrado',
+                'status': 'erro'
+            }), 404
+        
+        fim = inicio + timedelta(minutes=duracao)
+        conflitos = agenda.verificar_conflitos(barbeiro_id, inicio, fim, agora)
+        if conflitos['agendamentos']:
+            return jsonify({
+                'erro': 'Horário indisponível: já existe agendamento neste intervalo',
+                'conflitos': conflitos,
+                'status': 'erro'
+            }), 409
+        
+        agendamento = Agendamento(nome=nome, barbeiro_id=barbeiro_id, inicio=inicio, duracao_minutos=duracao)
+        db.session.add(agendamento)
+        db.session.flush()
+        
+        # Confirma no banco, já com a trava de escrita, que nenhum
+        # agendamento sobreposto foi criado por outro worker
+        vizinhos = db.session.query(Agendamento.inicio, Agendamento.duracao_minutos).filter(
+            Agendamento.barbeiro_id == barbeiro_id,
+            Agendamento.id != agendamento.id,
+            Agendamento.status.in_(STATUS_AGENDA),
+            Agendamento.inicio < fim,
+            Agendamento.inicio > inicio - timedelta(minutes=DURACAO_MAXIMA_MINUTOS)
+        ).all()
+        if any(outro_inicio + timedelta(minutes=outra_duracao) > inicio for outro_inicio, outra_duracao in vizinhos):
+            db.session.rollback()
+            return jsonify({
+                'erro': 'Horário indisponível: já existe agendamento neste intervalo',
+                'status': 'erro'
+            }), 409
+        
+        agendamento_data = agendamento.to_dict()
+        barbeiro_data = barbeiro.to_dict()
+        db.session.commit()
+        
+        return jsonify({
+            'agendamento': agendamento_data,
+            'barbeiro': barbeiro_data,
+            'conflitos': conflitos,
+            'mensagem': f'Horário de {nome} marcado com {barbeiro.nome}',
+            'status': 'sucesso'
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'erro': 'Erro ao criar agendamento',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
+
+@agendamento_bp.route('/agendamentos', methods=['GET'])
+@orcamento_consultas(2)
+def listar_agendamentos():
+    """
+    Lista os agendamentos de um dia.
+    
+    Endpoint: GET /api/agendamentos
+    
+    Query Parameters:
+        - data: Dia (formato: YYYY-MM-DD, padrão: hoje)
+        - barbeiro_id: Filtrar por barbeiro
+        - status: Filtrar por status ('agendado', 'presente', 'cancelado')
+    
+    Returns:
+        JSON: Agendamentos do dia em ordem de horário
+    """
+    try:
+        data = request.args.get('data')
+        barbeiro_id = request.args.get('barbeiro_id', type=int)
+        status = request.args.get('status')
+        
+        try:
+            dia = datetime.strptime(data, '%Y-%m-%d') if data else datetime.utcnow().replace(
+                hour=0, minute=0, second=0, microsecond=0)
+        except ValueError:
+            return jsonify({
+                'erro': 'Formato de data inválido. Use YYYY-MM-DD',
+                'status': 'erro'
+            }), 400
+        
+        query = Agendamento.query.filter(
+            Agendamento.inicio >= dia,
+            Agendamento.inicio < dia + timedelta(days=1)
+        )
+        if barbeiro_id:
+            query = query.filter(Agendamento.barbeiro_id == barbeiro_id)
+        if status:
+            query = query.filter(Agendamento.status == status)
+        
+        agendamentos = [agendamento.to_dict() for agendamento in query.order_by(Agendamento.inicio).all()]
+        
+        return jsonify({
+            'agendamentos': agendamentos,
+            'data': dia.date().isoformat(),
+            'total': len(agendamentos),
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'erro': 'Erro ao listar agendamentos',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
+
+@agendamento_bp.route('/agendamentos/<int:agendamento_id>/chegada', methods=['POST'])
+@orcamento_consultas(10)
+def registrar_chegada(agendamento_id):
+    """
+    Registra a chegada do cliente agendado e o coloca na fila.
+    
+    Endpoint: POST /api/agendamentos/<id>/chegada
+    
+    O cliente entra na fila do barbeiro com a prioridade 'agendado',
+    à frente dos clientes sem horário marcado.
+    
+    Body (JSON):
+    {
+        "numero_ficha": 123
+    }
+    
+    Args:
+        agendamento_id (int): ID do agendamento
+    
+    Returns:
+        JSON: Cliente criado e sua posição na fila
+    """
+    try:
+        dados = request.get_json(silent=True) or {}
+        numero_ficha = dados.get('numero_ficha')
+        
+        if not isinstance(numero_ficha, int) or isinstance(numero_ficha, bool) or numero_ficha <= 0:
+            return jsonify({
+                'erro': 'Número da ficha deve ser um número inteiro positivo',
+                'status': 'erro'
+            }), 400
+        
+        agendamento = db.session.get(Agendamento, agendamento_id)
+        if not agendamento:
+            return jsonify({
+                'erro': 'Agendamento não encontrado',
+                'status': 'erro'
+            }), 404
+        
+        if agendamento.status != 'agendado':
+            return jsonify({
+                'erro': f'Agendamento não está aguardando chegada (status: {agendamento.status})',
+                'status': 'erro'
+            }), 400
+        
+        barbeiro = db.session.get(Barbeiro, agendamento.barbeiro_id)
+        if not barbeiro or not barbeiro.ativo:
+            return jsonify({
+                'erro': 'Barbeiro não está ativo no momento',
+                'status': 'erro'
+            }), 400
+        
+        if Cliente.query.filter_by(numero_ficha=numero_ficha).first():
+            return jsonify({
+                'erro': 'Número da ficha já está em uso',
+                'status': 'erro'
+            }), 409
+        
+        registrar_entrada_fila(agendamento.barbeiro_id)
+        cliente = Cliente(
+            nome=agendamento.nome,
+            numero_ficha=numero_ficha,
+            barbeiro_id=agendamento.barbeiro_id,
+            prioridade=PRIORIDADES['agendado'],
+            horario_agendado=agendamento.inicio
+        )
+        db.session.add(cliente)
+        posicao_fila = posicionar_cliente(cliente)
+        
+        agendamento.status = 'presente'
+        agendamento.cliente_id = cliente.id
+        
+        cliente_data = cliente.to_dict()
+        db.session.commit()
+        estatisticas_fila.ajustar(clientes_aguardando=1)
+        
+        return jsonify({
+            'cliente': cliente_data,
+            'agendamento': agendamento.to_dict(),
+            'posicao_fila': posicao_fila,
+            'mensagem': f'Cliente {cliente_data["nome"]} (agendado) entrou na fila do {barbeiro.nome}',
+            'status': 'sucesso'
+        }), 201
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'erro': 'Erro ao registrar chegada',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
+
+@agendamento_bp.route('/agendamentos/<int:agendamento_id>/cancelar', methods=['PUT'])
+@orcamento_consultas(3)
+def cancelar_agendamento(agendamento_id):
+    """
+    Desmarca um horário.
+    
+    Endpoint: PUT /api/agendamentos/<id>/cancelar
+    
+    Args:
+        agendamento_id (int): ID do agendamento
+    
+    Returns:
+        JSON: Confirmação do cancelamento
+    """
+    try:
+        agendamento = db.session.get(Agendamento, agendamento_id)
+        if not agendamento:
+            return jsonify({
+                'erro': 'Agendamento não encontrado',
+                'status': 'erro'
+            }), 404
+        
+        if agendamento.status != 'agendado':
+            return jsonify({
+                'erro': f'Agendamento não pode ser cancelado (status: {agendamento.status})',
+                'status': 'erro'
+            }), 400
+        
+        agendamento.status = 'cancelado'
+        agendamento_data = agendamento.to_dict()
+        db.session.commit()
+        
+        return jsonify({
+            'agendamento': agendamento_data,
+            'mensagem': f'Horário de {agendamento_data["nome"]} foi cancelado',
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'erro': 'Erro ao cancelar agendamento',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
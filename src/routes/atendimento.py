@@ -10,19 +10,101 @@ ATENÇÃO: Este código é propriedade intelectual protegida.
 Uso não autorizado é proibido por lei.
 """
 
-from flask import Blueprint, jsonify, request, send_file
+from flask import Blueprint, current_app, jsonify, request, send_file
 from src.models.user import db
 from src.models.atendimento import Atendimento
 from src.models.barbeiro import Barbeiro
+from src.services.estatisticas import estatisticas_fila
+from src.services.historico import InseridorHistorico
+from src.services.importacao import CABECALHO_CSV, ErroImportacao, ImportadorAtendimentos
+from src.services.lojas import chave_loja
+from src.services.notificacoes import barramento
+from src.services.relatorios import comparar_periodos, mapa_calor, utilizacao_por_dia
+from src.utils.fuso_horario import hoje_local
+from src.utils.orcamento_consultas import orcamento_consultas
 from datetime import datetime, timedelta
+import calendar
 import csv
 import io
 import os
+import time
 
 # Criação do blueprint para as rotas de atendimentos
 atendimento_bp = Blueprint('atendimento', __name__)
 
+# Nomes dos dias da semana (0 = segunda-feira, como Atendimento.dia_semana)
+DIAS_SEMANA = ('Segunda', 'Terça', 'Quarta', 'Quinta', 'Sexta', 'Sábado', 'Domingo')
+
+# Períodos aceitos pelo relatório comparativo
+PERIODOS_NOMEADOS = ('hoje', 'ontem', 'semana', 'semana_anterior', 'mes', 'mes_anterior', 'mes_ano_anterior')
+MAXIMO_PERIODOS = 12
+
+def _mesmo_dia(ano, mes, dia):
+    """Data do mesmo dia em outro mês, limitada ao último dia do mês (ex.: 31 -> 30)."""
+    return datetime(ano, mes, min(dia, calendar.monthrange(ano, mes)[1])).date()
+
+def converter_periodo(texto, hoje):
+    """
+    Converte um período do relatório comparativo em (primeiro dia, último dia).
+    
+    Aceita um intervalo 'AAAA-MM-DD:AAAA-MM-DD' (dias incluídos) ou um
+    nome de PERIODOS_NOMEADOS. 'semana' são os últimos 7 dias; 'mes' vai
+    do dia 1 até hoje, e 'mes_anterior' e 'mes_ano_anterior' cobrem os
+    mesmos dias do mês anterior e do mesmo mês no ano anterior, para
+    comparar períodos de mesmo tamanho.
+    
+    Args:
+        texto (str): Período informado
+        hoje (date): Dia de referência
+    
+    Returns:
+        tuple: (primeiro dia, último dia)
+    
+    Raises:
+        ValueError: Período inválido
+    """
+    texto = texto.strip()
+    if texto == 'hoje':
+        return hoje, hoje
+    if texto == 'ontem':
+        return hoje - timedelta(days=1), hoje - timedelta(days=1)
+    if texto == 'semana':
+        return hoje - timedelta(days=6), hoje
+    if texto == 'semana_anterior':
+        return hoje - timedelta(days=13), hoje - timedelta(days=7)
+    if texto == 'mes':
+        return hoje.replace(day=1), hoje
+    if texto == 'mes_anterior':
+        ano, mes = (hoje.year, hoje.month - 1) if hoje.month > 1 else (hoje.year - 1, 12)
+        return datetime(ano, mes, 1).date(), _mesmo_dia(ano, mes, hoje.day)
+    if texto == 'mes_ano_anterior':
+        return datetime(hoje.year - 1, hoje.month, 1).date(), _mesmo_dia(hoje.year - 1, hoje.month, hoje.day)
+    
+    try:
+        inicio, fim = texto.split(':')
+        primeiro_dia = datetime.strptime(inicio, '%Y-%m-%d').date()
+        ultimo_dia = datetime.strptime(fim, '%Y-%m-%d').date()
+    except ValueError:
+        raise ValueError(f'Período inválido: {texto}. Use AAAA-MM-DD:AAAA-MM-DD ou um de: '
+                         f'{", ".join(PERIODOS_NOMEADOS)}')
+    if primeiro_dia > ultimo_dia:
+        raise ValueError(f'Período com início depois do fim: {texto}')
+    return primeiro_dia, ultimo_dia
+
+def mapa_nomes_barbeiros():
+    """
+    Carrega o nome de todos os barbeiros em uma única consulta.
+    
+    Evita buscar o barbeiro de cada atendimento dentro dos laços
+    de relatório (padrão N+1).
+    
+    Returns:
+        dict: Nome do barbeiro indexado pelo ID
+    """
+    return dict(db.session.query(Barbeiro.id, Barbeiro.nome).all())
+
 @atendimento_bp.route('/atendimentos', methods=['GET'])
+@orcamento_consultas(3)
 def listar_atendimentos():
     """
     Lista todos os atendimentos com filtros opcionais.
@@ -105,6 +187,7 @@ def listar_atendimentos():
         }), 500
 
 @atendimento_bp.route('/atendimentos/<int:atendimento_id>', methods=['GET'])
+@orcamento_consultas(2)
 def obter_atendimento(atendimento_id):
     """
     Obtém os dados de um atendimento específico.
@@ -133,7 +216,90 @@ def obter_atendimento(atendimento_id):
             'status': 'erro'
         }), 404
 
+@atendimento_bp.route('/atendimentos/importar', methods=['POST'])
+@orcamento_consultas(None, repeticoes=0)
+def importar_atendimentos():
+    """
+    Importa o histórico de atendimentos de outro sistema.
+    
+    Endpoint: POST /api/atendimentos/importar
+    
+    O corpo da requisição é o próprio arquivo, lido como fluxo (sem
+    carregá-lo inteiro na memória):
+        - CSV no layout de /api/relatorios/exportar-csv (Content-Type: text/csv)
+        - NDJSON, um atendimento por linha (Content-Type: application/x-ndjson)
+    
+    Query Parameters:
+        - formato: 'csv' ou 'ndjson' (padrão: pelo Content-Type)
+        - criar_barbeiros: Cria barbeiros desconhecidos, inativos (padrão: true)
+    
+    As linhas são gravadas em lotes e confirmadas a cada IMPORT_ROWS_PER_TRANSACTION
+    linhas; para arquivos muito grandes prefira o comando
+    `flask importar-atendimentos`, que não está sujeito ao tempo limite
+    das requisições.
+    
+    Uma falha que interrompe a importação (banco, arquivo fora do UTF-8)
+    mantém os lotes já confirmados; a resposta de erro informa quantos
+    em 'importadas', para não reenviar o arquivo inteiro.
+    
+    Returns:
+        JSON: Linhas importadas e rejeitadas (com as primeiras falhas)
+    """
+    importador = None
+    try:
+        formato = request.args.get('formato')
+        if not formato:
+            formato = 'ndjson' if 'json' in (request.mimetype or '') else 'csv'
+        criar_barbeiros = request.args.get('criar_barbeiros', 'true').lower() != 'false'
+        
+        arquivo = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+        inicio = time.perf_counter()
+        
+        with db.engine.connect() as conexao:
+            inseridor = InseridorHistorico(
+                conexao,
+                tamanho_lote=current_app.config.get('IMPORT_BATCH_SIZE', 10000),
+                linhas_por_transacao=current_app.config.get('IMPORT_ROWS_PER_TRANSACTION', 200000),
+                ao_confirmar=lambda inseridor: current_app.logger.info(
+                    'Importação de atendimentos: %d linhas gravadas', inseridor.total_atendimentos)
+            )
+            importador = ImportadorAtendimentos(inseridor, criar_barbeiros=criar_barbeiros)
+            importador.importar(arquivo, formato)
+        
+        if importador.importadas:
+            barramento.publicar('atendimentos', chave_loja())
+        if importador.barbeiros_criados:
+            barramento.publicar('barbeiros', chave_loja())
+            estatisticas_fila.ajustar(total_barbeiros=len(importador.barbeiros_criados))
+        
+        duracao = time.perf_counter() - inicio
+        return jsonify({
+            'importadas': importador.importadas,
+            'rejeitadas': importador.rejeitadas,
+            'erros': importador.erros,
+            'barbeiros_criados': importador.barbeiros_criados,
+            'duracao_segundos': round(duracao, 2),
+            'linhas_por_segundo': round(importador.importadas / duracao) if duracao else 0,
+            'status': 'sucesso'
+        }), 200
+    
+    except ErroImportacao as e:
+        return jsonify({
+            'erro': str(e),
+            'importadas': importador.confirmadas if importador else 0,
+            'status': 'erro'
+        }), 400
+    
+    except Exception as e:
+        return jsonify({
+            'erro': 'Erro ao importar atendimentos',
+            'detalhes': str(e),
+            'importadas': importador.confirmadas if importador else 0,
+            'status': 'erro'
+        }), 500
+
 @atendimento_bp.route('/relatorios/estatisticas', methods=['GET'])
+@orcamento_consultas(2)
 def obter_estatisticas():
     """
     Obtém estatísticas gerais dos atendimentos.
@@ -195,13 +361,13 @@ def obter_estatisticas():
         tempo_medio_atendimento = sum(tempos_atendimento) / len(tempos_atendimento) if tempos_atendimento else 0
         
         # Estatísticas por barbeiro
+        nomes_barbeiros = mapa_nomes_barbeiros()
         estatisticas_barbeiros = {}
         for atendimento in atendimentos:
             barbeiro_id_atual = atendimento.barbeiro_id
             if barbeiro_id_atual not in estatisticas_barbeiros:
-                barbeiro = Barbeiro.query.get(barbeiro_id_atual)
                 estatisticas_barbeiros[barbeiro_id_atual] = {
-                    'nome_barbeiro': barbeiro.nome if barbeiro else 'Desconhecido',
+                    'nome_barbeiro': nomes_barbeiros.get(barbeiro_id_atual, 'Desconhecido'),
                     'total_atendimentos': 0,
                     'tempo_total_espera': 0,
                     'tempo_total_atendimento': 0
@@ -241,6 +407,7 @@ def obter_estatisticas():
         }), 500
 
 @atendimento_bp.route('/relatorios/exportar-csv', methods=['GET'])
+@orcamento_consultas(2)
 def exportar_csv():
     """
     Exporta os atendimentos para um arquivo CSV.
@@ -294,25 +461,13 @@ def exportar_csv():
         output = io.StringIO()
         writer = csv.writer(output)
         
-        # Cabeçalho do CSV
-        writer.writerow([
-            'ID',
-            'Número da Ficha',
-            'Nome do Cliente',
-            'ID do Barbeiro',
-            'Nome do Barbeiro',
-            'Data de Entrada',
-            'Data de Início',
-            'Data de Fim',
-            'Tempo de Espera (min)',
-            'Tempo de Atendimento (min)',
-            'Tempo Total (min)'
-        ])
+        # Cabeçalho do CSV (o mesmo aceito pela importação)
+        writer.writerow(CABECALHO_CSV)
         
         # Dados dos atendimentos
+        nomes_barbeiros = mapa_nomes_barbeiros()
         for atendimento in atendimentos:
-            barbeiro = Barbeiro.query.get(atendimento.barbeiro_id)
-            nome_barbeiro = barbeiro.nome if barbeiro else 'Desconhecido'
+            nome_barbeiro = nomes_barbeiros.get(atendimento.barbeiro_id, 'Desconhecido')
             
             writer.writerow([
                 atendimento.id,
@@ -355,6 +510,7 @@ def exportar_csv():
         }), 500
 
 @atendimento_bp.route('/relatorios/resumo-diario', methods=['GET'])
+@orcamento_consultas(2)
 def obter_resumo_diario():
     """
     Obtém um resumo dos atendimentos do dia atual.
@@ -376,13 +532,13 @@ def obter_resumo_diario():
         ).all()
         
         # Resumo por barbeiro
+        nomes_barbeiros = mapa_nomes_barbeiros()
         resumo_barbeiros = {}
         for atendimento in atendimentos_hoje:
             barbeiro_id = atendimento.barbeiro_id
             if barbeiro_id not in resumo_barbeiros:
-                barbeiro = Barbeiro.query.get(barbeiro_id)
                 resumo_barbeiros[barbeiro_id] = {
-                    'nome_barbeiro': barbeiro.nome if barbeiro else 'Desconhecido',
+                    'nome_barbeiro': nomes_barbeiros.get(barbeiro_id, 'Desconhecido'),
                     'atendimentos': 0,
                     'tempo_total_trabalho': 0,
                     'primeiro_atendimento': None,
@@ -426,3 +582,335 @@ def obter_resumo_diario():
             'status': 'erro'
         }), 500
 
+
+@atendimento_bp.route('/relatorios/utilizacao', methods=['GET'])
+@orcamento_consultas(4)
+def obter_utilizacao():
+    """
+    Obtém a utilização dos barbeiros: minutos ocupados e ociosos dentro
+    do horário de funcionamento e o máximo de barbeiros atendendo ao
+    mesmo tempo.
+    
+    Endpoint: GET /api/relatorios/utilizacao
+    
+    Query Parameters:
+        - data_inicio: Primeiro dia (formato: YYYY-MM-DD, padrão: 6 dias atrás)
+        - data_fim: Último dia (formato: YYYY-MM-DD, padrão: hoje)
+        - barbeiro_id: Filtrar por barbeiro
+        - abertura / fechamento: Horário de funcionamento em horas
+          (padrão: BUSINESS_OPENING_HOUR e BUSINESS_CLOSING_HOUR)
+    
+    Dias, horário de funcionamento e pico_em estão no fuso da barbearia
+    (SHOP_TIMEZONE), não em UTC como as datas gravadas.
+    
+    Os minutos disponíveis de um barbeiro contam apenas os dias em que
+    ele fez algum atendimento. Dias encerrados são calculados uma vez e
+    servidos do cache nas consultas seguintes.
+    
+    Returns:
+        JSON: Utilização por barbeiro, pico por dia e totais do período
+    """
+    try:
+        barbeiro_id = request.args.get('barbeiro_id', type=int)
+        abertura = request.args.get('abertura', current_app.config.get('BUSINESS_OPENING_HOUR', 9), type=int)
+        fechamento = request.args.get('fechamento', current_app.config.get('BUSINESS_CLOSING_HOUR', 20), type=int)
+        
+        hoje = hoje_local()
+        try:
+            data_fim = datetime.strptime(request.args['data_fim'], '%Y-%m-%d').date() \
+                if request.args.get('data_fim') else hoje
+            data_inicio = datetime.strptime(request.args['data_inicio'], '%Y-%m-%d').date() \
+                if request.args.get('data_inicio') else data_fim - timedelta(days=6)
+        except ValueError:
+            return jsonify({
+                'erro': 'Formato de data inválido. Use YYYY-MM-DD',
+                'status': 'erro'
+            }), 400
+        
+        if data_inicio > data_fim:
+            return jsonify({
+                'erro': 'data_inicio deve ser anterior ou igual a data_fim',
+                'status': 'erro'
+            }), 400
+        
+        if not 0 <= abertura < fechamento <= 24:
+            return jsonify({
+                'erro': 'Horário de funcionamento inválido (0 <= abertura < fechamento <= 24)',
+                'status': 'erro'
+            }), 400
+        
+        dias, dias_em_cache = utilizacao_por_dia(data_inicio, data_fim, abertura, fechamento)
+        minutos_por_dia = (fechamento - abertura) * 60
+        
+        # Totais por barbeiro no período
+        nomes_barbeiros = mapa_nomes_barbeiros()
+        por_barbeiro = {}
+        for resultado in dias.values():
+            for id_barbeiro, segundos in resultado['ocupado'].items():
+                if barbeiro_id and id_barbeiro != barbeiro_id:
+                    continue
+                totais = por_barbeiro.setdefault(id_barbeiro, {'segundos': 0, 'dias': 0})
+                totais['segundos'] += segundos
+                totais['dias'] += 1
+        
+        utilizacao_barbeiros = []
+        for id_barbeiro, totais in sorted(por_barbeiro.items()):
+            ocupados = totais['segundos'] / 60
+            disponiveis = totais['dias'] * minutos_por_dia
+            utilizacao_barbeiros.append({
+                'barbeiro_id': id_barbeiro,
+                'nome_barbeiro': nomes_barbeiros.get(id_barbeiro, 'Desconhecido'),
+                'dias_trabalhados': totais['dias'],
+                'minutos_disponiveis': disponiveis,
+                'minutos_ocupados': round(ocupados, 1),
+                'minutos_ociosos': round(disponiveis - ocupados, 1),
+                'utilizacao_percentual': round(100 * ocupados / disponiveis, 1) if disponiveis else 0
+            })
+        
+        picos = [
+            {
+                'data': dia.isoformat(),
+                'barbeiros_simultaneos': resultado['pico'],
+                'pico_em': resultado['pico_em'].strftime('%H:%M') if resultado['pico_em'] else None
+            }
+            for dia, resultado in sorted(dias.items())
+        ]
+        maior_pico = max(picos, key=lambda item: item['barbeiros_simultaneos'])
+        
+        total_ocupados = sum(item['minutos_ocupados'] for item in utilizacao_barbeiros)
+        total_disponiveis = sum(item['minutos_disponiveis'] for item in utilizacao_barbeiros)
+        
+        return jsonify({
+            'utilizacao_por_barbeiro': utilizacao_barbeiros,
+            'picos_por_dia': picos,
+            'resumo': {
+                'minutos_ocupados': round(total_ocupados, 1),
+                'minutos_ociosos': round(total_disponiveis - total_ocupados, 1),
+                'utilizacao_percentual': round(100 * total_ocupados / total_disponiveis, 1) if total_disponiveis else 0,
+                'maximo_barbeiros_simultaneos': maior_pico['barbeiros_simultaneos'],
+                'maximo_em': f'{maior_pico["data"]} {maior_pico["pico_em"]}' if maior_pico['pico_em'] else None
+            },
+            'horario_funcionamento': {'abertura': abertura, 'fechamento': fechamento},
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': data_fim.isoformat(),
+            'dias_em_cache': dias_em_cache,
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'erro': 'Erro ao calcular utilização dos barbeiros',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
+
+@atendimento_bp.route('/relatorios/mapa-calor', methods=['GET'])
+@orcamento_consultas(3)
+def obter_mapa_calor():
+    """
+    Obtém as chegadas e a espera por dia da semana e hora, para
+    decidir quantos barbeiros escalar em cada horário.
+    
+    Endpoint: GET /api/relatorios/mapa-calor
+    
+    Query Parameters:
+        - data_inicio: Primeiro dia (formato: YYYY-MM-DD, padrão: 27 dias atrás)
+        - data_fim: Último dia (formato: YYYY-MM-DD, padrão: hoje)
+        - barbeiro_id: Filtrar por barbeiro
+    
+    Dias, dias da semana e horas são os do fuso da barbearia
+    (SHOP_TIMEZONE). As chegadas médias dividem o total pelo número de
+    vezes que o dia da semana aparece no período. Períodos encerrados
+    são servidos do cache.
+    
+    Returns:
+        JSON: Células (dia da semana x hora) e a matriz 7 x 24 de chegadas médias
+    """
+    try:
+        barbeiro_id = request.args.get('barbeiro_id', type=int)
+        
+        hoje = hoje_local()
+        try:
+            data_fim = datetime.strptime(request.args['data_fim'], '%Y-%m-%d').date() \
+                if request.args.get('data_fim') else hoje
+            data_inicio = datetime.strptime(request.args['data_inicio'], '%Y-%m-%d').date() \
+                if request.args.get('data_inicio') else data_fim - timedelta(days=27)
+        except ValueError:
+            return jsonify({
+                'erro': 'Formato de data inválido. Use YYYY-MM-DD',
+                'status': 'erro'
+            }), 400
+        
+        if data_inicio > data_fim:
+            return jsonify({
+                'erro': 'data_inicio deve ser anterior ou igual a data_fim',
+                'status': 'erro'
+            }), 400
+        
+        celulas, em_cache = mapa_calor(data_inicio, data_fim, barbeiro_id)
+        
+        # Quantas vezes cada dia da semana aparece no período
+        total_dias = (data_fim - data_inicio).days + 1
+        ocorrencias = [
+            total_dias // 7 + (1 if (dia_semana - data_inicio.weekday()) % 7 < total_dias % 7 else 0)
+            for dia_semana in range(7)
+        ]
+        
+        matriz = [[0] * 24 for _ in range(7)]
+        resultado = []
+        for dia_semana, hora, chegadas, espera_media, espera_maxima in sorted(celulas):
+            if dia_semana is None or hora is None:
+                continue
+            media_chegadas = round(chegadas / ocorrencias[dia_semana], 2) if ocorrencias[dia_semana] else 0
+            matriz[dia_semana][hora] = media_chegadas
+            resultado.append({
+                'dia_semana': dia_semana,
+                'nome_dia': DIAS_SEMANA[dia_semana],
+                'hora': hora,
+                'chegadas': chegadas,
+                'chegadas_por_dia': media_chegadas,
+                'espera_media': round(espera_media, 2) if espera_media is not None else None,
+                'espera_maxima': espera_maxima
+            })
+        
+        return jsonify({
+            'celulas': resultado,
+            'matriz_chegadas_por_dia': matriz,
+            'dias_semana': list(DIAS_SEMANA),
+            'total_chegadas': sum(item['chegadas'] for item in resultado),
+            'data_inicio': data_inicio.isoformat(),
+            'data_fim': data_fim.isoformat(),
+            'em_cache': em_cache,
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'erro': 'Erro ao gerar mapa de calor',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
+
+def _metricas_periodo(valores):
+    """
+    Converte as somas de um período (ver comparar_periodos) em métricas.
+    
+    Args:
+        valores (tuple): Somas e contagens do período, ou None sem atendimentos
+    
+    Returns:
+        dict: Total de atendimentos e tempos médios (None sem dados)
+    """
+    atendimentos, soma_espera, com_espera, soma_atendimento, com_atendimento = valores or (0, 0, 0, 0, 0)
+    return {
+        'total_atendimentos': atendimentos,
+        'tempo_medio_espera': round(soma_espera / com_espera, 2) if com_espera else None,
+        'tempo_medio_atendimento': round(soma_atendimento / com_atendimento, 2) if com_atendimento else None
+    }
+
+def _variacoes(metricas):
+    """
+    Compara as métricas do primeiro período com as de cada um dos demais.
+    
+    Args:
+        metricas (list): Métricas de cada período (ver _metricas_periodo)
+    
+    Returns:
+        list: Diferenças do primeiro período em relação a cada outro
+    """
+    base = metricas[0]
+    variacoes = []
+    for indice, outro in enumerate(metricas[1:], 1):
+        variacao = {
+            'comparado_com': indice,
+            'total_atendimentos': base['total_atendimentos'] - outro['total_atendimentos'],
+            'total_atendimentos_percentual': round(
+                100 * (base['total_atendimentos'] - outro['total_atendimentos']) / outro['total_atendimentos'], 1
+            ) if outro['total_atendimentos'] else None
+        }
+        for campo in ('tempo_medio_espera', 'tempo_medio_atendimento'):
+            variacao[campo] = round(base[campo] - outro[campo], 2) \
+                if base[campo] is not None and outro[campo] is not None else None
+        variacoes.append(variacao)
+    return variacoes
+
+@atendimento_bp.route('/relatorios/comparativo', methods=['GET'])
+@orcamento_consultas(3)
+def obter_comparativo():
+    """
+    Compara atendimentos e tempos de cada barbeiro entre vários períodos.
+    
+    Endpoint: GET /api/relatorios/comparativo
+    
+    Query Parameters:
+        - periodos: Períodos separados por vírgula, cada um 'AAAA-MM-DD:AAAA-MM-DD'
+          ou um nome (hoje, ontem, semana, semana_anterior, mes, mes_anterior,
+          mes_ano_anterior); padrão: 'semana,semana_anterior'
+        - barbeiro_id: Filtrar por barbeiro
+    
+    Os dias são os do fuso da barbearia (SHOP_TIMEZONE). O primeiro
+    período é comparado com cada um dos demais ('variacoes').
+    Todos os períodos são calculados em uma única consulta agrupada.
+    
+    Returns:
+        JSON: Métricas e variações por barbeiro e no total
+    """
+    try:
+        barbeiro_id = request.args.get('barbeiro_id', type=int)
+        textos = [texto for texto in request.args.get('periodos', 'semana,semana_anterior').split(',')
+                  if texto.strip()]
+        
+        if not 2 <= len(textos) <= MAXIMO_PERIODOS:
+            return jsonify({
+                'erro': f'Informe de 2 a {MAXIMO_PERIODOS} períodos',
+                'status': 'erro'
+            }), 400
+        
+        hoje = hoje_local()
+        try:
+            periodos = [converter_periodo(texto, hoje) for texto in textos]
+        except ValueError as e:
+            return jsonify({
+                'erro': str(e),
+                'status': 'erro'
+            }), 400
+        
+        por_barbeiro, em_cache = comparar_periodos(periodos, barbeiro_id)
+        
+        nomes_barbeiros = mapa_nomes_barbeiros() if por_barbeiro else {}
+        barbeiros = []
+        totais = [[0] * 5 for _ in periodos]
+        for id_barbeiro, valores in sorted(por_barbeiro.items()):
+            metricas = [_metricas_periodo(valores_periodo) for valores_periodo in valores]
+            barbeiros.append({
+                'barbeiro_id': id_barbeiro,
+                'nome_barbeiro': nomes_barbeiros.get(id_barbeiro, 'Desconhecido'),
+                'periodos': metricas,
+                'variacoes': _variacoes(metricas)
+            })
+            for total, valores_periodo in zip(totais, valores):
+                for indice, valor in enumerate(valores_periodo):
+                    total[indice] += valor
+        
+        metricas_totais = [_metricas_periodo(total) for total in totais]
+        
+        return jsonify({
+            'periodos': [
+                {'periodo': texto.strip(), 'data_inicio': primeiro_dia.isoformat(), 'data_fim': ultimo_dia.isoformat()}
+                for texto, (primeiro_dia, ultimo_dia) in zip(textos, periodos)
+            ],
+            'barbeiros': barbeiros,
+            'total': {
+                'periodos': metricas_totais,
+                'variacoes': _variacoes(metricas_totais)
+            },
+            'em_cache': em_cache,
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'erro': 'Erro ao gerar relatório comparativo',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
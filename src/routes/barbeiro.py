@@ -14,12 +14,22 @@ from flask import Blueprint, jsonify, request
 from src.models.user import db
 from src.models.barbeiro import Barbeiro
 from src.models.cliente import Cliente
+from src.models.atendimento import Atendimento
+from src.models.agendamento import Agendamento
+from src.services.comandos import ErroComando, chamar_proximo
+from src.services.estatisticas import estatisticas_fila
+from src.services.fila import ordem_fila, transferir_fila
+from src.services.notificacoes import marcar_alteracao
+from src.utils.orcamento_consultas import orcamento_consultas
+from sqlalchemy import delete
+from collections import Counter
 from datetime import datetime
 
 # Criação do blueprint para as rotas de barbeiros
 barbeiro_bp = Blueprint('barbeiro', __name__)
 
 @barbeiro_bp.route('/barbeiros', methods=['GET'])
+@orcamento_consultas(1)
 def listar_barbeiros():
     """
     Lista todos os barbeiros cadastrados no sistema.
@@ -62,6 +72,7 @@ def listar_barbeiros():
         }), 500
 
 @barbeiro_bp.route('/barbeiros', methods=['POST'])
+@orcamento_consultas(3)
 def criar_barbeiro():
     """
     Cria um novo barbeiro no sistema.
@@ -110,6 +121,7 @@ def criar_barbeiro():
         # Salva no banco de dados
         db.session.add(novo_barbeiro)
         db.session.commit()
+        estatisticas_fila.ajustar(total_barbeiros=1, barbeiros_ativos=1 if novo_barbeiro.ativo else 0)
         
         return jsonify({
             'barbeiro': novo_barbeiro.to_dict(),
@@ -127,6 +139,7 @@ def criar_barbeiro():
         }), 500
 
 @barbeiro_bp.route('/barbeiros/<int:barbeiro_id>', methods=['GET'])
+@orcamento_consultas(1)
 def obter_barbeiro(barbeiro_id):
     """
     Obtém os dados de um barbeiro específico.
@@ -155,6 +168,7 @@ def obter_barbeiro(barbeiro_id):
         }), 404
 
 @barbeiro_bp.route('/barbeiros/<int:barbeiro_id>/fila', methods=['GET'])
+@orcamento_consultas(3)
 def obter_fila_barbeiro(barbeiro_id):
     """
     Obtém a fila atual de um barbeiro específico.
@@ -171,24 +185,26 @@ def obter_fila_barbeiro(barbeiro_id):
         # Verifica se o barbeiro existe
         barbeiro = Barbeiro.query.get_or_404(barbeiro_id)
         
-        # Busca todos os clientes aguardando este barbeiro
+        # Busca todos os clientes aguardando este barbeiro, na ordem da fila
         clientes_fila = Cliente.query.filter_by(
             barbeiro_id=barbeiro_id,
             status='aguardando'
-        ).order_by(Cliente.data_entrada.asc()).all()
+        ).order_by(*ordem_fila()).all()
         
         # Atualiza as posições na fila
         for i, cliente in enumerate(clientes_fila, 1):
             cliente.posicao_fila = i
         
+        # Converte para dicionários antes do commit, que expira os objetos
+        # e obrigaria a recarregar cada cliente individualmente
+        fila_data = [cliente.to_dict() for cliente in clientes_fila]
+        barbeiro_data = barbeiro.to_dict()
+        
         # Salva as atualizações de posição
         db.session.commit()
         
-        # Converte para dicionários
-        fila_data = [cliente.to_dict() for cliente in clientes_fila]
-        
         return jsonify({
-            'barbeiro': barbeiro.to_dict(),
+            'barbeiro': barbeiro_data,
             'fila': fila_data,
             'total_fila': len(fila_data),
             'proximo_cliente': fila_data[0] if fila_data else None,
@@ -203,12 +219,16 @@ def obter_fila_barbeiro(barbeiro_id):
         }), 500
 
 @barbeiro_bp.route('/barbeiros/<int:barbeiro_id>/proximo', methods=['POST'])
+@orcamento_consultas(9)
 def chamar_proximo_cliente(barbeiro_id):
     """
     Chama o próximo cliente da fila do barbeiro.
     
     Endpoint: POST /api/barbeiros/<id>/proximo
     
+    Se a fila do barbeiro estiver vazia, ele chama o cliente "qualquer
+    barbeiro" que chegou primeiro na fila de outro barbeiro.
+    
     Args:
         barbeiro_id (int): ID do barbeiro
         
@@ -216,33 +236,23 @@ def chamar_proximo_cliente(barbeiro_id):
         JSON: Dados do cliente chamado
     """
     try:
-        # Verifica se o barbeiro existe
-        barbeiro = Barbeiro.query.get_or_404(barbeiro_id)
-        
-        # Busca o próximo cliente na fila
-        proximo_cliente = Cliente.query.filter_by(
-            barbeiro_id=barbeiro_id,
-            status='aguardando'
-        ).order_by(Cliente.data_entrada.asc()).first()
-        
-        if not proximo_cliente:
-            return jsonify({
-                'mensagem': 'Não há clientes na fila',
-                'status': 'info'
-            }), 200
-        
-        # Marca o cliente como sendo atendido
-        proximo_cliente.iniciar_atendimento()
-        
-        # Salva as alterações
+        variacoes = Counter()
+        resultado = chamar_proximo(barbeiro_id, variacoes)
         db.session.commit()
+        estatisticas_fila.ajustar(**variacoes)
         
+        if resultado['status'] == 'sucesso':
+            # Contadores da fila do barbeiro relidos após o commit
+            resultado['barbeiro'] = db.session.get(Barbeiro, barbeiro_id).to_dict()
+        
+        return jsonify(resultado), 200
+    
+    except ErroComando as e:
+        db.session.rollback()
         return jsonify({
-            'cliente_chamado': proximo_cliente.to_dict(),
-            'barbeiro': barbeiro.to_dict(),
-            'mensagem': f'Cliente {proximo_cliente.nome} (Ficha {proximo_cliente.numero_ficha}) foi chamado',
-            'status': 'sucesso'
-        }), 200
+            'erro': str(e),
+            'status': 'erro'
+        }), e.codigo
         
     except Exception as e:
         db.session.rollback()
@@ -253,6 +263,7 @@ def chamar_proximo_cliente(barbeiro_id):
         }), 500
 
 @barbeiro_bp.route('/barbeiros/<int:barbeiro_id>/ativar', methods=['PUT'])
+@orcamento_consultas(3)
 def ativar_barbeiro(barbeiro_id):
     """
     Ativa um barbeiro no sistema.
@@ -267,8 +278,11 @@ def ativar_barbeiro(barbeiro_id):
     """
     try:
         barbeiro = Barbeiro.query.get_or_404(barbeiro_id)
+        estava_ativo = barbeiro.ativo
         barbeiro.ativar()
         db.session.commit()
+        if not estava_ativo:
+            estatisticas_fila.ajustar(barbeiros_ativos=1)
         
         return jsonify({
             'barbeiro': barbeiro.to_dict(),
@@ -285,6 +299,7 @@ def ativar_barbeiro(barbeiro_id):
         }), 500
 
 @barbeiro_bp.route('/barbeiros/<int:barbeiro_id>/desativar', methods=['PUT'])
+@orcamento_consultas(3)
 def desativar_barbeiro(barbeiro_id):
     """
     Desativa um barbeiro no sistema.
@@ -299,8 +314,11 @@ def desativar_barbeiro(barbeiro_id):
     """
     try:
         barbeiro = Barbeiro.query.get_or_404(barbeiro_id)
+        estava_ativo = barbeiro.ativo
         barbeiro.desativar()
         db.session.commit()
+        if estava_ativo:
+            estatisticas_fila.ajustar(barbeiros_ativos=-1)
         
         return jsonify({
             'barbeiro': barbeiro.to_dict(),
@@ -316,15 +334,109 @@ def desativar_barbeiro(barbeiro_id):
             'status': 'erro'
         }), 500
 
+@barbeiro_bp.route('/barbeiros/<int:barbeiro_id>/transferir-fila', methods=['POST'])
+@orcamento_consultas(7)
+def transferir_fila_barbeiro(barbeiro_id):
+    """
+    Transfere os clientes aguardando de um barbeiro para outros barbeiros.
+    
+    Endpoint: POST /api/barbeiros/<id>/transferir-fila
+    
+    Usado ao desativar um barbeiro que ainda tem fila. Sem destino, os
+    clientes são distribuídos entre todos os barbeiros ativos, sempre
+    para a fila mais curta; a ordem de chegada é mantida. O cliente em
+    atendimento continua com o barbeiro.
+    
+    Body (JSON, opcional):
+    {
+        "destino_id": 2    // transfere toda a fila para este barbeiro
+    }
+    
+    Args:
+        barbeiro_id (int): ID do barbeiro cuja fila é transferida
+        
+    Returns:
+        JSON: Clientes transferidos para cada barbeiro
+    """
+    try:
+        barbeiro = Barbeiro.query.get_or_404(barbeiro_id)
+        dados = request.get_json(silent=True) or {}
+        destino_id = dados.get('destino_id')
+        
+        if destino_id is not None:
+            if not isinstance(destino_id, int) or isinstance(destino_id, bool):
+                return jsonify({
+                    'erro': 'destino_id deve ser um número inteiro',
+                    'status': 'erro'
+                }), 400
+            
+            if destino_id == barbeiro_id:
+                return jsonify({
+                    'erro': 'O destino deve ser outro barbeiro',
+                    'status': 'erro'
+                }), 400
+            
+            destino = db.session.get(Barbeiro, destino_id)
+            if not destino:
+                return jsonify({
+                    'erro': 'Barbeiro de destino não encontrado',
+                    'status': 'erro'
+                }), 404
+            
+            if not destino.ativo:
+                return jsonify({
+                    'erro': 'Barbeiro de destino não está ativo no momento',
+                    'status': 'erro'
+                }), 400
+            
+            destinos = [destino]
+        else:
+            destinos = Barbeiro.query.filter(Barbeiro.ativo.is_(True), Barbeiro.id != barbeiro_id).all()
+            if not destinos:
+                return jsonify({
+                    'erro': 'Não há outro barbeiro ativo para receber a fila',
+                    'status': 'erro'
+                }), 400
+        
+        nomes = {destino.id: destino.nome for destino in destinos}
+        recebidos = transferir_fila(barbeiro_id, destinos)
+        db.session.commit()
+        
+        transferidos = sum(recebidos.values())
+        barbeiro_data = barbeiro.to_dict()
+        
+        return jsonify({
+            'barbeiro': barbeiro_data,
+            'transferencias': [
+                {'barbeiro_id': id_destino, 'nome': nomes[id_destino], 'clientes': quantidade}
+                for id_destino, quantidade in recebidos.items() if quantidade
+            ],
+            'total_transferidos': transferidos,
+            'mensagem': f'{transferidos} cliente(s) da fila do {barbeiro_data["nome"]} transferido(s)',
+            'status': 'sucesso'
+        }), 200
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'erro': 'Erro ao transferir fila do barbeiro',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
 
 
 @barbeiro_bp.route("/barbeiros/<int:barbeiro_id>", methods=["DELETE"])
+@orcamento_consultas(5)
 def deletar_barbeiro(barbeiro_id):
     """
     Deleta um barbeiro do sistema.
     
     Endpoint: DELETE /api/barbeiros/<id>
     
+    Os atendimentos e agendamentos do barbeiro são excluídos junto, com
+    um DELETE em massa por tabela (memória constante, qualquer que seja
+    o tamanho do histórico). Os clientes arquivados são mantidos.
+    
     Args:
         barbeiro_id (int): ID do barbeiro
         
@@ -332,13 +444,20 @@ def deletar_barbeiro(barbeiro_id):
         JSON: Confirmação da exclusão
     """
     try:
-        barbeiro = Barbeiro.query.get_or_404(barbeiro_id)
+        barbeiro = db.session.get(Barbeiro, barbeiro_id)
+        if not barbeiro:
+            return jsonify({
+                "erro": "Barbeiro não encontrado",
+                "status": "erro"
+            }), 404
         
         # Verifica se o barbeiro possui clientes em atendimento ou aguardando
-        clientes_ativos = Cliente.query.filter(
-            Cliente.barbeiro_id == barbeiro_id,
-            Cliente.status.in_(["aguardando", "em_atendimento"])
-        ).first()
+        clientes_ativos = db.session.query(
+            Cliente.query.filter(
+                Cliente.barbeiro_id == barbeiro_id,
+                Cliente.status.in_(["aguardando", "atendendo"])
+            ).exists()
+        ).scalar()
 
         if clientes_ativos:
             return jsonify({
@@ -346,11 +465,24 @@ def deletar_barbeiro(barbeiro_id):
                 "status": "erro"
             }), 400
 
-        db.session.delete(barbeiro)
+        nome = barbeiro.nome
+        estava_ativo = barbeiro.ativo
+        
+        # Histórico e agendamentos removidos com um DELETE por tabela, sem
+        # carregar os atendimentos do barbeiro na sessão
+        atendimentos_removidos = db.session.execute(
+            delete(Atendimento).where(Atendimento.barbeiro_id == barbeiro_id)
+        ).rowcount
+        db.session.execute(delete(Agendamento).where(Agendamento.barbeiro_id == barbeiro_id))
+        db.session.execute(delete(Barbeiro).where(Barbeiro.id == barbeiro_id))
+        for tipo in ('barbeiros', 'atendimentos', 'agendamentos', 'historico'):
+            marcar_alteracao(db.session, tipo)
         db.session.commit()
+        estatisticas_fila.ajustar(total_barbeiros=-1, barbeiros_ativos=-1 if estava_ativo else 0)
         
         return jsonify({
-            "mensagem": f"Barbeiro {barbeiro.nome} foi deletado com sucesso.",
+            "mensagem": f"Barbeiro {nome} foi deletado com sucesso.",
+            "atendimentos_removidos": atendimentos_removidos,
             "status": "sucesso"
         }), 200
         
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Rotas da API: Busca de Clientes
+
+Este arquivo contém a rota usada pela recepção para encontrar um
+cliente pelo nome, na fila atual ou no histórico de atendimentos
+(ex.: "o Rafael da semana passada").
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from flask import Blueprint, current_app, jsonify, request
+from src.models.user import db
+from src.models.barbeiro import Barbeiro
+from src.services.busca import buscar_clientes, carregar_resultados
+from src.utils.orcamento_consultas import orcamento_consultas
+
+# Criação do blueprint para a rota de busca
+busca_bp = Blueprint('busca', __name__)
+
+# Resultados por página
+LIMITE_PADRAO = 20
+LIMITE_MAXIMO = 100
+
+@busca_bp.route('/busca', methods=['GET'])
+@orcamento_consultas(5)
+def buscar():
+    """
+    Busca clientes pelo nome na fila e no histórico de atendimentos.
+    
+    Endpoint: GET /api/busca
+    
+    Query Parameters:
+        - q: Nome ou parte do nome (ex.: 'rafa', 'joao silva'); acentos
+          e maiúsculas são ignorados
+        - pagina: Página dos resultados (padrão: 1)
+        - limite: Resultados por página (padrão: 20, máximo: 100)
+    
+    Buscas com mais de SEARCH_RANK_LIMIT resultados vêm dos mais recentes
+    para os mais antigos em vez de por relevância ('ordem' na resposta).
+    
+    Returns:
+        JSON: Resultados em ordem de relevância, com origem 'fila' ou 'historico'
+    """
+    try:
+        texto = request.args.get('q', '').strip()
+        pagina = request.args.get('pagina', 1, type=int)
+        limite = request.args.get('limite', LIMITE_PADRAO, type=int)
+        
+        if not texto:
+            return jsonify({
+                'erro': 'Parâmetro q é obrigatório',
+                'status': 'erro'
+            }), 400
+        
+        if pagina < 1 or not 0 < limite <= LIMITE_MAXIMO:
+            return jsonify({
+                'erro': f'pagina deve ser positiva e limite entre 1 e {LIMITE_MAXIMO}',
+                'status': 'erro'
+            }), 400
+        
+        if db.engine.dialect.name != 'sqlite':
+            return jsonify({
+                'erro': 'Busca por nome disponível apenas com banco SQLite',
+                'status': 'erro'
+            }), 501
+        
+        total, encontrados, ranqueado = buscar_clientes(
+            texto, pagina, limite, current_app.config.get('SEARCH_RANK_LIMIT', 5000))
+        resultados = carregar_resultados(encontrados)
+        
+        if resultados:
+            barbeiros_ids = {resultado['barbeiro_id'] for resultado in resultados}
+            nomes_barbeiros = dict(db.session.query(Barbeiro.id, Barbeiro.nome)
+                                   .filter(Barbeiro.id.in_(barbeiros_ids)).all())
+            for resultado in resultados:
+                resultado['nome_barbeiro'] = nomes_barbeiros.get(resultado['barbeiro_id'], 'Desconhecido')
+        
+        return jsonify({
+            'resultados': resultados,
+            'total': total,
+            'ordem': 'relevancia' if ranqueado else 'recentes',
+            'pagina_atual': pagina,
+            'total_paginas': (total + limite - 1) // limite,
+            'tem_proxima': pagina * limite < total,
+            'tem_anterior': pagina > 1,
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'erro': 'Erro ao buscar clientes',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
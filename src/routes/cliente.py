@@ -10,17 +10,28 @@ ATENÇÃO: Este código é propriedade intelectual protegida.
 Uso não autorizado é proibido por lei.
 """
 
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, current_app, jsonify, request
 from src.models.user import db
-from src.models.cliente import Cliente
+from src.models.cliente import Cliente, PRIORIDADES
 from src.models.barbeiro import Barbeiro
-from src.models.atendimento import Atendimento
+from src.services.comandos import ErroComando, cancelar_cliente, concluir_cliente
+from src.services.escalonador import escalonador
+from src.services.estatisticas import estatisticas_fila
+from src.services.fila import (
+    montar_fila_completa, buscar_cliente, buscar_cliente_por_ficha, registrar_entrada_fila,
+    resumo_filas, encerrar_dia, calcular_posicao, posicionar_cliente
+)
+from src.services.instantaneo_fila import instantaneos_fila
+from src.services.lojas import chave_loja
+from src.utils.orcamento_consultas import orcamento_consultas
+from collections import Counter
 from datetime import datetime
 
 # Criação do blueprint para as rotas de clientes
 cliente_bp = Blueprint('cliente', __name__)
 
 @cliente_bp.route('/clientes', methods=['POST'])
+@orcamento_consultas(8)
 def cadastrar_cliente():
     """
     Cadastra um novo cliente na fila da barbearia.
@@ -34,15 +45,22 @@ def cadastrar_cliente():
         "barbeiro_id": 1
     }
     
+    Para clientes sem preferência, envie "qualquer_barbeiro": true no
+    lugar de barbeiro_id: o escalonador escolhe o barbeiro que deve
+    ficar livre primeiro. Clientes com atendimento prioritário (idosos,
+    gestantes, pessoas com deficiência) são cadastrados com
+    "prioridade": "preferencial" e passam à frente dos demais.
+    
     Returns:
         JSON: Dados do cliente cadastrado e posição na fila
     """
     try:
         # Obtém os dados do corpo da requisição
         dados = request.get_json()
+        qualquer_barbeiro = bool(dados and dados.get('qualquer_barbeiro') is True)
         
         # Validação dos dados obrigatórios
-        campos_obrigatorios = ['nome', 'numero_ficha', 'barbeiro_id']
+        campos_obrigatorios = ['nome', 'numero_ficha'] + ([] if qualquer_barbeiro else ['barbeiro_id'])
         for campo in campos_obrigatorios:
             if not dados or campo not in dados:
                 return jsonify({
@@ -52,7 +70,8 @@ def cadastrar_cliente():
         
         nome = dados['nome'].strip()
         numero_ficha = dados['numero_ficha']
-        barbeiro_id = dados['barbeiro_id']
+        barbeiro_id = dados.get('barbeiro_id')
+        espera_estimada = None
         
         # Validações específicas
         if not nome or len(nome) < 2:
@@ -67,6 +86,24 @@ def cadastrar_cliente():
                 'status': 'erro'
             }), 400
         
+        # Agendados entram na fila pela chegada do agendamento
+        prioridade = dados.get('prioridade', 'normal')
+        if prioridade not in ('normal', 'preferencial'):
+            return jsonify({
+                'erro': "Prioridade deve ser 'normal' ou 'preferencial'",
+                'status': 'erro'
+            }), 400
+        
+        # Sem preferência: barbeiro que deve ficar livre primeiro
+        if qualquer_barbeiro:
+            escolhido = escalonador.escolher()
+            if escolhido is None:
+                return jsonify({
+                    'erro': 'Nenhum barbeiro ativo no momento',
+                    'status': 'erro'
+                }), 400
+            barbeiro_id, espera_estimada = escolhido
+        
         # Verifica se o barbeiro existe e está ativo
         barbeiro = Barbeiro.query.get(barbeiro_id)
         if not barbeiro:
@@ -89,30 +126,33 @@ def cadastrar_cliente():
                 'status': 'erro'
             }), 409
         
-        # Calcula a posição na fila
-        clientes_na_fila = Cliente.query.filter_by(
-            barbeiro_id=barbeiro_id,
-            status='aguardando'
-        ).count()
-        
-        posicao_fila = clientes_na_fila + 1
+        # Conta a entrada na fila do barbeiro e obtém a posição
+        # (UPDATE atômico do contador, sem COUNT na tabela de clientes)
+        posicao_fila = registrar_entrada_fila(barbeiro_id)
         
         # Cria o novo cliente
         novo_cliente = Cliente(
             nome=nome,
             numero_ficha=numero_ficha,
             barbeiro_id=barbeiro_id,
-            posicao_fila=posicao_fila
+            posicao_fila=posicao_fila,
+            qualquer_barbeiro=qualquer_barbeiro,
+            prioridade=PRIORIDADES[prioridade]
         )
         
         # Salva no banco de dados
         db.session.add(novo_cliente)
+        if prioridade != 'normal':
+            # Não entra no fim da fila: posição pela ordem de prioridade
+            posicao_fila = posicionar_cliente(novo_cliente)
         db.session.commit()
+        estatisticas_fila.ajustar(clientes_aguardando=1)
         
         return jsonify({
             'cliente': novo_cliente.to_dict(),
             'barbeiro': barbeiro.to_dict(),
             'posicao_fila': posicao_fila,
+            'espera_estimada_minutos': espera_estimada,
             'mensagem': f'Cliente {nome} cadastrado com sucesso na fila do {barbeiro.nome}',
             'status': 'sucesso'
         }), 201
@@ -127,6 +167,7 @@ def cadastrar_cliente():
         }), 500
 
 @cliente_bp.route('/clientes/<int:cliente_id>', methods=['GET'])
+@orcamento_consultas(3)
 def obter_cliente(cliente_id):
     """
     Obtém os dados de um cliente específico.
@@ -140,7 +181,14 @@ def obter_cliente(cliente_id):
         JSON: Dados do cliente
     """
     try:
-        cliente = Cliente.query.get_or_404(cliente_id)
+        # Clientes que já saíram da fila estão no arquivo
+        cliente = buscar_cliente(cliente_id)
+        if not cliente:
+            return jsonify({
+                'erro': 'Cliente não encontrado',
+                'status': 'erro'
+            }), 404
+        
         barbeiro = Barbeiro.query.get(cliente.barbeiro_id)
         
         return jsonify({
@@ -156,6 +204,7 @@ def obter_cliente(cliente_id):
         }), 404
 
 @cliente_bp.route('/clientes/ficha/<int:numero_ficha>', methods=['GET'])
+@orcamento_consultas(5)
 def obter_cliente_por_ficha(numero_ficha):
     """
     Obtém os dados de um cliente pelo número da ficha.
@@ -169,7 +218,8 @@ def obter_cliente_por_ficha(numero_ficha):
         JSON: Dados do cliente e sua posição na fila
     """
     try:
-        cliente = Cliente.query.filter_by(numero_ficha=numero_ficha).first()
+        # Cliente na fila com esta ficha ou, se não houver, o último que a usou
+        cliente = buscar_cliente_por_ficha(numero_ficha)
         
         if not cliente:
             return jsonify({
@@ -181,11 +231,7 @@ def obter_cliente_por_ficha(numero_ficha):
         
         # Se o cliente está aguardando, calcula a posição atual na fila
         if cliente.status == 'aguardando':
-            posicao_atual = Cliente.query.filter(
-                Cliente.barbeiro_id == cliente.barbeiro_id,
-                Cliente.status == 'aguardando',
-                Cliente.data_entrada < cliente.data_entrada
-            ).count() + 1
+            posicao_atual = calcular_posicao(cliente)
             
             cliente.posicao_fila = posicao_atual
             db.session.commit()
@@ -204,6 +250,7 @@ def obter_cliente_por_ficha(numero_ficha):
         }), 500
 
 @cliente_bp.route('/clientes/<int:cliente_id>/concluir', methods=['PUT'])
+@orcamento_consultas(8)
 def concluir_atendimento_cliente(cliente_id):
     """
     Marca o atendimento de um cliente como concluído.
@@ -217,42 +264,19 @@ def concluir_atendimento_cliente(cliente_id):
         JSON: Confirmação da conclusão do atendimento
     """
     try:
-        cliente = Cliente.query.get_or_404(cliente_id)
-        
-        if cliente.status != 'atendendo':
-            return jsonify({
-                'erro': 'Cliente não está sendo atendido no momento',
-                'status': 'erro'
-            }), 400
-        
-        # Cria o registro de atendimento
-        atendimento = Atendimento(
-            cliente_id=cliente.id,
-            barbeiro_id=cliente.barbeiro_id,
-            numero_ficha=cliente.numero_ficha,
-            nome_cliente=cliente.nome,
-            data_entrada=cliente.data_entrada
-        )
-        
-        # Finaliza o atendimento
-        atendimento.finalizar_atendimento()
-        
-        # Marca o cliente como concluído
-        cliente.concluir_atendimento()
-        
-        # Salva no banco de dados
-        db.session.add(atendimento)
+        variacoes = Counter()
+        resultado = concluir_cliente(cliente_id, variacoes)
         db.session.commit()
+        estatisticas_fila.ajustar(**variacoes)
         
-        # Atualiza as posições na fila do barbeiro
-        atualizar_posicoes_fila(cliente.barbeiro_id)
-        
+        return jsonify(resultado), 200
+    
+    except ErroComando as e:
+        db.session.rollback()
         return jsonify({
-            'cliente': cliente.to_dict(),
-            'atendimento': atendimento.to_dict(),
-            'mensagem': f'Atendimento do cliente {cliente.nome} (Ficha {cliente.numero_ficha}) foi concluído',
-            'status': 'sucesso'
-        }), 200
+            'erro': str(e),
+            'status': 'erro'
+        }), e.codigo
         
     except Exception as e:
         db.session.rollback()
@@ -263,6 +287,7 @@ def concluir_atendimento_cliente(cliente_id):
         }), 500
 
 @cliente_bp.route('/clientes/<int:cliente_id>/cancelar', methods=['PUT'])
+@orcamento_consultas(7)
 def cancelar_atendimento_cliente(cliente_id):
     """
     Cancela o atendimento de um cliente.
@@ -276,28 +301,19 @@ def cancelar_atendimento_cliente(cliente_id):
         JSON: Confirmação do cancelamento
     """
     try:
-        cliente = Cliente.query.get_or_404(cliente_id)
-        
-        if cliente.status == 'concluido':
-            return jsonify({
-                'erro': 'Atendimento já foi concluído',
-                'status': 'erro'
-            }), 400
-        
-        barbeiro_id = cliente.barbeiro_id
-        
-        # Cancela o atendimento
-        cliente.cancelar_atendimento()
+        variacoes = Counter()
+        resultado = cancelar_cliente(cliente_id, variacoes)
         db.session.commit()
+        estatisticas_fila.ajustar(**variacoes)
         
-        # Atualiza as posições na fila do barbeiro
-        atualizar_posicoes_fila(barbeiro_id)
-        
+        return jsonify(resultado), 200
+    
+    except ErroComando as e:
+        db.session.rollback()
         return jsonify({
-            'cliente': cliente.to_dict(),
-            'mensagem': f'Atendimento do cliente {cliente.nome} (Ficha {cliente.numero_ficha}) foi cancelado',
-            'status': 'sucesso'
-        }), 200
+            'erro': str(e),
+            'status': 'erro'
+        }), e.codigo
         
     except Exception as e:
         db.session.rollback()
@@ -308,83 +324,139 @@ def cancelar_atendimento_cliente(cliente_id):
         }), 500
 
 @cliente_bp.route('/fila', methods=['GET'])
+@orcamento_consultas(3)
 def obter_fila_completa():
     """
     Obtém a fila completa de todos os barbeiros.
     
     Endpoint: GET /api/fila
     
+    Com SNAPSHOT_ENABLED, a resposta vem do instantâneo em memória
+    compartilhada (sem consultar o banco) e traz um ETag com a versão;
+    clientes que enviam If-None-Match recebem 304 enquanto a fila não muda.
+    
     Returns:
         JSON: Fila completa organizada por barbeiro
     """
     try:
-        # Busca todos os barbeiros ativos
-        barbeiros = Barbeiro.query.filter_by(ativo=True).all()
+        if not instantaneos_fila.ativo:
+            return jsonify({
+                **montar_fila_completa(),
+                'timestamp': datetime.utcnow().isoformat(),
+                'status': 'sucesso'
+            }), 200
         
-        fila_completa = {}
+        conteudo, versao, gerado_em = instantaneos_fila.obter(chave_loja())
         
-        for barbeiro in barbeiros:
-            # Busca clientes aguardando este barbeiro
-            clientes_fila = Cliente.query.filter_by(
-                barbeiro_id=barbeiro.id,
-                status='aguardando'
-            ).order_by(Cliente.data_entrada.asc()).all()
-            
-            # Atualiza posições na fila
-            for i, cliente in enumerate(clientes_fila, 1):
-                cliente.posicao_fila = i
-            
-            # Cliente sendo atendido
-            cliente_atendendo = Cliente.query.filter_by(
-                barbeiro_id=barbeiro.id,
-                status='atendendo'
-            ).first()
-            
-            fila_completa[barbeiro.nome] = {
-                'barbeiro': barbeiro.to_dict(),
-                'fila_aguardando': [cliente.to_dict() for cliente in clientes_fila],
-                'cliente_atendendo': cliente_atendendo.to_dict() if cliente_atendendo else None,
-                'total_fila': len(clientes_fila)
-            }
-        
-        # Salva as atualizações de posição
-        db.session.commit()
+        resposta = current_app.response_class(conteudo, mimetype='application/json')
+        if versao is not None:
+            resposta.headers['X-Fila-Versao'] = str(versao)
+            resposta.set_etag(f'{versao}-{int(gerado_em * 1000)}')
+            resposta.make_conditional(request)
+        return resposta
         
+    except Exception as e:
         return jsonify({
-            'fila_completa': fila_completa,
-            'barbeiros_ativos': len(barbeiros),
+            'erro': 'Erro ao obter fila completa',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
+
+@cliente_bp.route('/fila/resumo', methods=['GET'])
+@orcamento_consultas(1)
+def obter_resumo_filas():
+    """
+    Obtém o resumo da fila de todos os barbeiros.
+    
+    Endpoint: GET /api/fila/resumo
+    
+    Os totais vêm dos contadores mantidos na tabela de barbeiros, com
+    uma única consulta, independente do tamanho das filas.
+    
+    Returns:
+        JSON: Clientes aguardando e cliente atual de cada barbeiro
+    """
+    try:
+        barbeiros = resumo_filas()
+        
+        return jsonify({
+            'barbeiros': barbeiros,
+            'total_aguardando': sum(barbeiro['clientes_aguardando'] for barbeiro in barbeiros if barbeiro['ativo']),
             'timestamp': datetime.utcnow().isoformat(),
             'status': 'sucesso'
         }), 200
         
     except Exception as e:
         return jsonify({
-            'erro': 'Erro ao obter fila completa',
+            'erro': 'Erro ao obter resumo das filas',
             'detalhes': str(e),
             'status': 'erro'
         }), 500
 
-def atualizar_posicoes_fila(barbeiro_id):
+@cliente_bp.route('/fila/encerrar-dia', methods=['POST'])
+@orcamento_consultas(8)
+def encerrar_fila_dia():
     """
-    Função auxiliar para atualizar as posições na fila de um barbeiro.
+    Encerra a fila do dia de uma só vez.
     
-    Args:
-        barbeiro_id (int): ID do barbeiro
+    Endpoint: POST /api/fila/encerrar-dia
+    
+    Cancela todos os clientes que ainda aguardam e conclui os que estão
+    em atendimento (registrando o atendimento), em uma única transação
+    e com operações em massa, em vez de um cancelamento por cliente.
+    
+    Body (JSON, opcional):
+    {
+        "barbeiro_id": 1,              // apenas a fila deste barbeiro
+        "concluir_atendendo": true     // false cancela também quem está em atendimento
+    }
+    
+    Returns:
+        JSON: Clientes cancelados e concluídos, no total e por barbeiro
     """
     try:
-        # Busca todos os clientes aguardando este barbeiro
-        clientes_fila = Cliente.query.filter_by(
-            barbeiro_id=barbeiro_id,
-            status='aguardando'
-        ).order_by(Cliente.data_entrada.asc()).all()
+        dados = request.get_json(silent=True) or {}
         
-        # Atualiza as posições
-        for i, cliente in enumerate(clientes_fila, 1):
-            cliente.posicao_fila = i
+        barbeiro_id = dados.get('barbeiro_id')
+        concluir_atendendo = dados.get('concluir_atendendo', True)
         
+        if barbeiro_id is not None and (not isinstance(barbeiro_id, int) or isinstance(barbeiro_id, bool)):
+            return jsonify({
+                'erro': 'barbeiro_id deve ser um número inteiro',
+                'status': 'erro'
+            }), 400
+        
+        if not isinstance(concluir_atendendo, bool):
+            return jsonify({
+                'erro': 'concluir_atendendo deve ser true ou false',
+                'status': 'erro'
+            }), 400
+        
+        if barbeiro_id is not None and not db.session.get(Barbeiro, barbeiro_id):
+            return jsonify({
+                'erro': 'Barbeiro não encontrado',
+                'status': 'erro'
+            }), 404
+        
+        resumo = encerrar_dia(barbeiro_id, concluir_atendendo)
         db.session.commit()
         
+        atendendo_encerrados = sum(item['cancelados'] + item['concluidos'] for item in resumo['barbeiros']) \
+            - resumo['aguardando_cancelados']
+        estatisticas_fila.ajustar(clientes_aguardando=-resumo['aguardando_cancelados'],
+                                  clientes_atendendo=-atendendo_encerrados)
+        
+        return jsonify({
+            **resumo,
+            'mensagem': f'Fila encerrada: {resumo["cancelados"]} cancelado(s), {resumo["concluidos"]} concluído(s)',
+            'timestamp': datetime.utcnow().isoformat(),
+            'status': 'sucesso'
+        }), 200
+        
     except Exception as e:
         db.session.rollback()
-        raise e
-
+        return jsonify({
+            'erro': 'Erro ao encerrar a fila do dia',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
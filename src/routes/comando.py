@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Rotas da API: Comandos em Lote
+
+Este arquivo contém a rota que aplica, em uma única requisição e uma
+única transação, uma lista de operações da fila enviada pelo tablet do
+barbeiro (por exemplo, concluir o atendimento e chamar o próximo), e
+devolve a fila resultante. Um tablet que ficou sem conexão reenvia as
+ações guardadas de uma só vez; as chaves de idempotência garantem que
+uma ação já aplicada não seja aplicada de novo.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from flask import Blueprint, current_app, jsonify, request
+from sqlalchemy.exc import IntegrityError
+from src.models.user import db
+from src.services.comandos import OPERACOES, executar_comandos
+from src.services.estatisticas import estatisticas_fila
+from src.services.fila import montar_fila_completa
+from src.utils.orcamento_consultas import orcamento_consultas
+from collections import Counter
+from datetime import datetime
+
+# Criação do blueprint para a rota de comandos em lote
+comando_bp = Blueprint('comando', __name__)
+
+# Comandos aceitos por requisição
+MAXIMO_COMANDOS = 20
+
+# Consultas de um comando no pior caso (chamar cliente da fila de outro barbeiro)
+CONSULTAS_POR_COMANDO = 8
+
+def validar_comandos(comandos):
+    """
+    Valida a lista de comandos recebida.
+    
+    Args:
+        comandos: Valor do campo 'comandos' do corpo da requisição
+    
+    Returns:
+        tuple: (mensagem de erro, índice do comando) ou (None, None) se válida
+    """
+    if not isinstance(comandos, list) or not comandos:
+        return 'Campo comandos deve ser uma lista não vazia', None
+    
+    if len(comandos) > MAXIMO_COMANDOS:
+        return f'No máximo {MAXIMO_COMANDOS} comandos por requisição', None
+    
+    for indice, comando in enumerate(comandos):
+        if not isinstance(comando, dict) or comando.get('tipo') not in OPERACOES:
+            return f'tipo deve ser um de: {", ".join(OPERACOES)}', indice
+        
+        chave = comando.get('chave')
+        if not isinstance(chave, str) or not 0 < len(chave) <= 64:
+            return 'chave deve ser um texto de 1 a 64 caracteres', indice
+        
+        parametro = OPERACOES[comando['tipo']][1]
+        valor = comando.get(parametro)
+        if not isinstance(valor, int) or isinstance(valor, bool) or valor <= 0:
+            return f'{parametro} deve ser um número inteiro positivo', indice
+    
+    return None, None
+
+@comando_bp.route('/comandos', methods=['POST'])
+@orcamento_consultas(8 + CONSULTAS_POR_COMANDO * MAXIMO_COMANDOS, repeticoes=2 * MAXIMO_COMANDOS)
+def executar_lote_comandos():
+    """
+    Aplica uma lista ordenada de operações da fila em uma transação.
+    
+    Endpoint: POST /api/comandos
+    
+    Body (JSON):
+    {
+        "comandos": [
+            {"tipo": "concluir", "cliente_id": 12, "chave": "tablet-2-0041"},
+            {"tipo": "proximo", "barbeiro_id": 2, "chave": "tablet-2-0042"}
+        ]
+    }
+    
+    Tipos aceitos: 'concluir' e 'cancelar' (cliente_id) e 'proximo'
+    (barbeiro_id). Os comandos são aplicados na ordem; um comando que
+    não pode ser aplicado (ex.: cliente já cancelado pela recepção)
+    volta com o erro no resultado e não impede os seguintes. Um comando
+    com chave já processada não é aplicado de novo: o resultado original
+    volta com "repetido": true.
+    
+    Returns:
+        JSON: Resultado de cada comando e a fila completa após o lote
+    """
+    try:
+        dados = request.get_json(silent=True) or {}
+        comandos = dados.get('comandos')
+        
+        erro, indice = validar_comandos(comandos)
+        if erro:
+            return jsonify({
+                'erro': erro,
+                'indice': indice,
+                'status': 'erro'
+            }), 400
+        
+        retencao = current_app.config.get('COMMAND_KEY_RETENTION_HOURS', 48)
+        
+        # Se outro worker gravar as mesmas chaves ao mesmo tempo, o lote é
+        # repetido uma vez e encontra os comandos já processados
+        for tentativa in range(2):
+            variacoes = Counter()
+            try:
+                resultados = executar_comandos(comandos, variacoes, retencao)
+                db.session.commit()
+                break
+            except IntegrityError:
+                db.session.rollback()
+                if tentativa:
+                    raise
+        estatisticas_fila.ajustar(**variacoes)
+        
+        return jsonify({
+            'resultados': resultados,
+            'aplicados': sum(1 for item in resultados if not item['repetido'] and item['status'] != 'erro'),
+            'repetidos': sum(1 for item in resultados if item['repetido']),
+            'recusados': sum(1 for item in resultados if not item['repetido'] and item['status'] == 'erro'),
+            **montar_fila_completa(),
+            'timestamp': datetime.utcnow().isoformat(),
+            'status': 'sucesso'
+        }), 200
+    
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'erro': 'Erro ao executar comandos',
+            'detalhes': str(e),
+            'status': 'erro'
+        }), 500
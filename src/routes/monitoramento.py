@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Rotas da API: Monitoramento
+
+Este arquivo contém as rotas usadas para acompanhar o desempenho
+do sistema em produção, como a exportação de métricas.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from flask import Blueprint, Response, current_app, jsonify, request
+from src.utils.metricas import metricas
+from src.utils.consultas_lentas import consultas_lentas
+from src.utils.perfilador import perfilador, segredo_confere
+
+# Criação do blueprint para as rotas de monitoramento
+monitoramento_bp = Blueprint('monitoramento', __name__)
+
+@monitoramento_bp.route('/metrics', methods=['GET'])
+def exportar_metricas():
+    """
+    Exporta as métricas de latência e de banco por rota.
+    
+    Endpoint: GET /api/metrics
+    
+    Returns:
+        Text: Métricas no formato de texto do Prometheus
+    """
+    if not current_app.config.get('METRICS_ENABLED'):
+        return jsonify({
+            'erro': 'Coleta de métricas desativada',
+            'status': 'erro'
+        }), 404
+    
+    return Response(
+        metricas.exportar_prometheus(),
+        mimetype='text/plain; version=0.0.4; charset=utf-8'
+    )
+
+def _acesso_consultas_lentas_negado():
+    """
+    Verifica se o registro de consultas lentas está ativo e se o segredo foi enviado.
+    
+    Returns:
+        tuple: Resposta de erro, ou None se o acesso for permitido
+    """
+    segredo = current_app.config.get('SLOW_QUERY_SECRET')
+    if not current_app.config.get('SLOW_QUERY_LOG_ENABLED') or not segredo:
+        return jsonify({
+            'erro': 'Registro de consultas lentas desativado',
+            'status': 'erro'
+        }), 404
+    
+    cabecalho = current_app.config.get('SLOW_QUERY_HEADER', 'X-Debug-Secret')
+    if not segredo_confere(request.headers.get(cabecalho), segredo):
+        return jsonify({
+            'erro': 'Segredo de depuração inválido',
+            'status': 'erro'
+        }), 403
+    
+    return None
+
+@monitoramento_bp.route('/debug/slow-queries', methods=['GET'])
+def listar_consultas_lentas():
+    """
+    Lista as consultas lentas registradas e seus planos de execução.
+    
+    Endpoint: GET /api/debug/slow-queries
+    
+    Query Parameters:
+        - limite: Número máximo de entradas (padrão: todas as mantidas em memória)
+    
+    Returns:
+        JSON: Consultas lentas mais recentes e planos por SQL normalizado
+    """
+    negado = _acesso_consultas_lentas_negado()
+    if negado:
+        return negado
+    
+    limite = request.args.get('limite', type=int)
+    
+    return jsonify({
+        **consultas_lentas.listar(limite),
+        'status': 'sucesso'
+    }), 200
+
+@monitoramento_bp.route('/debug/slow-queries', methods=['DELETE'])
+def limpar_consultas_lentas():
+    """
+    Descarta as consultas lentas e os planos registrados.
+    
+    Endpoint: DELETE /api/debug/slow-queries
+    
+    Returns:
+        JSON: Confirmação da limpeza
+    """
+    negado = _acesso_consultas_lentas_negado()
+    if negado:
+        return negado
+    
+    consultas_lentas.limpar()
+    
+    return jsonify({
+        'mensagem': 'Registro de consultas lentas limpo',
+        'status': 'sucesso'
+    }), 200
+
+def _acesso_perfis_negado():
+    """
+    Verifica se o perfilador está ativo e se o segredo foi enviado.
+    
+    Returns:
+        tuple: Resposta de erro, ou None se o acesso for permitido
+    """
+    segredo = current_app.config.get('PROFILING_SECRET')
+    if not current_app.config.get('PROFILING_ENABLED') or not segredo:
+        return jsonify({
+            'erro': 'Perfilador desativado',
+            'status': 'erro'
+        }), 404
+    
+    cabecalho = current_app.config.get('PROFILING_HEADER', 'X-Profile')
+    if not segredo_confere(request.headers.get(cabecalho), segredo):
+        return jsonify({
+            'erro': 'Segredo do perfilador inválido',
+            'status': 'erro'
+        }), 403
+    
+    return None
+
+@monitoramento_bp.route('/debug/profiles', methods=['GET'])
+def listar_perfis():
+    """
+    Lista os perfis de requisição guardados.
+    
+    Endpoint: GET /api/debug/profiles
+    Header obrigatório: X-Profile com o segredo do perfilador
+    
+    Returns:
+        JSON: Resumo dos perfis, do mais recente ao mais antigo
+    """
+    negado = _acesso_perfis_negado()
+    if negado:
+        return negado
+    
+    return jsonify({
+        'perfis': perfilador.listar(),
+        'status': 'sucesso'
+    }), 200
+
+@monitoramento_bp.route('/debug/profiles/<perfil_id>', methods=['GET'])
+def obter_perfil(perfil_id):
+    """
+    Retorna um perfil: funções mais custosas e linha do tempo SQL.
+    
+    Endpoint: GET /api/debug/profiles/<id>
+    Header obrigatório: X-Profile com o segredo do perfilador
+    
+    Args:
+        perfil_id (str): ID informado no header X-Profile-Id da requisição perfilada
+    
+    Returns:
+        JSON: Perfil completo da requisição
+    """
+    negado = _acesso_perfis_negado()
+    if negado:
+        return negado
+    
+    perfil = perfilador.obter(perfil_id)
+    if perfil is None:
+        return jsonify({
+            'erro': 'Perfil não encontrado',
+            'status': 'erro'
+        }), 404
+    
+    return jsonify({
+        'perfil': perfil,
+        'status': 'sucesso'
+    }), 200
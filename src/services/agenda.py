@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Agenda de Horários Marcados
+
+Este arquivo cuida dos agendamentos e de como eles entram na fila:
+
+- Cada barbeiro tem um índice de intervalos com os agendamentos futuros,
+  usado para recusar horários que se sobrepõem e para somar o tempo já
+  reservado em uma janela. O índice fica em memória por loja e é
+  descartado quando os agendamentos mudam (evento 'agendamentos').
+- Ao marcar um horário, a linha do tempo prevista da fila sem horário
+  marcado (atendimento atual + clientes aguardando x tempo médio, mais
+  os agendamentos anteriores) é comparada com o início do agendamento;
+  se o barbeiro ainda estiver ocupado, a resposta avisa do conflito.
+- Quando o cliente agendado chega, ele entra na fila com a prioridade
+  'agendado' e o horário marcado, e passa à frente dos clientes sem
+  horário. Até ANTECEDENCIA minutos antes do horário, porém, ele só é
+  chamado se não houver mais ninguém na fila.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_
+
+# Agendamentos que ocupam a agenda do barbeiro
+STATUS_AGENDA = ('agendado', 'presente')
+
+class IndiceIntervalos:
+    """
+    Intervalos [inicio, fim) que não se sobrepõem, em ordem de início.
+    
+    Como os intervalos não se sobrepõem, ordenar por início também
+    ordena por fim, e os intervalos que cruzam uma janela formam uma
+    faixa contígua, encontrada com duas buscas binárias: O(log n + k).
+    
+    Atributos:
+        inicios (list): Início de cada intervalo, em ordem
+        fins (list): Fim de cada intervalo, na mesma ordem
+        ids (list): Identificador de cada intervalo
+    """
+
+    def __init__(self):
+        self.inicios = []
+        self.fins = []
+        self.ids = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def adicionar(self, inicio, fim, identificador):
+        """
+        Insere um intervalo mantendo a ordem.
+        
+        Args:
+            inicio (datetime): Início do intervalo
+            fim (datetime): Fim do intervalo (exclusivo)
+            identificador: Valor devolvido nas consultas (ID do agendamento)
+        """
+        posicao = bisect.bisect_left(self.inicios, inicio)
+        self.inicios.insert(posicao, inicio)
+        self.fins.insert(posicao, fim)
+        self.ids.insert(posicao, identificador)
+
+    def faixa(self, inicio, fim):
+        """
+        Returns:
+            range: Índices dos intervalos que cruzam [inicio, fim)
+        """
+        primeiro = bisect.bisect_right(self.fins, inicio)
+        ultimo = bisect.bisect_left(self.inicios, fim)
+        return range(primeiro, max(primeiro, ultimo))
+
+    def sobrepostos(self, inicio, fim):
+        """
+        Args:
+            inicio (datetime): Início da janela
+            fim (datetime): Fim da janela (exclusivo)
+        
+        Returns:
+            list: Identificadores dos intervalos que cruzam a janela
+        """
+        return [self.ids[i] for i in self.faixa(inicio, fim)]
+
+    def minutos_ocupados(self, inicio, fim):
+        """
+        Args:
+            inicio (datetime): Início da janela
+            fim (datetime): Fim da janela (exclusivo)
+        
+        Returns:
+            float: Minutos da janela cobertos por intervalos
+        """
+        total = timedelta()
+        for i in self.faixa(inicio, fim):
+            total += min(self.fins[i], fim) - max(self.inicios[i], inicio)
+        return total.total_seconds() / 60
+
+class AgendaBarbeiros:
+    """
+    Índices de intervalos dos agendamentos, um por barbeiro de cada loja.
+    
+    Atributos:
+        antecedencia (float): Minutos antes do horário a partir dos quais
+            o cliente agendado passa à frente na chamada
+        duracao_padrao (int): Minutos reservados quando a duração não é informada
+        indices (dict): (loja, barbeiro_id) -> IndiceIntervalos
+    """
+
+    def __init__(self):
+        self.antecedencia = 10
+        self.duracao_padrao = 30
+        self.indices = {}
+        self.trava = threading.Lock()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.antecedencia = app.config.get('APPOINTMENT_EARLY_MINUTES', 10)
+        self.duracao_padrao = app.config.get('APPOINTMENT_DEFAULT_MINUTES', 30)
+
+    def invalidar(self, loja=''):
+        """
+        Descarta os índices de uma loja (reconstruídos na próxima consulta).
+        
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+        """
+        with self.trava:
+            for chave in [chave for chave in self.indices if chave[0] == loja]:
+                del self.indices[chave]
+
+    def indice(self, barbeiro_id):
+        """
+        Índice dos agendamentos de um barbeiro que ainda não terminaram.
+        
+        Args:
+            barbeiro_id (int): ID do barbeiro
+        
+        Returns:
+            IndiceIntervalos: Índice do barbeiro
+        """
+        from src.models.user import db
+        from src.models.agendamento import Agendamento
+        from src.services.lojas import chave_loja
+        
+        chave = (chave_loja(), barbeiro_id)
+        with self.trava:
+            indice = self.indices.get(chave)
+        if indice is not None:
+            return indice
+        
+        # A duração máxima de um agendamento é de um dia; começar a busca
+        # um dia antes cobre os que começaram antes e ainda não terminaram
+        agora = datetime.utcnow()
+        agendamentos = db.session.execute(
+            db.select(Agendamento.id, Agendamento.inicio, Agendamento.duracao_minutos)
+            .where(Agendamento.barbeiro_id == barbeiro_id,
+                   Agendamento.status.in_(STATUS_AGENDA),
+                   Agendamento.inicio >= agora - timedelta(days=1))
+            .order_by(Agendamento.inicio)
+        ).all()
+        
+        indice = IndiceIntervalos()
+        for agendamento_id, inicio, duracao in agendamentos:
+            fim = inicio + timedelta(minutes=duracao)
+            if fim > agora:
+                indice.inicios.append(inicio)
+                indice.fins.append(fim)
+                indice.ids.append(agendamento_id)
+        
+        with self.trava:
+            self.indices[chave] = indice
+        return indice
+
+    def verificar_conflitos(self, barbeiro_id, inicio, fim, agora=None):
+        """
+        Verifica um novo horário contra a agenda e a fila do barbeiro.
+        
+        Args:
+            barbeiro_id (int): ID do barbeiro
+            inicio (datetime): Início do horário pedido
+            fim (datetime): Fim do horário pedido
+            agora (datetime): Momento de referência (padrão: agora)
+        
+        Returns:
+            dict: 'agendamentos' (IDs que se sobrepõem ao horário) e 'fila'
+                (None, ou a previsão de quando o barbeiro termina a fila
+                sem horário marcado, se isso for depois do início)
+        """
+        from src.services.escalonador import escalonador
+        
+        agora = agora or datetime.utcnow()
+        indice = self.indice(barbeiro_id)
+        
+        conflitos = {'agendamentos': indice.sobrepostos(inicio, fim), 'fila': None}
+        
+        estimativa = escalonador.minutos_ate_livre(agora, barbeiro_id)
+        if estimativa and inicio > agora:
+            # Agendamentos anteriores ao horário também ocupam o barbeiro
+            # e empurram a fila sem horário para mais tarde
+            minutos = estimativa[0][0] + indice.minutos_ocupados(agora, inicio)
+            livre_previsto = agora + timedelta(minutes=minutos)
+            if livre_previsto > inicio:
+                conflitos['fila'] = {
+                    'clientes_aguardando': estimativa[0][1],
+                    'livre_previsto': livre_previsto.isoformat(),
+                    'atraso_minutos': round((livre_previsto - inicio).total_seconds() / 60)
+                }
+        
+        return conflitos
+
+    def agendado_antecipado(self, agora=None):
+        """
+        Condição dos clientes agendados que chegaram antes da antecedência
+        permitida e só devem ser chamados se não houver mais ninguém.
+        
+        Args:
+            agora (datetime): Momento de referência (padrão: agora)
+        
+        Returns:
+            Expressão SQL booleana sobre Cliente
+        """
+        from src.models.cliente import Cliente, PRIORIDADES
+        
+        limite = (agora or datetime.utcnow()) + timedelta(minutes=self.antecedencia)
+        return and_(Cliente.prioridade == PRIORIDADES['agendado'], Cliente.horario_agendado > limite)
+
+# Instância única, compartilhada pela aplicação
+agenda = AgendaBarbeiros()
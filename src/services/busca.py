@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Busca de Clientes por Nome
+
+Este arquivo contém a busca por nome nos clientes da fila e no
+histórico de atendimentos, feita no índice FTS5 busca_clientes (criado
+e mantido por gatilhos em src/models/migracoes.py) em vez de um LIKE
+'%...%' que leria as duas tabelas inteiras.
+
+Cada palavra digitada vira um prefixo ("raf" encontra "Rafael"); todas
+as palavras precisam aparecer no nome, em qualquer ordem. Acentos e
+maiúsculas são ignorados. Os resultados vêm em ordem de relevância
+(bm25) e, entre nomes igualmente relevantes, dos mais recentes para os
+mais antigos. Calcular o bm25 exige pontuar todas as ocorrências; para
+buscas muito amplas (ex.: "jo" em milhões de atendimentos), acima de
+SEARCH_RANK_LIMIT resultados, a ordem passa a ser só dos mais recentes,
+que o FTS5 percorre direto no índice.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import re
+
+from sqlalchemy import select, text
+from src.models.migracoes import ORIGENS_BUSCA, TABELA_BUSCA, TABELA_PAUSA_BUSCA
+
+# Palavras consideradas da busca digitada
+MAXIMO_PALAVRAS = 8
+
+def expressao_busca(texto):
+    """
+    Converte o texto digitado em uma expressão MATCH do FTS5.
+    
+    Cada palavra vai entre aspas (a sintaxe do FTS5 não é interpretada)
+    e com * para buscar por prefixo.
+    
+    Args:
+        texto (str): Texto digitado, ex.: 'rafael so'
+    
+    Returns:
+        str: Expressão, ex.: '"rafael"* "so"*', ou None se não houver palavras
+    """
+    palavras = re.findall(r'\w+', texto or '')[:MAXIMO_PALAVRAS]
+    if not palavras:
+        return None
+    return ' '.join(f'"{palavra}"*' for palavra in palavras)
+
+def buscar_clientes(texto, pagina=1, limite=20, maximo_ranqueados=5000):
+    """
+    Busca clientes da fila e atendimentos do histórico pelo nome.
+    
+    Args:
+        texto (str): Texto digitado
+        pagina (int): Página dos resultados (a partir de 1)
+        limite (int): Resultados por página
+        maximo_ranqueados (int): Acima deste total, ordena só por recência
+    
+    Returns:
+        tuple: (total de resultados, lista de (origem, id) da página,
+            True se a ordem é de relevância), com origem 'clientes' ou 'atendimentos'
+    """
+    from src.models.user import db
+    
+    expressao = expressao_busca(texto)
+    if expressao is None:
+        return 0, [], True
+    
+    total = db.session.execute(
+        text(f'SELECT count(*) FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH :expressao'),
+        {'expressao': expressao}
+    ).scalar()
+    if not total:
+        return 0, [], True
+    
+    ranqueado = total <= maximo_ranqueados
+    linhas = db.session.execute(
+        text(f'SELECT rowid FROM {TABELA_BUSCA} WHERE {TABELA_BUSCA} MATCH :expressao '
+             f'ORDER BY {"rank, " if ranqueado else ""}rowid DESC LIMIT :limite OFFSET :deslocamento'),
+        {'expressao': expressao, 'limite': limite, 'deslocamento': (pagina - 1) * limite}
+    ).scalars()
+    
+    tabelas = {origem: tabela for tabela, _, origem in ORIGENS_BUSCA}
+    return total, [(tabelas[linha % 2], linha // 2) for linha in linhas], ranqueado
+
+def carregar_resultados(encontrados):
+    """
+    Carrega os registros encontrados na busca, uma consulta por tabela.
+    
+    Args:
+        encontrados (list): (origem, id) em ordem de relevância
+    
+    Returns:
+        list: Registros em dicionário, na mesma ordem, com 'origem'
+            ('fila' ou 'historico') e 'nome'; registros removidos entre a
+            busca e a leitura são omitidos
+    """
+    from src.models.user import db
+    from src.models.atendimento import Atendimento
+    from src.models.cliente import Cliente
+    
+    ids = {'clientes': [], 'atendimentos': []}
+    for origem, registro_id in encontrados:
+        ids[origem].append(registro_id)
+    
+    registros = {}
+    if ids['clientes']:
+        for cliente in db.session.execute(select(Cliente).where(Cliente.id.in_(ids['clientes']))).scalars():
+            registros[('clientes', cliente.id)] = {'origem': 'fila', **cliente.to_dict()}
+    if ids['atendimentos']:
+        for atendimento in db.session.execute(
+            select(Atendimento).where(Atendimento.id.in_(ids['atendimentos']))
+        ).scalars():
+            registros[('atendimentos', atendimento.id)] = {'origem': 'historico', 'nome': atendimento.nome_cliente,
+                                                           **atendimento.to_dict()}
+    
+    return [registros[chave] for chave in encontrados if chave in registros]
+
+class IndexacaoEmLote:
+    """
+    Indexa em lote os nomes gravados por uma carga em massa.
+    
+    Enquanto a transação da carga está aberta, uma linha em
+    TABELA_PAUSA_BUSCA desliga os gatilhos de inserção; antes do commit
+    as linhas novas (IDs acima dos já vistos) são indexadas com um
+    INSERT ... SELECT por tabela e a pausa é removida. Como a pausa é
+    gravada e removida na mesma transação, as demais conexões nunca a
+    veem, e um rollback a desfaz junto com a carga.
+    
+    Uso (em cada transação da carga):
+        indexacao = IndexacaoEmLote(conexao)
+        indexacao.pausar()
+        ...  # executemany
+        indexacao.indexar()
+        transacao.commit()
+    """
+
+    def __init__(self, conexao):
+        """
+        Args:
+            conexao (Connection): Conexão do SQLAlchemy Core
+        """
+        self.conexao = conexao
+        self.ativa = conexao.dialect.name == 'sqlite' and conexao.exec_driver_sql(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (TABELA_PAUSA_BUSCA,)
+        ).first() is not None
+        self.marcas = {}
+
+    def pausar(self):
+        """Desliga os gatilhos de inserção até indexar() (dentro da transação atual)."""
+        if not self.ativa:
+            return
+        
+        # A escrita obtém a trava do banco antes de ler os maiores IDs: daqui
+        # até o commit nenhuma outra conexão grava linhas (já indexadas)
+        self.conexao.exec_driver_sql(f'INSERT INTO {TABELA_PAUSA_BUSCA} (pausada) VALUES (1)')
+        for tabela, _, _ in ORIGENS_BUSCA:
+            self.marcas[tabela] = self.conexao.exec_driver_sql(f'SELECT max(id) FROM {tabela}').scalar() or 0
+
+    def indexar(self):
+        """Indexa as linhas gravadas desde a última chamada e religa os gatilhos."""
+        if not self.ativa:
+            return
+        
+        for tabela, coluna, origem in ORIGENS_BUSCA:
+            maior = self.conexao.exec_driver_sql(f'SELECT max(id) FROM {tabela}').scalar() or 0
+            if maior > self.marcas[tabela]:
+                self.conexao.exec_driver_sql(
+                    f'INSERT INTO {TABELA_BUSCA} (rowid, nome) '
+                    f'SELECT id * 2 + {origem}, {coluna} FROM {tabela} WHERE id > ?', (self.marcas[tabela],)
+                )
+                self.marcas[tabela] = maior
+        self.conexao.exec_driver_sql(f'DELETE FROM {TABELA_PAUSA_BUSCA}')
@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Operações da Fila e Comandos em Lote
+
+Este arquivo contém as operações que o tablet do barbeiro executa na
+fila (concluir, cancelar e chamar o próximo cliente). Elas são usadas
+pelas rotas individuais e por POST /api/comandos, que aplica uma lista
+ordenada de operações em uma única transação.
+
+As operações não fazem commit: quem chama confirma a transação e, depois
+do commit, aplica aos contadores de /api/status as variações acumuladas.
+Uma operação inválida (cliente inexistente, status errado) é recusada
+com ErroComando antes de alterar qualquer coisa.
+
+Cada comando do lote traz uma chave de idempotência. O resultado de cada
+comando é gravado em comandos_processados na mesma transação; um comando
+reenviado com a mesma chave (tablet que perdeu a resposta e repete a
+fila de ações guardadas) recebe o resultado gravado e não é aplicado de
+novo.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+from sqlalchemy import case, delete, insert, select
+from src.models.user import db
+from src.models.barbeiro import Barbeiro
+from src.models.cliente import Cliente
+from src.models.atendimento import Atendimento
+from src.models.comando import ComandoProcessado
+from src.services.agenda import agenda
+from src.services.escalonador import escalonador
+from src.services.fila import (
+    ErroFila, arquivar_cliente, buscar_cliente, ordem_fila, recalcular_posicoes,
+    registrar_chamada, registrar_fim_atendimento, registrar_saida_fila
+)
+
+class ErroComando(ErroFila):
+    """
+    Operação recusada por estar inválida no estado atual da fila.
+    
+    Atributos:
+        codigo (int): Status HTTP correspondente (400 ou 404)
+    """
+
+    def __init__(self, mensagem, codigo=400):
+        super().__init__(mensagem)
+        self.codigo = codigo
+
+def concluir_cliente(cliente_id, variacoes):
+    """
+    Conclui o atendimento de um cliente e registra o atendimento.
+    
+    Args:
+        cliente_id (int): ID do cliente
+        variacoes (Counter): Recebe as variações dos contadores de /api/status
+    
+    Returns:
+        dict: Cliente arquivado, atendimento e mensagem
+    
+    Raises:
+        ErroComando: Cliente inexistente ou que não está em atendimento
+    """
+    cliente = buscar_cliente(cliente_id)
+    if not cliente:
+        raise ErroComando('Cliente não encontrado', 404)
+    
+    if cliente.status != 'atendendo':
+        raise ErroComando('Cliente não está sendo atendido no momento')
+    
+    # Cria o registro de atendimento (início = momento em que o cliente foi chamado)
+    atendimento = Atendimento.de_cliente(cliente)
+    atendimento.finalizar_atendimento()
+    
+    # Marca o cliente como concluído e o move para o arquivo
+    cliente.concluir_atendimento()
+    registrar_fim_atendimento(cliente.barbeiro_id, cliente.id)
+    cliente_data = arquivar_cliente(cliente).to_dict()
+    
+    db.session.add(atendimento)
+    db.session.flush()
+    variacoes['clientes_atendendo'] -= 1
+    
+    return {
+        'cliente': cliente_data,
+        'atendimento': atendimento.to_dict(),
+        'mensagem': f'Atendimento do cliente {cliente_data["nome"]} (Ficha {cliente_data["numero_ficha"]}) foi concluído',
+        'status': 'sucesso'
+    }
+
+def cancelar_cliente(cliente_id, variacoes):
+    """
+    Cancela um cliente aguardando ou em atendimento.
+    
+    Args:
+        cliente_id (int): ID do cliente
+        variacoes (Counter): Recebe as variações dos contadores de /api/status
+    
+    Returns:
+        dict: Cliente arquivado e mensagem
+    
+    Raises:
+        ErroComando: Cliente inexistente ou já encerrado
+    """
+    cliente = buscar_cliente(cliente_id)
+    if not cliente:
+        raise ErroComando('Cliente não encontrado', 404)
+    
+    if cliente.status == 'concluido':
+        raise ErroComando('Atendimento já foi concluído')
+    
+    if not isinstance(cliente, Cliente):
+        raise ErroComando('Atendimento já foi cancelado')
+    
+    barbeiro_id = cliente.barbeiro_id
+    status_anterior = cliente.status
+    
+    # Cancela o atendimento e move o cliente para o arquivo
+    cliente.cancelar_atendimento()
+    if status_anterior == 'aguardando':
+        registrar_saida_fila(barbeiro_id)
+    elif status_anterior == 'atendendo':
+        registrar_fim_atendimento(barbeiro_id, cliente.id)
+    cliente_data = arquivar_cliente(cliente).to_dict()
+    
+    if status_anterior == 'aguardando':
+        # Os clientes que estavam atrás avançam uma posição
+        db.session.flush()
+        recalcular_posicoes([barbeiro_id])
+    variacoes[f'clientes_{status_anterior}'] -= 1
+    
+    return {
+        'cliente': cliente_data,
+        'mensagem': f'Atendimento do cliente {cliente_data["nome"]} (Ficha {cliente_data["numero_ficha"]}) foi cancelado',
+        'status': 'sucesso'
+    }
+
+def chamar_proximo(barbeiro_id, variacoes):
+    """
+    Chama o próximo cliente da fila do barbeiro.
+    
+    A fila segue a ordem de prioridade (ver ordem_fila); agendados que
+    chegaram muito antes do horário só são chamados se não houver mais
+    ninguém. Com a fila vazia, o barbeiro chama o cliente "qualquer
+    barbeiro" mais à frente na fila de outro barbeiro.
+    
+    Args:
+        barbeiro_id (int): ID do barbeiro
+        variacoes (Counter): Recebe as variações dos contadores de /api/status
+    
+    Returns:
+        dict: Cliente chamado e mensagem (status 'info' se não há clientes)
+    
+    Raises:
+        ErroComando: Barbeiro inexistente
+    """
+    barbeiro = db.session.get(Barbeiro, barbeiro_id)
+    if not barbeiro:
+        raise ErroComando('Barbeiro não encontrado', 404)
+    
+    proximo_cliente = Cliente.query.filter_by(
+        barbeiro_id=barbeiro_id,
+        status='aguardando'
+    ).order_by(
+        case((agenda.agendado_antecipado(), 1), else_=0),
+        *ordem_fila()
+    ).first()
+    
+    if proximo_cliente:
+        # Marca o cliente como sendo atendido; os demais tomam as novas posições
+        proximo_cliente.iniciar_atendimento()
+        registrar_chamada(barbeiro_id, proximo_cliente.id)
+        db.session.flush()
+        recalcular_posicoes([barbeiro_id])
+    else:
+        # Fila vazia: chama um cliente sem preferência da fila de outro barbeiro
+        proximo_cliente = escalonador.puxar_cliente_flexivel(barbeiro_id)
+        if not proximo_cliente:
+            return {
+                'mensagem': 'Não há clientes na fila',
+                'status': 'info'
+            }
+        registrar_chamada(barbeiro_id, proximo_cliente.id)
+    
+    variacoes['clientes_aguardando'] -= 1
+    variacoes['clientes_atendendo'] += 1
+    
+    return {
+        'cliente_chamado': proximo_cliente.to_dict(),
+        'mensagem': f'Cliente {proximo_cliente.nome} (Ficha {proximo_cliente.numero_ficha}) foi chamado',
+        'status': 'sucesso'
+    }
+
+# Operações aceitas em POST /api/comandos: tipo -> (função, parâmetro)
+OPERACOES = {
+    'concluir': (concluir_cliente, 'cliente_id'),
+    'cancelar': (cancelar_cliente, 'cliente_id'),
+    'proximo': (chamar_proximo, 'barbeiro_id'),
+}
+
+def executar_comandos(comandos, variacoes, retencao_horas=48):
+    """
+    Aplica uma lista de comandos já validada, na ordem, sem commit.
+    
+    Os clientes citados nos comandos são carregados com uma consulta
+    antes da execução, e as chaves já processadas com outra. Um comando
+    recusado (ErroComando) entra nos resultados com o erro e não impede
+    os seguintes.
+    
+    Args:
+        comandos (list): Dicionários com 'tipo', 'chave' e o parâmetro da operação
+        variacoes (Counter): Recebe as variações dos contadores de /api/status
+        retencao_horas (float): Chaves mais antigas que isso são descartadas
+    
+    Returns:
+        list: Resultado de cada comando, na ordem; comandos reenviados
+            trazem o resultado original com 'repetido': true
+    """
+    agora = datetime.utcnow()
+    
+    chaves = {comando['chave'] for comando in comandos}
+    processados = {
+        chave: json.loads(resposta) for chave, resposta in db.session.execute(
+            select(ComandoProcessado.chave, ComandoProcessado.resposta)
+            .where(ComandoProcessado.chave.in_(chaves))
+        )
+    }
+    
+    # Carrega de uma vez os clientes da fila citados (db.session.get os acha na sessão)
+    clientes_ids = {comando['cliente_id'] for comando in comandos
+                    if 'cliente_id' in comando and comando['chave'] not in processados}
+    if clientes_ids:
+        Cliente.query.filter(Cliente.id.in_(clientes_ids)).all()
+    
+    resultados = []
+    novos = []
+    for indice, comando in enumerate(comandos):
+        chave = comando['chave']
+        if chave in processados:
+            resultados.append({**processados[chave], 'indice': indice, 'repetido': True})
+            continue
+        
+        operacao, parametro = OPERACOES[comando['tipo']]
+        try:
+            resultado = operacao(comando[parametro], variacoes)
+        except ErroComando as e:
+            resultado = {'erro': str(e), 'codigo': e.codigo, 'status': 'erro'}
+        
+        resultado = {'tipo': comando['tipo'], 'chave': chave, **resultado}
+        processados[chave] = resultado
+        novos.append({'chave': chave, 'tipo': comando['tipo'], 'resposta': json.dumps(resultado),
+                      'processado_em': agora})
+        resultados.append({**resultado, 'indice': indice, 'repetido': False})
+    
+    if novos:
+        db.session.execute(insert(ComandoProcessado), novos)
+    db.session.execute(delete(ComandoProcessado).where(
+        ComandoProcessado.processado_em < agora - timedelta(hours=retencao_horas)
+    ))
+    
+    return resultados
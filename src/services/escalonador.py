@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Escalonador "Qualquer Barbeiro"
+
+Clientes sem preferência de barbeiro são colocados na fila do barbeiro
+que deve ficar livre primeiro. O tempo até ficar livre de cada barbeiro
+ativo é estimado por:
+
+    restante do atendimento atual + clientes aguardando x tempo médio
+
+em que o tempo médio de atendimento vem do histórico do próprio
+barbeiro em atendimentos, e o restante do atendimento atual é o tempo
+médio menos o tempo já decorrido desde que o cliente foi chamado.
+
+Os barbeiros vão para um heap de mínimo por esse tempo. Como a chave
+depende do relógio, o heap é montado a cada escolha a partir de uma
+única leitura da tabela barbeiros (os contadores da fila já estão nela);
+os tempos médios, que exigem agregar o histórico, ficam em memória por
+loja e são descartados quando um atendimento é registrado.
+
+Clientes "qualquer barbeiro" continuam flexíveis depois de entrar na
+fila: um barbeiro que fica livre sem ninguém na própria fila chama o
+cliente flexível que chegou primeiro na fila de outro barbeiro.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+class EscalonadorBarbeiros:
+    """
+    Escolhe o barbeiro de clientes sem preferência.
+    
+    Atributos:
+        tempo_padrao (float): Minutos de atendimento assumidos para
+            barbeiros sem histórico
+        dias_historico (int): Dias de atendimentos considerados na média
+        validade_medias (float): Segundos até recalcular os tempos médios
+        medias (dict): Por loja, (calculado_em, {barbeiro_id: minutos}, média geral)
+    """
+
+    def __init__(self):
+        self.tempo_padrao = 30
+        self.dias_historico = 30
+        self.validade_medias = 300
+        self.medias = {}
+        self.trava = threading.Lock()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.tempo_padrao = app.config.get('SCHEDULER_DEFAULT_SERVICE_MINUTES', 30)
+        self.dias_historico = app.config.get('SCHEDULER_HISTORY_DAYS', 30)
+        self.validade_medias = app.config.get('SCHEDULER_AVERAGE_TTL', 300)
+
+    def invalidar(self, loja=''):
+        """
+        Descarta os tempos médios de uma loja (recalculados na próxima escolha).
+        
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+        """
+        with self.trava:
+            self.medias.pop(loja, None)
+
+    def tempos_medios(self):
+        """
+        Tempo médio de atendimento de cada barbeiro, em minutos.
+        
+        Returns:
+            tuple: ({barbeiro_id: minutos}, média geral ou None sem histórico)
+        """
+        from src.models.user import db
+        from src.models.atendimento import Atendimento
+        from src.services.lojas import chave_loja
+        
+        loja = chave_loja()
+        with self.trava:
+            guardado = self.medias.get(loja)
+        if guardado is not None and time.monotonic() - guardado[0] < self.validade_medias:
+            return guardado[1], guardado[2]
+        
+        # Atendimentos com tempo zero vêm de registros sem o início real
+        # do atendimento e distorceriam a média
+        desde = datetime.utcnow() - timedelta(days=self.dias_historico)
+        linhas = db.session.execute(
+            select(Atendimento.barbeiro_id, func.sum(Atendimento.tempo_atendimento), func.count(Atendimento.id))
+            .where(Atendimento.data_fim >= desde, Atendimento.tempo_atendimento > 0)
+            .group_by(Atendimento.barbeiro_id)
+        ).all()
+        
+        medias = {barbeiro_id: total / quantidade for barbeiro_id, total, quantidade in linhas}
+        quantidade = sum(linha[2] for linha in linhas)
+        geral = sum(linha[1] for linha in linhas) / quantidade if quantidade else None
+        
+        with self.trava:
+            self.medias[loja] = (time.monotonic(), medias, geral)
+        return medias, geral
+
+    def minutos_ate_livre(self, agora=None, barbeiro_id=None):
+        """
+        Estima quanto tempo falta para cada barbeiro ativo atender toda a fila.
+        
+        Args:
+            agora (datetime): Momento de referência (padrão: agora)
+            barbeiro_id (int): Estima apenas este barbeiro (None para todos)
+        
+        Returns:
+            list: (minutos até ficar livre, clientes aguardando, nome, barbeiro_id)
+        """
+        from src.models.user import db
+        from src.models.barbeiro import Barbeiro
+        from src.models.cliente import Cliente
+        
+        agora = agora or datetime.utcnow()
+        medias, geral = self.tempos_medios()
+        padrao = geral or self.tempo_padrao
+        
+        consulta = (
+            select(Barbeiro.id, Barbeiro.nome, Barbeiro.clientes_aguardando, Cliente.inicio_atendimento,
+                   Barbeiro.cliente_atual_id)
+            .outerjoin(Cliente, Cliente.id == Barbeiro.cliente_atual_id)
+            .where(Barbeiro.ativo.is_(True))
+        )
+        if barbeiro_id is not None:
+            consulta = consulta.where(Barbeiro.id == barbeiro_id)
+        barbeiros = db.session.execute(consulta).all()
+        
+        estimativas = []
+        for id_barbeiro, nome, aguardando, inicio, cliente_atual_id in barbeiros:
+            media = medias.get(id_barbeiro, padrao)
+            restante = 0
+            if cliente_atual_id is not None:
+                decorrido = (agora - inicio).total_seconds() / 60 if inicio else 0
+                restante = max(media - decorrido, 0)
+            estimativas.append((restante + (aguardando or 0) * media, aguardando or 0, nome, id_barbeiro))
+        return estimativas
+
+    def montar_heap(self, agora=None):
+        """
+        Monta o heap de mínimo dos barbeiros ativos pelo tempo até ficarem livres.
+        
+        Args:
+            agora (datetime): Momento de referência (padrão: agora)
+        
+        Returns:
+            list: Heap de (minutos até ficar livre, clientes aguardando, nome, barbeiro_id)
+        """
+        heap = self.minutos_ate_livre(agora)
+        heapq.heapify(heap)
+        return heap
+
+    def escolher(self, agora=None):
+        """
+        Escolhe o barbeiro que deve ficar livre primeiro.
+        
+        Args:
+            agora (datetime): Momento de referência (padrão: agora)
+        
+        Returns:
+            tuple: (barbeiro_id, espera estimada em minutos), ou None se
+                não há barbeiro ativo
+        """
+        heap = self.montar_heap(agora)
+        if not heap:
+            return None
+        
+        espera, _, _, barbeiro_id = heapq.heappop(heap)
+        return barbeiro_id, round(espera)
+
+    def puxar_cliente_flexivel(self, barbeiro_id):
+        """
+        Passa para um barbeiro livre o cliente "qualquer barbeiro" que
+        está mais à frente na fila de outro barbeiro (sem commit).
+        
+        O cliente sai da fila de origem, cujas posições e contador são
+        atualizados, e já volta marcado como em atendimento; quem chama
+        registra a chamada no barbeiro livre.
+        
+        Args:
+            barbeiro_id (int): Barbeiro que ficou livre
+        
+        Returns:
+            Cliente: Cliente transferido, ou None se não há cliente flexível
+        """
+        from src.models.cliente import Cliente
+        from src.services.fila import ordem_fila, recalcular_posicoes, registrar_saida_fila
+        
+        cliente = Cliente.query.filter(
+            Cliente.status == 'aguardando',
+            Cliente.qualquer_barbeiro.is_(True),
+            Cliente.barbeiro_id != barbeiro_id
+        ).order_by(*ordem_fila()).first()
+        
+        if cliente is None:
+            return None
+        
+        origem_id = cliente.barbeiro_id
+        cliente.barbeiro_id = barbeiro_id
+        cliente.iniciar_atendimento()
+        registrar_saida_fila(origem_id)
+        recalcular_posicoes([origem_id])
+        return cliente
+
+# Instância única, compartilhada pela aplicação
+escalonador = EscalonadorBarbeiros()
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Contadores da Fila em Memória
+
+Este arquivo mantém em memória os contadores exibidos em /api/status
+(barbeiros cadastrados e ativos, clientes aguardando e em atendimento).
+As rotas que alteram barbeiros e clientes aplicam a variação de cada
+operação depois do commit, e os contadores são reconciliados com o
+banco na inicialização e periodicamente, corrigindo alterações feitas
+por outros processos (outros workers, comandos de linha de comando).
+No modo multi-loja cada loja tem seus próprios contadores.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import threading
+from datetime import datetime
+
+from flask import g, has_app_context
+from sqlalchemy import case, func
+from werkzeug.local import LocalProxy
+
+# Contadores mantidos, na ordem exibida em /api/status
+CONTADORES = ('total_barbeiros', 'barbeiros_ativos', 'clientes_aguardando', 'clientes_atendendo')
+
+# Tentativas de reconciliação quando as rotas alteram os contadores durante a leitura
+TENTATIVAS_RECONCILIACAO = 3
+
+class EstatisticasFila:
+    """
+    Contadores da fila protegidos por uma trava.
+    
+    Atributos:
+        valores (dict): Valor atual de cada contador
+        geracao (int): Incrementado a cada ajuste, detecta ajustes concorrentes
+        reconciliado_em (datetime): Última reconciliação com o banco
+    """
+
+    def __init__(self):
+        self.valores = dict.fromkeys(CONTADORES, 0)
+        self.geracao = 0
+        self.reconciliado_em = None
+        self.trava = threading.Lock()
+        self._agendada = False
+        self._thread = None
+        self._parar = threading.Event()
+
+    def ajustar(self, **variacoes):
+        """
+        Aplica a variação de uma operação já confirmada no banco.
+        
+        Exemplo:
+            estatisticas_fila.ajustar(clientes_aguardando=-1, clientes_atendendo=1)
+        
+        Args:
+            **variacoes: Variação de cada contador alterado
+        """
+        with self.trava:
+            for contador, variacao in variacoes.items():
+                self.valores[contador] += variacao
+            self.geracao += 1
+
+    def ajustar_status_cliente(self, status_anterior, status_novo):
+        """
+        Aplica a mudança de status de um cliente.
+        
+        Args:
+            status_anterior (str): Status antes da operação (None para cliente novo)
+            status_novo (str): Status depois da operação
+        """
+        if status_anterior == status_novo:
+            return
+        
+        variacoes = {}
+        for status, sinal in ((status_anterior, -1), (status_novo, 1)):
+            if status in ('aguardando', 'atendendo'):
+                contador = f'clientes_{status}'
+                variacoes[contador] = variacoes.get(contador, 0) + sinal
+        
+        if variacoes:
+            self.ajustar(**variacoes)
+
+    def contar_no_banco(self):
+        """
+        Conta no banco os valores de todos os contadores.
+        
+        Returns:
+            dict: Valor de cada contador
+        """
+        from src.models.user import db
+        from src.models.barbeiro import Barbeiro
+        from src.models.cliente import Cliente
+        
+        total_barbeiros, barbeiros_ativos = db.session.query(
+            func.count(Barbeiro.id),
+            func.coalesce(func.sum(case((Barbeiro.ativo.is_(True), 1), else_=0)), 0)
+        ).one()
+        
+        clientes = dict(
+            db.session.query(Cliente.status, func.count(Cliente.id))
+            .filter(Cliente.status.in_(['aguardando', 'atendendo']))
+            .group_by(Cliente.status)
+            .all()
+        )
+        
+        return {
+            'total_barbeiros': total_barbeiros,
+            'barbeiros_ativos': barbeiros_ativos,
+            'clientes_aguardando': clientes.get('aguardando', 0),
+            'clientes_atendendo': clientes.get('atendendo', 0)
+        }
+
+    def reconciliar(self):
+        """
+        Substitui os contadores pelos valores do banco.
+        
+        Se alguma rota ajustar os contadores durante a leitura, não há
+        como saber se o ajuste já está refletido na contagem; a leitura
+        é descartada e repetida.
+        
+        Returns:
+            bool: True se os contadores foram reconciliados
+        """
+        from src.models.user import db
+        
+        for _ in range(TENTATIVAS_RECONCILIACAO):
+            with self.trava:
+                geracao = self.geracao
+            
+            try:
+                valores = self.contar_no_banco()
+            finally:
+                db.session.remove()
+            
+            with self.trava:
+                if self.geracao == geracao:
+                    self.valores = valores
+                    self.reconciliado_em = datetime.utcnow()
+                    return True
+        
+        return False
+
+    def agendar_reconciliacao(self, executar, atraso=0.05):
+        """
+        Agenda uma reconciliação, agrupando os pedidos feitos em sequência.
+        
+        Usado quando outro worker avisa que alterou a fila: uma rajada de
+        eventos resulta em uma única reconciliação.
+        
+        Args:
+            executar (callable): Função que reconcilia estes contadores
+                (com o contexto de aplicação e a loja adequados)
+            atraso (float): Segundos de espera antes de reconciliar
+        """
+        with self.trava:
+            if self._agendada:
+                return
+            self._agendada = True
+
+        def disparar():
+            with self.trava:
+                self._agendada = False
+            executar()
+        
+        temporizador = threading.Timer(atraso, disparar)
+        temporizador.daemon = True
+        temporizador.start()
+
+    def obter(self):
+        """
+        Returns:
+            dict: Cópia dos contadores atuais
+        """
+        with self.trava:
+            return dict(self.valores)
+
+    def iniciar_reconciliacao_periodica(self, app, intervalo):
+        """
+        Inicia a thread que reconcilia os contadores a cada `intervalo` segundos.
+        
+        Args:
+            app (Flask): Aplicação cujo banco é consultado
+            intervalo (float): Segundos entre reconciliações
+        """
+        if self._thread is not None or not intervalo:
+            return
+
+        def executar():
+            while not self._parar.wait(intervalo):
+                try:
+                    with app.app_context():
+                        self.reconciliar()
+                except Exception as e:
+                    app.logger.warning('Falha ao reconciliar contadores da fila: %s', e)
+        
+        self._thread = threading.Thread(target=executar, name='reconciliacao-estatisticas', daemon=True)
+        self._thread.start()
+
+    def parar(self):
+        """Interrompe a reconciliação periódica."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._parar.clear()
+
+# Contadores do banco principal
+estatisticas_principal = EstatisticasFila()
+
+def obter_estatisticas_fila():
+    """
+    Returns:
+        EstatisticasFila: Contadores da loja atual (modo multi-loja) ou do banco principal
+    """
+    loja = g.get('loja') if has_app_context() else None
+    return loja.estatisticas if loja is not None else estatisticas_principal
+
+# Contadores usados pelas rotas: seguem a loja da requisição
+estatisticas_fila = LocalProxy(obter_estatisticas_fila)
@@ -0,0 +1,568 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Consultas da Fila
+
+Este arquivo reúne as consultas e operações da fila usadas por mais de
+uma parte do sistema (rotas da API, comandos e instantâneo compartilhado
+da fila). A tabela clientes guarda apenas a fila atual; clientes
+concluídos e cancelados ficam em clientes_arquivados.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import heapq
+from datetime import datetime
+
+from sqlalchemy import DateTime, and_, case, delete, func, insert, literal, select, tuple_, update
+from sqlalchemy.orm.attributes import set_committed_value
+from src.models.user import db
+from src.models.barbeiro import Barbeiro
+from src.models.cliente import Cliente, ClienteArquivado
+from src.models.atendimento import Atendimento
+from src.models.migracoes import STATUS_NA_FILA
+from src.services.notificacoes import marcar_alteracao
+
+# Colunas gravadas no INSERT em massa dos atendimentos do encerramento
+COLUNAS_ATENDIMENTO = ('cliente_id', 'barbeiro_id', 'numero_ficha', 'nome_cliente',
+                       'data_entrada', 'data_inicio', 'data_fim', 'tempo_espera', 'tempo_atendimento')
+
+class ErroFila(Exception):
+    """Operação da fila que não pôde ser aplicada (ex.: barbeiro inexistente)."""
+
+def ordem_fila(tabela=None):
+    """
+    Chave de ordenação da fila de espera de um barbeiro.
+    
+    Os clientes são chamados por classe de prioridade (preferencial,
+    agendado, normal); dentro da classe, pelo horário agendado ou, sem
+    agendamento, pelo horário de chegada; por fim, pela chegada e pelo ID.
+    
+    Args:
+        tabela: Tabela ou alias de clientes (padrão: o modelo Cliente)
+    
+    Returns:
+        list: Expressões da chave, na ordem
+    """
+    colunas = Cliente if tabela is None else tabela.c
+    return [
+        colunas.prioridade,
+        func.coalesce(colunas.horario_agendado, colunas.data_entrada),
+        colunas.data_entrada,
+        colunas.id
+    ]
+
+def montar_fila_completa():
+    """
+    Monta a fila completa de todos os barbeiros ativos com duas consultas.
+    
+    A posição de cada cliente é calculada pela ordem da fila (ver
+    ordem_fila), sem gravar nada no banco.
+    
+    Returns:
+        dict: 'fila_completa' (por nome do barbeiro) e 'barbeiros_ativos'
+    """
+    # Busca todos os barbeiros ativos
+    barbeiros = Barbeiro.query.filter_by(ativo=True).all()
+    
+    # Busca de uma só vez os clientes aguardando e em atendimento
+    # de todos os barbeiros ativos, já na ordem da fila
+    clientes = Cliente.query.filter(
+        Cliente.barbeiro_id.in_([barbeiro.id for barbeiro in barbeiros]),
+        Cliente.status.in_(['aguardando', 'atendendo'])
+    ).order_by(*ordem_fila()).all()
+    
+    filas = {barbeiro.id: [] for barbeiro in barbeiros}
+    atendendo = {}
+    for cliente in clientes:
+        if cliente.status == 'aguardando':
+            filas[cliente.barbeiro_id].append(cliente)
+        elif cliente.barbeiro_id not in atendendo:
+            atendendo[cliente.barbeiro_id] = cliente
+    
+    fila_completa = {}
+    
+    for barbeiro in barbeiros:
+        clientes_fila = filas[barbeiro.id]
+        
+        fila_aguardando = []
+        for posicao, cliente in enumerate(clientes_fila, 1):
+            dados_cliente = cliente.to_dict()
+            dados_cliente['posicao_fila'] = posicao
+            fila_aguardando.append(dados_cliente)
+        
+        # Cliente sendo atendido
+        cliente_atendendo = atendendo.get(barbeiro.id)
+        
+        fila_completa[barbeiro.nome] = {
+            'barbeiro': barbeiro.to_dict(),
+            'fila_aguardando': fila_aguardando,
+            'cliente_atendendo': cliente_atendendo.to_dict() if cliente_atendendo else None,
+            'total_fila': len(clientes_fila)
+        }
+    
+    return {
+        'fila_completa': fila_completa,
+        'barbeiros_ativos': len(barbeiros)
+    }
+
+def arquivar_cliente(cliente):
+    """
+    Move para o arquivo um cliente que saiu da fila (na sessão atual).
+    
+    Deve ser chamado depois de concluir ou cancelar o cliente; a
+    movimentação é confirmada no mesmo commit da mudança de status.
+    
+    Args:
+        cliente (Cliente): Cliente concluído ou cancelado
+    
+    Returns:
+        ClienteArquivado: Registro criado no arquivo
+    """
+    arquivado = ClienteArquivado.de_cliente(cliente)
+    db.session.add(arquivado)
+    db.session.delete(cliente)
+    return arquivado
+
+def buscar_cliente(cliente_id):
+    """
+    Busca um cliente na fila atual e, se não estiver, no arquivo.
+    
+    Args:
+        cliente_id (int): ID do cliente
+    
+    Returns:
+        Cliente | ClienteArquivado: Cliente encontrado, ou None
+    """
+    return db.session.get(Cliente, cliente_id) or db.session.get(ClienteArquivado, cliente_id)
+
+def buscar_cliente_por_ficha(numero_ficha):
+    """
+    Busca o cliente de uma ficha: o que está na fila ou, se a ficha
+    estiver livre, o último que a usou.
+    
+    Args:
+        numero_ficha (int): Número da ficha física
+    
+    Returns:
+        Cliente | ClienteArquivado: Cliente encontrado, ou None
+    """
+    cliente = Cliente.query.filter_by(numero_ficha=numero_ficha).first()
+    if cliente is not None:
+        return cliente
+    
+    return ClienteArquivado.query.filter_by(numero_ficha=numero_ficha).order_by(
+        ClienteArquivado.data_entrada.desc(), ClienteArquivado.id.desc()
+    ).first()
+
+def _mover_para_arquivo(condicao, status=None):
+    """
+    Move para o arquivo, com um INSERT ... SELECT e um DELETE, os clientes
+    que atendem à condição (na transação atual, sem commit).
+    
+    Args:
+        condicao: Filtro dos clientes movidos
+        status: Expressão do status gravado no arquivo (padrão: o status atual)
+    
+    Returns:
+        int: Quantidade de clientes movidos
+    """
+    colunas = ['id', 'nome', 'numero_ficha', 'barbeiro_id', 'data_entrada']
+    movidos = db.session.execute(
+        insert(ClienteArquivado).from_select(
+            colunas + ['status', 'arquivado_em'],
+            select(*[getattr(Cliente, coluna) for coluna in colunas],
+                   Cliente.status if status is None else status,
+                   literal(datetime.utcnow(), DateTime)).where(condicao)
+        )
+    ).rowcount
+    db.session.execute(delete(Cliente).where(condicao))
+    marcar_alteracao(db.session, 'fila')
+    return movidos
+
+def arquivar_clientes_encerrados(lote=5000, ao_confirmar=None):
+    """
+    Move para o arquivo os clientes encerrados que ainda estão em clientes.
+    
+    Cobre alterações feitas fora das rotas (cargas, comandos, versões
+    anteriores). Cada lote é movido com um INSERT ... SELECT e um DELETE
+    por faixa de IDs, em uma transação por lote.
+    
+    Args:
+        lote (int): Clientes movidos por transação
+        ao_confirmar (callable): Chamado com o total movido após cada lote
+    
+    Returns:
+        int: Quantidade de clientes arquivados
+    """
+    encerrado = Cliente.status.notin_(STATUS_NA_FILA)
+    total = 0
+    
+    while True:
+        # Maior ID do próximo lote: delimita a faixa sem listar os IDs na consulta
+        proximos = select(Cliente.id).where(encerrado).order_by(Cliente.id).limit(lote).subquery()
+        limite = db.session.execute(select(func.max(proximos.c.id))).scalar()
+        if limite is None:
+            break
+        
+        movidos = _mover_para_arquivo(encerrado & (Cliente.id <= limite))
+        db.session.commit()
+        
+        total += movidos
+        if ao_confirmar:
+            ao_confirmar(total)
+    
+    return total
+
+def _sem_negativo(expressao):
+    """max(expressao, 0) no dialeto do banco atual."""
+    funcao = func.max if db.engine.dialect.name == 'sqlite' else func.greatest
+    return funcao(expressao, 0)
+
+def _atualizar_barbeiro(barbeiro_id, *condicoes, **valores):
+    """
+    Aplica um UPDATE atômico nos contadores da fila de um barbeiro.
+    
+    O UPDATE é feito direto na tabela (sem sincronizar objetos da
+    sessão), dentro da transação da operação que o chamou; os objetos
+    Barbeiro carregados são relidos após o commit.
+    
+    Returns:
+        int: Linhas alteradas
+    """
+    valores['fila_atualizada_em'] = datetime.utcnow()
+    comando = update(Barbeiro.__table__).where(Barbeiro.__table__.c.id == barbeiro_id, *condicoes).values(**valores)
+    return db.session.execute(comando).rowcount
+
+def registrar_entrada_fila(barbeiro_id):
+    """
+    Conta a entrada de um cliente na fila do barbeiro.
+    
+    Args:
+        barbeiro_id (int): ID do barbeiro
+    
+    Returns:
+        int: Posição do novo cliente (clientes aguardando, já com ele)
+    
+    Raises:
+        ErroFila: Barbeiro inexistente
+    """
+    tabela = Barbeiro.__table__
+    comando = update(tabela).where(tabela.c.id == barbeiro_id).values(
+        clientes_aguardando=tabela.c.clientes_aguardando + 1,
+        fila_atualizada_em=datetime.utcnow()
+    )
+    
+    if db.engine.dialect.update_returning:
+        posicao = db.session.execute(comando.returning(tabela.c.clientes_aguardando)).scalar()
+    else:
+        db.session.execute(comando)
+        posicao = db.session.execute(select(tabela.c.clientes_aguardando).where(tabela.c.id == barbeiro_id)).scalar()
+    
+    if posicao is None:
+        raise ErroFila(f'Barbeiro {barbeiro_id} não encontrado')
+    return posicao
+
+def registrar_chamada(barbeiro_id, cliente_id):
+    """
+    Conta a saída de um cliente da fila para o atendimento.
+    
+    Args:
+        barbeiro_id (int): ID do barbeiro
+        cliente_id (int): Cliente chamado, que passa a ser o atual
+    """
+    _atualizar_barbeiro(barbeiro_id,
+                        clientes_aguardando=_sem_negativo(Barbeiro.__table__.c.clientes_aguardando - 1),
+                        cliente_atual_id=cliente_id)
+
+def registrar_saida_fila(barbeiro_id, quantidade=1):
+    """
+    Conta clientes que saíram da fila sem ser atendidos (cancelados).
+    
+    Args:
+        barbeiro_id (int): ID do barbeiro
+        quantidade (int): Clientes que saíram
+    """
+    _atualizar_barbeiro(barbeiro_id,
+                        clientes_aguardando=_sem_negativo(Barbeiro.__table__.c.clientes_aguardando - quantidade))
+
+def registrar_fim_atendimento(barbeiro_id, cliente_id):
+    """
+    Limpa o cliente atual do barbeiro, se ainda for o cliente informado.
+    
+    Args:
+        barbeiro_id (int): ID do barbeiro
+        cliente_id (int): Cliente cujo atendimento terminou
+    """
+    _atualizar_barbeiro(barbeiro_id, Barbeiro.__table__.c.cliente_atual_id == cliente_id,
+                        cliente_atual_id=None)
+
+def expressoes_contadores():
+    """
+    Subconsultas correlacionadas com o valor correto dos contadores de cada barbeiro.
+    
+    Returns:
+        tuple: (clientes aguardando, ID do cliente em atendimento)
+    """
+    barbeiros = Barbeiro.__table__
+    clientes = Cliente.__table__
+    
+    aguardando = select(func.count(clientes.c.id)).where(
+        clientes.c.barbeiro_id == barbeiros.c.id,
+        clientes.c.status == 'aguardando'
+    ).scalar_subquery()
+    atual = select(clientes.c.id).where(
+        clientes.c.barbeiro_id == barbeiros.c.id,
+        clientes.c.status == 'atendendo'
+    ).order_by(clientes.c.data_entrada).limit(1).scalar_subquery()
+    
+    return aguardando, atual
+
+def recalcular_contadores_barbeiros():
+    """
+    Recalcula os contadores da fila de todos os barbeiros a partir de clientes.
+    
+    Usado pelo comando reparar-contadores e pelas operações em massa. Um
+    único UPDATE com subconsultas correlacionadas corrige todos os barbeiros.
+    
+    Returns:
+        int: Barbeiros cujos contadores estavam divergentes
+    """
+    barbeiros = Barbeiro.__table__
+    aguardando, atual = expressoes_contadores()
+    
+    divergente = (barbeiros.c.clientes_aguardando != aguardando) | (
+        func.coalesce(barbeiros.c.cliente_atual_id, 0) != func.coalesce(atual, 0)
+    )
+    
+    divergentes = db.session.execute(select(func.count()).select_from(barbeiros).where(divergente)).scalar()
+    
+    if divergentes:
+        db.session.execute(update(barbeiros).where(divergente).values(
+            clientes_aguardando=aguardando,
+            cliente_atual_id=atual,
+            fila_atualizada_em=datetime.utcnow()
+        ))
+        marcar_alteracao(db.session, 'barbeiros')
+    
+    return divergentes
+
+def resumo_filas():
+    """
+    Resumo da fila de todos os barbeiros, lido apenas da tabela barbeiros.
+    
+    Returns:
+        list: Um dicionário por barbeiro, em ordem de nome
+    """
+    return [barbeiro.to_dict() for barbeiro in Barbeiro.query.order_by(Barbeiro.nome).all()]
+
+def encerrar_dia(barbeiro_id=None, concluir_atendendo=True):
+    """
+    Encerra a fila do dia: cancela os clientes aguardando e conclui (ou
+    cancela) os que estão em atendimento, de todos os barbeiros ou de um.
+    
+    Tudo é feito em operações em massa, sem percorrer a fila cliente a
+    cliente: os atendimentos concluídos são gravados em um único INSERT,
+    os clientes vão para o arquivo com um INSERT ... SELECT e um DELETE,
+    e os contadores dos barbeiros são zerados com um UPDATE. Nada é
+    confirmado aqui; o commit fica com quem chamou, em uma só transação.
+    
+    Args:
+        barbeiro_id (int): Encerra apenas a fila deste barbeiro (None para todos)
+        concluir_atendendo (bool): Conclui os clientes em atendimento,
+            registrando o atendimento; se False, eles são cancelados
+    
+    Returns:
+        dict: 'barbeiros' (cancelados e concluídos de cada um), 'cancelados',
+            'concluidos' e 'aguardando_cancelados'
+    """
+    filtro = [Cliente.status.in_(STATUS_NA_FILA)]
+    if barbeiro_id is not None:
+        filtro.append(Cliente.barbeiro_id == barbeiro_id)
+    
+    # Quantidade de clientes de cada barbeiro e status, com o maior ID
+    # visto: clientes que entrarem durante o encerramento ficam na fila
+    contagem = db.session.execute(
+        select(Cliente.barbeiro_id, Barbeiro.nome, Cliente.status,
+               func.count(Cliente.id), func.max(Cliente.id))
+        .join(Barbeiro, Barbeiro.id == Cliente.barbeiro_id)
+        .where(*filtro)
+        .group_by(Cliente.barbeiro_id, Barbeiro.nome, Cliente.status)
+    ).all()
+    
+    resumo = {}
+    maior_id = 0
+    for id_barbeiro, nome, status, quantidade, maior in contagem:
+        item = resumo.setdefault(id_barbeiro, {'barbeiro_id': id_barbeiro, 'nome': nome,
+                                                'cancelados': 0, 'concluidos': 0})
+        if status == 'atendendo' and concluir_atendendo:
+            item['concluidos'] += quantidade
+        else:
+            item['cancelados'] += quantidade
+        maior_id = max(maior_id, maior)
+    
+    aguardando = sum(quantidade for _, _, status, quantidade, _ in contagem if status == 'aguardando')
+    if not resumo:
+        return {'barbeiros': [], 'cancelados': 0, 'concluidos': 0, 'aguardando_cancelados': 0}
+    
+    filtro.append(Cliente.id <= maior_id)
+    
+    if concluir_atendendo:
+        atendimentos = []
+        for cliente in Cliente.query.filter(*filtro, Cliente.status == 'atendendo').all():
+            atendimento = Atendimento.de_cliente(cliente)
+            atendimento.finalizar_atendimento()
+            atendimentos.append({coluna: getattr(atendimento, coluna) for coluna in COLUNAS_ATENDIMENTO})
+        if atendimentos:
+            db.session.execute(insert(Atendimento), atendimentos)
+            marcar_alteracao(db.session, 'atendimentos')
+        status = case((Cliente.status == 'atendendo', 'concluido'), else_='cancelado')
+    else:
+        status = literal('cancelado')
+    
+    _mover_para_arquivo(and_(*filtro), status)
+    
+    # Filas encerradas: nenhum cliente aguardando nem em atendimento
+    barbeiros = Barbeiro.__table__
+    db.session.execute(
+        update(barbeiros).where(barbeiros.c.id.in_(list(resumo))).values(
+            clientes_aguardando=0,
+            cliente_atual_id=None,
+            fila_atualizada_em=datetime.utcnow()
+        )
+    )
+    marcar_alteracao(db.session, 'barbeiros')
+    
+    return {
+        'barbeiros': sorted(resumo.values(), key=lambda item: item['nome']),
+        'cancelados': sum(item['cancelados'] for item in resumo.values()),
+        'concluidos': sum(item['concluidos'] for item in resumo.values()),
+        'aguardando_cancelados': aguardando
+    }
+
+def recalcular_posicoes(barbeiro_ids):
+    """
+    Recalcula a posição de todos os clientes aguardando dos barbeiros
+    informados com um único UPDATE (posição = clientes à frente na
+    ordem da fila + 1).
+    
+    Args:
+        barbeiro_ids (list): IDs dos barbeiros cujas filas mudaram
+    """
+    clientes = Cliente.__table__
+    anterior = clientes.alias('anterior')
+    
+    posicao = select(func.count(anterior.c.id) + 1).where(
+        anterior.c.barbeiro_id == clientes.c.barbeiro_id,
+        anterior.c.status == 'aguardando',
+        tuple_(*ordem_fila(anterior)) < tuple_(*ordem_fila(clientes))
+    ).scalar_subquery()
+    
+    db.session.execute(
+        update(clientes)
+        .where(clientes.c.barbeiro_id.in_(barbeiro_ids), clientes.c.status == 'aguardando')
+        .values(posicao_fila=posicao)
+    )
+    marcar_alteracao(db.session, 'fila')
+
+def transferir_fila(origem_id, destinos):
+    """
+    Move os clientes aguardando de um barbeiro para outros (sem commit).
+    
+    Com um destino, toda a fila vai para ele. Com vários, os clientes
+    são distribuídos em ordem de chegada, cada um para o destino com
+    menos clientes aguardando naquele momento. Os clientes mantêm a
+    data_entrada original, então entram nas novas filas na posição que
+    a chegada deles determina. A troca de barbeiro é um único UPDATE;
+    depois as posições e os contadores das filas afetadas são
+    recalculados uma vez.
+    
+    Args:
+        origem_id (int): Barbeiro cuja fila é transferida
+        destinos (list): Barbeiros que recebem os clientes
+    
+    Returns:
+        dict: Clientes recebidos por ID de barbeiro destino
+    """
+    fila = db.session.execute(
+        select(Cliente.id)
+        .where(Cliente.barbeiro_id == origem_id, Cliente.status == 'aguardando')
+        .order_by(*ordem_fila())
+    ).scalars().all()
+    
+    recebidos = {destino.id: 0 for destino in destinos}
+    if not fila:
+        return recebidos
+    
+    # Heap de (clientes aguardando, nome, id): o topo é a fila mais curta
+    filas = [(destino.clientes_aguardando or 0, destino.nome, destino.id) for destino in destinos]
+    heapq.heapify(filas)
+    novo_barbeiro = {}
+    for cliente_id in fila:
+        tamanho, nome, destino_id = filas[0]
+        novo_barbeiro[cliente_id] = destino_id
+        recebidos[destino_id] += 1
+        heapq.heapreplace(filas, (tamanho + 1, nome, destino_id))
+    
+    clientes = Cliente.__table__
+    db.session.execute(
+        update(clientes)
+        .where(clientes.c.id.in_(fila))
+        .values(barbeiro_id=case(novo_barbeiro, value=clientes.c.id))
+    )
+    
+    afetados = [origem_id] + [destino_id for destino_id, quantidade in recebidos.items() if quantidade]
+    recalcular_posicoes(afetados)
+    
+    barbeiros = Barbeiro.__table__
+    aguardando, _ = expressoes_contadores()
+    db.session.execute(
+        update(barbeiros).where(barbeiros.c.id.in_(afetados)).values(
+            clientes_aguardando=aguardando,
+            fila_atualizada_em=datetime.utcnow()
+        )
+    )
+    marcar_alteracao(db.session, 'barbeiros')
+    
+    return recebidos
+
+def calcular_posicao(cliente):
+    """
+    Calcula a posição atual de um cliente aguardando, pela ordem da fila.
+    
+    Args:
+        cliente (Cliente): Cliente aguardando
+    
+    Returns:
+        int: Posição na fila do barbeiro (1 é o próximo)
+    """
+    chave = (cliente.prioridade, cliente.horario_agendado or cliente.data_entrada,
+             cliente.data_entrada, cliente.id)
+    return db.session.execute(
+        select(func.count(Cliente.id)).where(
+            Cliente.barbeiro_id == cliente.barbeiro_id,
+            Cliente.status == 'aguardando',
+            tuple_(*ordem_fila()) < tuple_(*[literal(valor) for valor in chave])
+        )
+    ).scalar() + 1
+
+def posicionar_cliente(cliente):
+    """
+    Coloca na posição certa da fila um cliente recém-adicionado à sessão
+    que não entra no fim da fila (preferencial ou agendado).
+    
+    As posições dos clientes que ficaram atrás dele são recalculadas no
+    mesmo UPDATE.
+    
+    Args:
+        cliente (Cliente): Cliente aguardando, já adicionado à sessão
+    
+    Returns:
+        int: Posição do cliente na fila
+    """
+    db.session.flush()
+    recalcular_posicoes([cliente.barbeiro_id])
+    posicao = db.session.execute(select(Cliente.posicao_fila).where(Cliente.id == cliente.id)).scalar()
+    set_committed_value(cliente, 'posicao_fila', posicao)
+    return posicao
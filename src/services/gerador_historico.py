@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Gerador de Histórico Sintético
+
+Este arquivo gera volumes grandes de clientes e atendimentos com
+comportamento realista, para testar relatórios e listagens com
+dados do tamanho de produção:
+
+- chegadas distribuídas por dia da semana (sábado cheio, domingo fechado)
+  e por hora do dia (picos no almoço e no fim da tarde);
+- barbeiros com popularidade e ritmo de trabalho diferentes;
+- tempos de atendimento log-normais em torno da média de cada barbeiro;
+- tempo de espera resultante da fila de cada barbeiro ao longo do dia;
+- uma pequena parcela de clientes que desistem (cancelados).
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import math
+import random
+from datetime import datetime, timedelta
+
+# Peso relativo de cada dia da semana (0 = segunda-feira ... 6 = domingo)
+PESOS_DIA_SEMANA = (0.6, 0.8, 0.9, 1.0, 1.3, 1.6, 0.0)
+
+# Peso relativo de cada hora de funcionamento (das 9h às 19h)
+PESOS_HORA = {
+    9: 0.6, 10: 0.8, 11: 0.9, 12: 1.1, 13: 1.0, 14: 0.8,
+    15: 0.8, 16: 0.9, 17: 1.2, 18: 1.4, 19: 1.0
+}
+
+NOMES = (
+    'Rafael', 'Lucas', 'Gabriel', 'Pedro', 'Matheus', 'Gustavo', 'Felipe', 'João',
+    'Bruno', 'Thiago', 'Carlos', 'Eduardo', 'Diego', 'Rodrigo', 'Leonardo', 'André',
+    'Marcelo', 'Vinícius', 'Ricardo', 'Fernando', 'Paulo', 'Daniel', 'Henrique', 'Igor'
+)
+SOBRENOMES = (
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira',
+    'Almeida', 'Ribeiro', 'Carvalho', 'Gomes', 'Martins', 'Araújo', 'Rocha', 'Barbosa'
+)
+
+class PerfilBarbeiro:
+    """Características sorteadas de cada barbeiro para a geração."""
+    
+    __slots__ = ('barbeiro_id', 'popularidade', 'tempo_medio')
+
+    def __init__(self, barbeiro_id, aleatorio):
+        self.barbeiro_id = barbeiro_id
+        self.popularidade = aleatorio.uniform(0.5, 1.5)
+        self.tempo_medio = aleatorio.uniform(20, 40)  # minutos
+
+def _minutos(delta):
+    """Converte um timedelta em minutos inteiros, como o modelo Atendimento."""
+    return int(delta.total_seconds() / 60)
+
+class GeradorHistorico:
+    """
+    Gera e grava o histórico sintético por meio de um InseridorHistorico.
+    
+    Args:
+        inseridor (InseridorHistorico): Destino das linhas geradas
+        barbeiro_ids (list): IDs dos barbeiros que receberão atendimentos
+        total_atendimentos (int): Quantidade aproximada de atendimentos
+        data_inicial (date): Primeiro dia do período
+        dias (int): Quantidade de dias do período
+        ficha_inicial (int): Primeiro número de ficha usado
+        taxa_cancelamento (float): Fração de clientes que desistem
+        semente (int): Semente do gerador aleatório
+    """
+
+    def __init__(self, inseridor, barbeiro_ids, total_atendimentos, data_inicial, dias,
+                 ficha_inicial=10_000_000, taxa_cancelamento=0.03, semente=None):
+        self.inseridor = inseridor
+        self.aleatorio = random.Random(semente)
+        self.perfis = [PerfilBarbeiro(bid, self.aleatorio) for bid in barbeiro_ids]
+        self.total_atendimentos = total_atendimentos
+        self.data_inicial = data_inicial
+        self.dias = dias
+        self.taxa_cancelamento = taxa_cancelamento
+        self.proxima_ficha = inseridor.proxima_ficha_livre(ficha_inicial)
+        
+        # Horas, pesos e barbeiros usados nos sorteios das chegadas
+        self._horas = list(PESOS_HORA)
+        self._pesos_horas = list(PESOS_HORA.values())
+        self._pesos_barbeiros = [p.popularidade for p in self.perfis]
+
+    def _chegadas_por_dia(self):
+        """
+        Distribui o total de atendimentos entre os dias do período.
+        
+        Returns:
+            list: Quantidade esperada de chegadas em cada dia
+        """
+        pesos = [PESOS_DIA_SEMANA[(self.data_inicial + timedelta(days=d)).weekday()]
+                 for d in range(self.dias)]
+        soma = sum(pesos) or 1
+        esperado_por_peso = self.total_atendimentos / (1 - self.taxa_cancelamento) / soma
+        return [peso * esperado_por_peso for peso in pesos]
+
+    def _quantidade(self, media):
+        """
+        Sorteia uma contagem com dispersão de Poisson (aproximação normal).
+        
+        Returns:
+            int: Quantidade sorteada (nunca negativa)
+        """
+        if media <= 0:
+            return 0
+        return max(0, int(round(self.aleatorio.gauss(media, math.sqrt(media)))))
+
+    def _gerar_dia(self, dia, chegadas):
+        """Gera todas as chegadas e atendimentos de um dia."""
+        aleatorio = self.aleatorio
+        inicio_dia = datetime(dia.year, dia.month, dia.day)
+        
+        horas = aleatorio.choices(self._horas, self._pesos_horas, k=chegadas)
+        perfis = aleatorio.choices(self.perfis, self._pesos_barbeiros, k=chegadas)
+        
+        # Agrupa as chegadas por barbeiro, em ordem de horário
+        filas = {}
+        for hora, perfil in zip(horas, perfis):
+            entrada = inicio_dia + timedelta(hours=hora, seconds=aleatorio.uniform(0, 3600))
+            filas.setdefault(perfil, []).append(entrada)
+        
+        for perfil, entradas in filas.items():
+            entradas.sort()
+            livre_em = inicio_dia + timedelta(hours=min(self._horas))
+            mu = math.log(perfil.tempo_medio) - 0.3 ** 2 / 2
+            
+            for entrada in entradas:
+                ficha = self.proxima_ficha
+                self.proxima_ficha += 1
+                nome = f'{aleatorio.choice(NOMES)} {aleatorio.choice(SOBRENOMES)}'
+                
+                if aleatorio.random() < self.taxa_cancelamento:
+                    self.inseridor.adicionar_cliente({
+                        'nome': nome,
+                        'numero_ficha': ficha,
+                        'barbeiro_id': perfil.barbeiro_id,
+                        'data_entrada': entrada,
+                        'status': 'cancelado',
+                        'arquivado_em': entrada
+                    })
+                    continue
+                
+                inicio = max(entrada, livre_em)
+                fim = inicio + timedelta(minutes=aleatorio.lognormvariate(mu, 0.3))
+                livre_em = fim + timedelta(seconds=aleatorio.uniform(30, 180))
+                
+                cliente_id = self.inseridor.adicionar_cliente({
+                    'nome': nome,
+                    'numero_ficha': ficha,
+                    'barbeiro_id': perfil.barbeiro_id,
+                    'data_entrada': entrada,
+                    'status': 'concluido',
+                    'arquivado_em': fim
+                })
+                self.inseridor.adicionar_atendimento({
+                    'cliente_id': cliente_id,
+                    'barbeiro_id': perfil.barbeiro_id,
+                    'numero_ficha': ficha,
+                    'nome_cliente': nome,
+                    'data_entrada': entrada,
+                    'data_inicio': inicio,
+                    'data_fim': fim,
+                    'tempo_espera': _minutos(inicio - entrada),
+                    'tempo_atendimento': _minutos(fim - inicio)
+                })
+
+    def gerar(self):
+        """
+        Gera o período completo, dia a dia.
+        
+        Returns:
+            InseridorHistorico: Inseridor com os totais gravados
+        """
+        try:
+            for deslocamento, media in enumerate(self._chegadas_por_dia()):
+                dia = self.data_inicial + timedelta(days=deslocamento)
+                self._gerar_dia(dia, self._quantidade(media))
+            self.inseridor.finalizar()
+        except Exception:
+            self.inseridor.descartar()
+            raise
+        
+        return self.inseridor
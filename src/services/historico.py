@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Inserção em Massa de Histórico
+
+Este arquivo contém o inseridor usado para carregar grandes volumes
+de clientes e atendimentos históricos. As linhas são acumuladas em
+memória e gravadas com executemany em lotes, dentro de transações
+grandes, sem passar pela unidade de trabalho do ORM. Clientes já
+concluídos ou cancelados são gravados direto em clientes_arquivados.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import time
+from sqlalchemy import Boolean, Date, DateTime, func, select, text, union_all
+from src.models.cliente import Cliente, ClienteArquivado
+from src.models.atendimento import Atendimento, periodo_entrada
+from src.models.migracoes import STATUS_NA_FILA
+from src.services.busca import IndexacaoEmLote
+from src.utils.fuso_horario import ConversorLocal
+
+def reservar_ids_clientes(conexao, ultimo_id):
+    """
+    Garante que novos clientes recebam IDs maiores que `ultimo_id`.
+    
+    Necessário depois de gravar clientes com IDs explícitos (em especial
+    no arquivo, que não avança o AUTOINCREMENT da tabela clientes).
+    
+    Args:
+        conexao (Connection): Conexão do SQLAlchemy Core
+        ultimo_id (int): Maior ID já usado
+    """
+    dialeto = conexao.dialect.name
+    
+    if dialeto == 'sqlite':
+        atual = conexao.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'clientes'")).scalar()
+        if atual is None:
+            conexao.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('clientes', :id)"),
+                            {'id': ultimo_id})
+        elif atual < ultimo_id:
+            conexao.execute(text("UPDATE sqlite_sequence SET seq = :id WHERE name = 'clientes'"),
+                            {'id': ultimo_id})
+    elif dialeto == 'postgresql':
+        conexao.execute(text(
+            "SELECT setval(pg_get_serial_sequence('clientes', 'id'), "
+            "GREATEST(:id, (SELECT COALESCE(MAX(id), 1) FROM clientes)))"
+        ), {'id': ultimo_id})
+    elif dialeto in ('mysql', 'mariadb'):
+        conexao.execute(text(f'ALTER TABLE clientes AUTO_INCREMENT = {int(ultimo_id) + 1}'))
+
+def reservar_bloco_clientes(conexao, quantidade):
+    """
+    Reserva uma faixa de IDs de clientes dentro da transação atual.
+    
+    No SQLite o AUTOINCREMENT é avançado por um único UPDATE (que obtém
+    a trava de escrita antes de ler o maior ID), e a faixa fica reservada
+    assim que a transação é confirmada: clientes cadastrados pela
+    aplicação enquanto uma importação está em andamento recebem IDs
+    depois dela, sem colidir com IDs já gravados no arquivo.
+    
+    Args:
+        conexao (Connection): Conexão do SQLAlchemy Core
+        quantidade (int): IDs reservados
+    
+    Returns:
+        int: Primeiro ID da faixa
+    """
+    if conexao.dialect.name == 'sqlite':
+        maior_arquivado = "(SELECT coalesce(max(id), 0) FROM clientes_arquivados)"
+        atualizadas = conexao.execute(text(
+            f"UPDATE sqlite_sequence SET seq = max(seq, {maior_arquivado}) + :quantidade WHERE name = 'clientes'"
+        ), {'quantidade': quantidade}).rowcount
+        if not atualizadas:
+            conexao.execute(text(
+                f"INSERT INTO sqlite_sequence (name, seq) SELECT 'clientes', "
+                f"max((SELECT coalesce(max(id), 0) FROM clientes), {maior_arquivado}) + :quantidade"
+            ), {'quantidade': quantidade})
+        ultimo = conexao.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'clientes'")).scalar()
+        return ultimo - quantidade + 1
+    
+    maiores = union_all(select(func.max(Cliente.id)), select(func.max(ClienteArquivado.id))).subquery()
+    primeiro = (conexao.execute(select(func.max(maiores.c[0]))).scalar() or 0) + 1
+    reservar_ids_clientes(conexao, primeiro + quantidade - 1)
+    return primeiro
+
+def _conversor_sqlite(tipo):
+    """
+    Conversão de um valor para o formato que o SQLAlchemy grava no SQLite.
+    
+    Args:
+        tipo (TypeEngine): Tipo da coluna
+    
+    Returns:
+        callable: Conversor, ou None se o valor vai direto ao driver
+    """
+    if isinstance(tipo, DateTime):
+        return lambda valor: valor.isoformat(' ', 'microseconds') if valor is not None else None
+    if isinstance(tipo, Date):
+        return lambda valor: valor.isoformat() if valor is not None else None
+    if isinstance(tipo, Boolean):
+        return lambda valor: int(valor) if valor is not None else None
+    return None
+
+def inserir_linhas(conexao, tabela, linhas):
+    """
+    Grava linhas com um executemany.
+    
+    No SQLite, quando todas as linhas têm as mesmas colunas e as colunas
+    omitidas não têm valor padrão calculado em Python, as linhas vão
+    direto ao driver, com as datas já no formato do SQLAlchemy: o
+    processamento de parâmetros do SQLAlchemy, linha a linha, é a maior
+    parte do tempo de uma carga em massa. Nos demais casos a gravação
+    passa pelo SQLAlchemy normalmente.
+    
+    Args:
+        conexao (Connection): Conexão do SQLAlchemy Core
+        tabela (Table): Tabela de destino
+        linhas (list): Dicionários coluna -> valor
+    """
+    colunas = list(linhas[0])
+    omitidas = [coluna for coluna in tabela.columns if coluna.name not in linhas[0] and not coluna.primary_key]
+    if (conexao.dialect.name != 'sqlite' or any(coluna.default is not None for coluna in omitidas)
+            or any(len(linha) != len(colunas) or linha.keys() != linhas[0].keys() for linha in linhas)):
+        conexao.execute(tabela.insert(), linhas)
+        return
+    
+    conversores = [_conversor_sqlite(tabela.c[coluna].type) for coluna in colunas]
+    convertidas = [i for i, conversor in enumerate(conversores) if conversor is not None]
+    valores = []
+    for linha in linhas:
+        registro = list(linha.values())
+        for i in convertidas:
+            registro[i] = conversores[i](registro[i])
+        valores.append(tuple(registro))
+    
+    conexao.exec_driver_sql(
+        f'INSERT INTO {tabela.name} ({", ".join(colunas)}) VALUES ({", ".join("?" * len(colunas))})', valores
+    )
+
+class InseridorHistorico:
+    """
+    Acumula linhas de clientes e atendimentos e grava em lotes.
+    
+    A cada `tamanho_lote` linhas é feito um executemany; a cada
+    `linhas_por_transacao` linhas a transação é confirmada e outra é
+    aberta, limitando o tamanho do journal sem pagar um commit por linha.
+    
+    Uso:
+        with db.engine.connect() as conexao:
+            inseridor = InseridorHistorico(conexao)
+            inseridor.adicionar_cliente({...})
+            inseridor.adicionar_atendimento({...})
+            inseridor.finalizar()
+    """
+
+    def __init__(self, conexao, tamanho_lote=10000, linhas_por_transacao=200000,
+                 ao_confirmar=None):
+        """
+        Args:
+            conexao (Connection): Conexão do SQLAlchemy Core
+            tamanho_lote (int): Linhas por executemany
+            linhas_por_transacao (int): Linhas gravadas entre commits
+            ao_confirmar (callable): Chamado após cada commit com o inseridor
+        """
+        self.conexao = conexao
+        self.tamanho_lote = tamanho_lote
+        self.linhas_por_transacao = linhas_por_transacao
+        self.ao_confirmar = ao_confirmar
+        self.clientes = []
+        self.arquivados = []
+        self.atendimentos = []
+        self.total_clientes = 0
+        self.total_atendimentos = 0
+        self.atendimentos_confirmados = 0
+        self._local = ConversorLocal()
+        self.inicio = time.perf_counter()
+        self._desde_commit = 0
+        
+        self._synchronous = None
+        if conexao.dialect.name == 'sqlite':
+            # Durante a carga a durabilidade de cada commit é dispensável;
+            # o valor anterior volta no fim (a conexão retorna ao pool)
+            self._synchronous = conexao.exec_driver_sql('PRAGMA synchronous').scalar()
+            conexao.exec_driver_sql('PRAGMA synchronous=OFF')
+            conexao.commit()
+        
+        self._transacao = conexao.begin()
+        
+        # Os nomes são indexados para a busca uma vez por transação, não por linha
+        self._indexacao = IndexacaoEmLote(conexao)
+        self._indexacao.pausar()
+        
+        # IDs são atribuídos aqui para que cada atendimento já conheça
+        # o cliente correspondente sem precisar ler o ID gerado pelo banco;
+        # vêm de faixas reservadas no AUTOINCREMENT (reservar_bloco_clientes)
+        # dentro da transação em que são usados
+        self.proximo_cliente_id = 0
+        self._fim_faixa_ids = 0
+
+    def _maior(self, coluna_fila, coluna_arquivo):
+        """Maior valor de uma coluna somando a fila atual e o arquivo."""
+        valores = union_all(select(func.max(coluna_fila)), select(func.max(coluna_arquivo))).subquery()
+        return self.conexao.execute(select(func.max(valores.c[0]))).scalar()
+
+    def proxima_ficha_livre(self, minimo):
+        """
+        Retorna o primeiro número de ficha livre a partir de `minimo`.
+        
+        Args:
+            minimo (int): Menor número de ficha desejado
+        
+        Returns:
+            int: Número de ficha sem conflito com os clientes existentes
+        """
+        maior = self._maior(Cliente.numero_ficha, ClienteArquivado.numero_ficha) or 0
+        return max(minimo, maior + 1)
+
+    def adicionar_cliente(self, linha):
+        """
+        Adiciona um cliente; o ID é atribuído automaticamente.
+        
+        Clientes concluídos ou cancelados vão para clientes_arquivados
+        (arquivado_em, se não informado, é a data de entrada).
+        
+        Args:
+            linha (dict): Colunas da tabela clientes (sem o ID)
+        
+        Returns:
+            int: ID atribuído ao cliente
+        """
+        if self.proximo_cliente_id >= self._fim_faixa_ids:
+            self.proximo_cliente_id = reservar_bloco_clientes(self.conexao, self.tamanho_lote)
+            self._fim_faixa_ids = self.proximo_cliente_id + self.tamanho_lote
+        
+        linha['id'] = self.proximo_cliente_id
+        self.proximo_cliente_id += 1
+        
+        if linha.get('status') in STATUS_NA_FILA:
+            destino = self.clientes
+        else:
+            linha.pop('posicao_fila', None)
+            linha.setdefault('arquivado_em', linha['data_entrada'])
+            destino = self.arquivados
+        
+        destino.append(linha)
+        if len(destino) >= self.tamanho_lote:
+            self._gravar()
+        return linha['id']
+
+    def adicionar_atendimento(self, linha):
+        """
+        Adiciona um atendimento.
+        
+        As colunas de período (dia, dia_semana, hora) são calculadas aqui,
+        no fuso da barbearia, quando ausentes.
+        
+        Args:
+            linha (dict): Colunas da tabela atendimentos (sem o ID)
+        """
+        if 'dia' not in linha:
+            linha.update(periodo_entrada(linha['data_entrada'], self._local))
+        self.atendimentos.append(linha)
+        if len(self.atendimentos) >= self.tamanho_lote:
+            self._gravar()
+
+    def _gravar(self):
+        """Grava as linhas acumuladas e confirma a transação quando necessário."""
+        if self.clientes:
+            inserir_linhas(self.conexao, Cliente.__table__, self.clientes)
+            self.total_clientes += len(self.clientes)
+            self._desde_commit += len(self.clientes)
+            self.clientes = []
+        
+        if self.arquivados:
+            inserir_linhas(self.conexao, ClienteArquivado.__table__, self.arquivados)
+            self.total_clientes += len(self.arquivados)
+            self._desde_commit += len(self.arquivados)
+            self.arquivados = []
+        
+        if self.atendimentos:
+            inserir_linhas(self.conexao, Atendimento.__table__, self.atendimentos)
+            self.total_atendimentos += len(self.atendimentos)
+            self._desde_commit += len(self.atendimentos)
+            self.atendimentos = []
+        
+        if self._desde_commit >= self.linhas_por_transacao:
+            self._confirmar()
+            self._transacao = self.conexao.begin()
+            self._indexacao.pausar()
+
+    def _confirmar(self):
+        """Confirma a transação atual e notifica o progresso."""
+        self._indexacao.indexar()
+        self._transacao.commit()
+        self.atendimentos_confirmados = self.total_atendimentos
+        self._desde_commit = 0
+        if self.ao_confirmar:
+            self.ao_confirmar(self)
+
+    def linhas_por_segundo(self):
+        """
+        Returns:
+            float: Vazão média de gravação desde o início
+        """
+        decorrido = time.perf_counter() - self.inicio
+        return (self.total_clientes + self.total_atendimentos) / decorrido if decorrido else 0.0
+
+    def _restaurar_synchronous(self):
+        """Volta o PRAGMA synchronous da conexão ao valor anterior à carga."""
+        if self._synchronous is not None:
+            self.conexao.exec_driver_sql(f'PRAGMA synchronous={int(self._synchronous)}')
+            self.conexao.commit()
+
+    def finalizar(self):
+        """Grava o restante e confirma a última transação."""
+        self._gravar()
+        if self._transacao.is_active:
+            self._confirmar()
+        self._restaurar_synchronous()
+
+    def descartar(self):
+        """Desfaz a transação em andamento (usado em caso de erro)."""
+        if self._transacao.is_active:
+            self._transacao.rollback()
+        self._restaurar_synchronous()
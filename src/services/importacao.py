@@ -0,0 +1,341 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Importação de Histórico de Atendimentos
+
+Este arquivo contém o importador usado por barbearias que migram o
+histórico de outro sistema (ou do papel). O arquivo é lido como fluxo,
+linha a linha, em um de dois formatos:
+
+- CSV no mesmo layout de GET /api/relatorios/exportar-csv (as colunas
+  ID e de tempos são ignoradas; os tempos são recalculados);
+- NDJSON, um objeto por linha com numero_ficha, nome_cliente,
+  barbeiro (nome) ou barbeiro_id, data_entrada, data_inicio e data_fim.
+
+Os nomes dos barbeiros são resolvidos por um mapa em memória carregado
+uma vez; barbeiros desconhecidos são criados inativos. Cada linha vira
+um cliente concluído em clientes_arquivados e o seu atendimento, gravados
+pelo InseridorHistorico em lotes de executemany. Linhas inválidas são
+contadas e ignoradas, sem interromper a importação; apenas falhas do
+banco ou do arquivo como um todo (ex.: texto fora do UTF-8) a
+interrompem, e os lotes já confirmados permanecem gravados.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import csv
+import json
+from datetime import datetime, timezone
+
+from sqlalchemy import insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from src.models.barbeiro import Barbeiro
+
+# Cabeçalho do CSV de atendimentos (exportação e importação)
+CABECALHO_CSV = (
+    'ID',
+    'Número da Ficha',
+    'Nome do Cliente',
+    'ID do Barbeiro',
+    'Nome do Barbeiro',
+    'Data de Entrada',
+    'Data de Início',
+    'Data de Fim',
+    'Tempo de Espera (min)',
+    'Tempo de Atendimento (min)',
+    'Tempo Total (min)'
+)
+
+# Coluna do CSV -> campo importado
+CAMPOS_CSV = {
+    'Número da Ficha': 'numero_ficha',
+    'Nome do Cliente': 'nome_cliente',
+    'ID do Barbeiro': 'barbeiro_id',
+    'Nome do Barbeiro': 'barbeiro',
+    'Data de Entrada': 'data_entrada',
+    'Data de Início': 'data_inicio',
+    'Data de Fim': 'data_fim'
+}
+
+# Formatos aceitos
+FORMATOS = ('csv', 'ndjson')
+
+class ErroImportacao(ValueError):
+    """Arquivo que não pode ser importado (ex.: cabeçalho do CSV inválido)."""
+
+def _texto(valor, campo):
+    """
+    Converte um campo de texto do arquivo (NDJSON pode trazer números).
+    
+    Args:
+        valor: Valor lido (str, int ou None)
+        campo (str): Nome do campo, para a mensagem de erro
+    
+    Returns:
+        str: Texto sem espaços nas pontas ('' se ausente)
+    
+    Raises:
+        ValueError: Valor de outro tipo (lista, objeto, booleano...)
+    """
+    if valor is None:
+        return ''
+    if isinstance(valor, bool) or not isinstance(valor, (str, int)):
+        raise ValueError(f'{campo} inválido: {valor!r}')
+    return str(valor).strip()
+
+def _inteiro(valor, campo):
+    """
+    Converte um campo inteiro do arquivo.
+    
+    Args:
+        valor: Valor lido (str ou int)
+        campo (str): Nome do campo, para a mensagem de erro
+    
+    Returns:
+        int: Valor convertido
+    
+    Raises:
+        ValueError: Valor ausente ou que não é um inteiro
+    """
+    try:
+        if isinstance(valor, bool) or not isinstance(valor, (str, int)):
+            raise ValueError
+        return int(valor)
+    except ValueError:
+        raise ValueError(f'{campo} inválido: {valor!r}')
+
+def converter_data(valor):
+    """
+    Converte uma data do arquivo importado para o formato do banco (UTC sem fuso).
+    
+    Aceita o formato do CSV exportado (dd/mm/aaaa HH:MM:SS), convertido
+    por fatias por ser o caso de maior volume, e ISO 8601.
+    
+    Args:
+        valor (str): Data como texto (vazio ou None para ausente)
+    
+    Returns:
+        datetime: Data convertida, ou None se ausente
+    
+    Raises:
+        ValueError: Data em formato inválido
+    """
+    if not valor:
+        return None
+    
+    try:
+        if valor[2:3] == '/' and len(valor) == 19:
+            return datetime(int(valor[6:10]), int(valor[3:5]), int(valor[0:2]),
+                            int(valor[11:13]), int(valor[14:16]), int(valor[17:19]))
+        data = datetime.fromisoformat(valor)
+    except (TypeError, ValueError):
+        raise ValueError(f'Data inválida: {valor}')
+    
+    if data.tzinfo is not None:
+        data = data.astimezone(timezone.utc).replace(tzinfo=None)
+    return data
+
+def _minutos(delta):
+    """Converte um timedelta em minutos inteiros, como o modelo Atendimento."""
+    return int(delta.total_seconds() / 60)
+
+class ImportadorAtendimentos:
+    """
+    Lê um arquivo de atendimentos e grava as linhas por um InseridorHistorico.
+    
+    Uso:
+        with db.engine.connect() as conexao:
+            inseridor = InseridorHistorico(conexao)
+            importador = ImportadorAtendimentos(inseridor)
+            importador.importar(arquivo, 'csv')
+    
+    Atributos:
+        importadas (int): Linhas aceitas (gravadas ao fim da importação)
+        rejeitadas (int): Linhas ignoradas por conter dados inválidos
+        erros (list): (número da linha, motivo) das primeiras linhas rejeitadas
+        barbeiros_criados (list): Nomes dos barbeiros criados na importação
+    """
+
+    def __init__(self, inseridor, criar_barbeiros=True, maximo_erros=20):
+        """
+        Args:
+            inseridor (InseridorHistorico): Inseridor em lotes (já com a conexão)
+            criar_barbeiros (bool): Cria barbeiros desconhecidos (inativos);
+                se False, as linhas desses barbeiros são rejeitadas
+            maximo_erros (int): Linhas rejeitadas guardadas em `erros`
+        """
+        self.inseridor = inseridor
+        self.criar_barbeiros = criar_barbeiros
+        self.maximo_erros = maximo_erros
+        self.importadas = 0
+        self.rejeitadas = 0
+        self.erros = []
+        self.barbeiros_criados = []
+        
+        barbeiros = inseridor.conexao.execute(select(Barbeiro.id, Barbeiro.nome)).all()
+        self.ids_por_nome = {nome.strip().casefold(): barbeiro_id for barbeiro_id, nome in barbeiros}
+        self.ids_barbeiros = {barbeiro_id for barbeiro_id, _ in barbeiros}
+
+    def resolver_barbeiro(self, nome, barbeiro_id):
+        """
+        Resolve o barbeiro de uma linha pelo nome ou, sem nome, pelo ID.
+        
+        Args:
+            nome (str): Nome do barbeiro (pode ser vazio)
+            barbeiro_id: ID do barbeiro (usado quando não há nome)
+        
+        Returns:
+            int: ID do barbeiro
+        
+        Raises:
+            ValueError: Barbeiro desconhecido
+        """
+        nome = _texto(nome, 'Nome do barbeiro')
+        if nome:
+            chave = nome.casefold()
+            encontrado = self.ids_por_nome.get(chave)
+            if encontrado is not None:
+                return encontrado
+            if not self.criar_barbeiros:
+                raise ValueError(f'Barbeiro desconhecido: {nome}')
+            
+            novo_id = self.inseridor.conexao.execute(
+                insert(Barbeiro.__table__).values(nome=nome[:100], ativo=False, clientes_aguardando=0)
+            ).inserted_primary_key[0]
+            self.ids_por_nome[chave] = novo_id
+            self.ids_barbeiros.add(novo_id)
+            self.barbeiros_criados.append(nome)
+            return novo_id
+        
+        if barbeiro_id not in (None, ''):
+            barbeiro_id = _inteiro(barbeiro_id, 'ID do barbeiro')
+            if barbeiro_id in self.ids_barbeiros:
+                return barbeiro_id
+        raise ValueError('Barbeiro não informado ou desconhecido')
+
+    def adicionar(self, campos):
+        """
+        Converte uma linha e a entrega ao inseridor.
+        
+        Args:
+            campos (dict): Campos da linha (ver CAMPOS_CSV)
+        
+        Raises:
+            ValueError: Linha com dados ausentes ou inconsistentes
+        """
+        nome = _texto(campos.get('nome_cliente'), 'nome_cliente')
+        if not nome:
+            raise ValueError('nome_cliente ausente')
+        
+        numero_ficha = _inteiro(campos['numero_ficha'], 'Número da ficha')
+        entrada = converter_data(campos.get('data_entrada'))
+        inicio = converter_data(campos.get('data_inicio'))
+        fim = converter_data(campos.get('data_fim'))
+        
+        if entrada is None or inicio is None:
+            raise ValueError('data_entrada e data_inicio são obrigatórias')
+        if inicio < entrada or (fim is not None and fim < inicio):
+            raise ValueError('Datas fora de ordem (entrada <= início <= fim)')
+        
+        barbeiro_id = self.resolver_barbeiro(campos.get('barbeiro'), campos.get('barbeiro_id'))
+        nome = nome[:100]
+        
+        cliente_id = self.inseridor.adicionar_cliente({
+            'nome': nome,
+            'numero_ficha': numero_ficha,
+            'barbeiro_id': barbeiro_id,
+            'data_entrada': entrada,
+            'status': 'concluido',
+            'arquivado_em': fim or inicio
+        })
+        self.inseridor.adicionar_atendimento({
+            'cliente_id': cliente_id,
+            'barbeiro_id': barbeiro_id,
+            'numero_ficha': numero_ficha,
+            'nome_cliente': nome,
+            'data_entrada': entrada,
+            'data_inicio': inicio,
+            'data_fim': fim,
+            'tempo_espera': _minutos(inicio - entrada),
+            'tempo_atendimento': _minutos(fim - inicio) if fim is not None else None
+        })
+        self.importadas += 1
+
+    @property
+    def confirmadas(self):
+        """Atendimentos já confirmados no banco (permanecem mesmo se a importação falhar)."""
+        return self.inseridor.atendimentos_confirmados
+
+    def _rejeitar(self, numero_linha, motivo):
+        """Conta uma linha rejeitada e guarda o motivo das primeiras."""
+        self.rejeitadas += 1
+        if len(self.erros) < self.maximo_erros:
+            self.erros.append({'linha': numero_linha, 'erro': motivo})
+
+    def _linhas_csv(self, arquivo):
+        """Gera (número da linha, campos) de um CSV no layout da exportação."""
+        leitor = csv.reader(arquivo)
+        cabecalho = [titulo.strip() for titulo in next(leitor, [])]
+        
+        faltando = [titulo for titulo in ('Número da Ficha', 'Nome do Cliente', 'Data de Entrada',
+                                          'Data de Início', 'Data de Fim') if titulo not in cabecalho]
+        if faltando or ('Nome do Barbeiro' not in cabecalho and 'ID do Barbeiro' not in cabecalho):
+            raise ErroImportacao('Cabeçalho do CSV diferente do layout da exportação de atendimentos')
+        
+        indices = [(campo, cabecalho.index(titulo)) for titulo, campo in CAMPOS_CSV.items()
+                   if titulo in cabecalho]
+        for numero_linha, valores in enumerate(leitor, 2):
+            if not valores:
+                continue
+            if len(valores) < len(cabecalho):
+                yield numero_linha, None
+                continue
+            yield numero_linha, {campo: valores[indice] for campo, indice in indices}
+
+    def _linhas_ndjson(self, arquivo):
+        """Gera (número da linha, campos) de um arquivo NDJSON."""
+        for numero_linha, texto in enumerate(arquivo, 1):
+            texto = texto.strip()
+            if not texto:
+                continue
+            try:
+                campos = json.loads(texto)
+            except ValueError:
+                campos = None
+            yield numero_linha, campos if isinstance(campos, dict) else None
+
+    def importar(self, arquivo, formato='csv'):
+        """
+        Importa todas as linhas de um arquivo de texto e grava o restante.
+        
+        Args:
+            arquivo: Arquivo de texto aberto (ou fluxo da requisição)
+            formato (str): 'csv' ou 'ndjson'
+        
+        Raises:
+            ErroImportacao: Formato ou cabeçalho inválido (nada é gravado) ou
+                arquivo fora do UTF-8 (ver `confirmadas`)
+        """
+        if formato not in FORMATOS:
+            raise ErroImportacao(f'Formato deve ser um de: {", ".join(FORMATOS)}')
+        
+        linhas = self._linhas_csv(arquivo) if formato == 'csv' else self._linhas_ndjson(arquivo)
+        try:
+            for numero_linha, campos in linhas:
+                if campos is None:
+                    self._rejeitar(numero_linha, 'Linha mal formada')
+                    continue
+                try:
+                    self.adicionar(campos)
+                except SQLAlchemyError:
+                    raise
+                except Exception as e:
+                    self._rejeitar(numero_linha, str(e) if not isinstance(e, KeyError) else f'Campo ausente: {e}')
+            self.inseridor.finalizar()
+        except UnicodeDecodeError:
+            self.inseridor.descartar()
+            raise ErroImportacao('Arquivo com texto fora do UTF-8')
+        except BaseException:
+            self.inseridor.descartar()
+            raise
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Instantâneo da Fila em Memória Compartilhada
+
+Os painéis das TVs e os celulares dos clientes consultam /api/fila a
+cada poucos segundos, e cada consulta repetia as mesmas leituras no
+banco em todos os workers. Este arquivo mantém a resposta completa de
+/api/fila, já serializada em JSON, em um segmento de memória
+compartilhada (multiprocessing.shared_memory) visível por todos os
+workers do servidor. A leitura apenas copia os bytes do segmento, sem
+consultar o banco nem serializar nada.
+
+O worker que altera a fila reconstrói o instantâneo ao final da
+requisição. As escritas entre processos são serializadas por uma trava
+de arquivo (flock), e os leitores usam um seqlock: o número de sequência
+do cabeçalho fica ímpar durante a escrita, e uma leitura só é aceita se
+a sequência era par e não mudou enquanto os bytes eram copiados.
+
+Layout do segmento:
+    [sequência u64][versão u64][gerado_em f64][tamanho u32][reservado]
+    [JSON da resposta de /api/fila]
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from datetime import datetime
+from multiprocessing import resource_tracker, shared_memory
+
+# Cabeçalho do segmento: sequência, versão, gerado_em e tamanho do JSON
+CABECALHO = struct.Struct('<QQdI4x')
+
+# Tentativas de leitura enquanto um escritor está gravando o segmento
+TENTATIVAS_LEITURA = 100
+
+logger = logging.getLogger('sistema_fila.instantaneo')
+
+class SegmentoFila:
+    """
+    Um segmento de memória compartilhada com o instantâneo de uma fila.
+    
+    Atributos:
+        nome (str): Nome do segmento (em /dev/shm no Linux)
+        capacidade (int): Tamanho do segmento em bytes, com o cabeçalho
+    """
+
+    def __init__(self, nome, capacidade):
+        self.nome = nome
+        self.capacidade = capacidade
+        self._memoria = None
+        self._arquivo_trava = None
+        self._trava = threading.Lock()
+
+    def _abrir(self):
+        """
+        Abre o segmento, criando-o se ainda não existir.
+        
+        Returns:
+            memoryview: Conteúdo do segmento, ou None se não foi possível abrir
+        """
+        if self._memoria is not None:
+            return self._memoria.buf
+        
+        try:
+            try:
+                memoria = shared_memory.SharedMemory(name=self.nome, create=True, size=self.capacidade)
+            except FileExistsError:
+                memoria = shared_memory.SharedMemory(name=self.nome)
+        except OSError as e:
+            logger.warning('Memória compartilhada indisponível: %s', e)
+            return None
+        
+        # O segmento pertence ao servidor, não a este worker: sem o
+        # cancelamento, o resource_tracker o removeria quando o worker terminasse
+        try:
+            resource_tracker.unregister(memoria._name, 'shared_memory')
+        except Exception:
+            pass
+        
+        self._memoria = memoria
+        return memoria.buf
+
+    def ler(self):
+        """
+        Lê o instantâneo com o protocolo do seqlock.
+        
+        Returns:
+            tuple: (json, versao, gerado_em), ou None se o segmento está
+                vazio, invalidado ou sendo reescrito continuamente
+        """
+        buf = self._abrir()
+        if buf is None:
+            return None
+        
+        for tentativa in range(TENTATIVAS_LEITURA):
+            sequencia, versao, gerado_em, tamanho = CABECALHO.unpack_from(buf, 0)
+            if sequencia % 2:
+                # Escritor no meio da gravação
+                time.sleep(0 if tentativa < 10 else 0.0005)
+                continue
+            
+            if not tamanho or CABECALHO.size + tamanho > len(buf):
+                return None
+            
+            conteudo = bytes(buf[CABECALHO.size:CABECALHO.size + tamanho])
+            if CABECALHO.unpack_from(buf, 0)[0] == sequencia:
+                return conteudo, versao, gerado_em
+        
+        return None
+
+    def _gravar(self, buf, montar):
+        """Grava um novo conteúdo (com as travas já obtidas)."""
+        sequencia, versao, _, _ = CABECALHO.unpack_from(buf, 0)
+        versao += 1
+        gerado_em = time.time()
+        conteudo = montar(versao, gerado_em)
+        
+        if conteudo is not None and CABECALHO.size + len(conteudo) > len(buf):
+            logger.warning('Instantâneo da fila maior que o segmento (%d bytes); '
+                           'aumente SNAPSHOT_SHM_SIZE', len(conteudo))
+            conteudo = None
+        
+        # Sequência ímpar: leitores descartam o que copiarem a partir daqui
+        struct.pack_into('<Q', buf, 0, sequencia + 1)
+        if conteudo is not None:
+            buf[CABECALHO.size:CABECALHO.size + len(conteudo)] = conteudo
+            CABECALHO.pack_into(buf, 0, sequencia + 1, versao, gerado_em, len(conteudo))
+        else:
+            CABECALHO.pack_into(buf, 0, sequencia + 1, versao, gerado_em, 0)
+        struct.pack_into('<Q', buf, 0, sequencia + 2)
+        
+        return versao if conteudo is not None else None
+
+    def publicar(self, montar):
+        """
+        Substitui o instantâneo.
+        
+        A função `montar` é chamada com as travas obtidas, de modo que
+        dois workers nunca publiquem fora de ordem uma leitura mais antiga
+        do banco por cima de uma mais recente.
+        
+        Args:
+            montar (callable): Recebe (versao, gerado_em) e retorna o JSON
+                em bytes, ou None para apenas invalidar o segmento
+        
+        Returns:
+            int: Versão publicada, ou None se nada foi publicado
+        """
+        buf = self._abrir()
+        if buf is None:
+            return None
+        
+        with self._trava:
+            if self._arquivo_trava is None:
+                caminho = os.path.join(tempfile.gettempdir(), f'{self.nome}.lock')
+                self._arquivo_trava = os.open(caminho, os.O_RDWR | os.O_CREAT, 0o600)
+            
+            fcntl.flock(self._arquivo_trava, fcntl.LOCK_EX)
+            try:
+                return self._gravar(buf, montar)
+            finally:
+                fcntl.flock(self._arquivo_trava, fcntl.LOCK_UN)
+
+    def invalidar(self):
+        """Marca o instantâneo como vazio; a próxima leitura reconstrói a partir do banco."""
+        self.publicar(lambda versao, gerado_em: None)
+
+    def fechar(self):
+        """Desfaz o mapeamento neste processo (o segmento continua existindo)."""
+        if self._memoria is not None:
+            try:
+                self._memoria.close()
+            except BufferError:
+                pass  # ainda há uma leitura usando o buffer
+            self._memoria = None
+        if self._arquivo_trava is not None:
+            os.close(self._arquivo_trava)
+            self._arquivo_trava = None
+
+class InstantaneosFila:
+    """
+    Segmentos do instantâneo da fila, um por banco (principal e cada loja).
+    
+    Atributos:
+        ativo (bool): Serve /api/fila a partir do instantâneo
+        prefixo (str): Início do nome dos segmentos desta instalação
+        capacidade (int): Tamanho de cada segmento em bytes
+        idade_maxima (float): Segundos até um instantâneo ser considerado
+            velho (alterações feitas fora da aplicação)
+        lidos (int): Respostas servidas a partir do instantâneo
+        reconstruidos (int): Instantâneos reconstruídos a partir do banco
+    """
+
+    def __init__(self):
+        self.ativo = False
+        self.prefixo = None
+        self.capacidade = 1024 * 1024
+        self.idade_maxima = 60
+        self.lidos = 0
+        self.reconstruidos = 0
+        self.segmentos = {}
+        self.trava = threading.Lock()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.ativo = app.config.get('SNAPSHOT_ENABLED', False)
+        self.capacidade = app.config.get('SNAPSHOT_SHM_SIZE', 1024 * 1024)
+        self.idade_maxima = app.config.get('SNAPSHOT_MAX_AGE', 60)
+        # Workers que usam o mesmo banco compartilham os segmentos
+        resumo = hashlib.sha1(app.config['SQLALCHEMY_DATABASE_URI'].encode('utf-8')).hexdigest()[:12]
+        self.prefixo = f'sistema_fila_{resumo}'
+
+    def segmento(self, loja=''):
+        """
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+        
+        Returns:
+            SegmentoFila: Segmento da loja
+        """
+        segmento = self.segmentos.get(loja)
+        if segmento is None:
+            with self.trava:
+                segmento = self.segmentos.get(loja)
+                if segmento is None:
+                    nome = f'{self.prefixo}_{loja}' if loja else self.prefixo
+                    segmento = SegmentoFila(nome, self.capacidade)
+                    self.segmentos[loja] = segmento
+        return segmento
+
+    def ler(self, loja=''):
+        """
+        Returns:
+            tuple: (json, versao, gerado_em) do instantâneo, ou None se
+                vazio ou mais velho que idade_maxima
+        """
+        lido = self.segmento(loja).ler()
+        if lido is None or time.time() - lido[2] > self.idade_maxima:
+            return None
+        return lido
+
+    def reconstruir(self, loja=''):
+        """
+        Lê a fila no banco e publica um novo instantâneo.
+        
+        Deve ser chamado com o contexto de aplicação (e a loja) do banco
+        correspondente.
+        
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+        
+        Returns:
+            tuple: (json, versao, gerado_em) publicado; versao é None se o
+                segmento não pôde ser usado e o JSON veio direto do banco
+        """
+        from src.services.fila import montar_fila_completa
+        
+        montado = {}
+
+        def montar(versao, gerado_em):
+            dados = montar_fila_completa()
+            dados['versao'] = versao
+            dados['timestamp'] = datetime.utcfromtimestamp(gerado_em).isoformat()
+            dados['status'] = 'sucesso'
+            montado['json'] = json.dumps(dados, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+            montado['gerado_em'] = gerado_em
+            return montado['json']
+        
+        versao = self.segmento(loja).publicar(montar)
+        self.reconstruidos += 1
+        
+        if 'json' not in montado:
+            # Segmento indisponível: monta a resposta sem publicar
+            montar(None, time.time())
+        return montado['json'], versao, montado['gerado_em']
+
+    def obter(self, loja=''):
+        """
+        Retorna o instantâneo, reconstruindo-o se estiver vazio ou velho.
+        
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+        
+        Returns:
+            tuple: (json, versao, gerado_em)
+        """
+        lido = self.ler(loja)
+        if lido is not None:
+            self.lidos += 1
+            return lido
+        return self.reconstruir(loja)
+
+    def invalidar(self, loja=''):
+        """
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+        """
+        self.segmento(loja).invalidar()
+
+    def fechar(self):
+        """Desfaz o mapeamento de todos os segmentos neste processo."""
+        with self.trava:
+            segmentos = list(self.segmentos.values())
+            self.segmentos.clear()
+        for segmento in segmentos:
+            segmento.fechar()
+
+    def _apos_fork(self):
+        """No processo filho, reabre segmentos e travas de arquivo por conta própria."""
+        self.segmentos = {}
+        self.trava = threading.Lock()
+
+# Instância única, compartilhada pela aplicação
+instantaneos_fila = InstantaneosFila()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=instantaneos_fila._apos_fork)
@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Modo Multi-Loja (um banco SQLite por barbearia)
+
+Este arquivo permite que um único processo atenda várias barbearias,
+cada uma com seu próprio arquivo SQLite. A loja é identificada pelo
+host (loja1.exemplo.com) ou por um prefixo no caminho (/lojas/loja1/api/...),
+e a sessão do SQLAlchemy da requisição passa a usar o banco dessa loja.
+
+Os engines ficam em um cache LRU: são criados na primeira requisição da
+loja e descartados (com suas conexões) quando o limite é atingido, de
+modo que a quantidade de arquivos abertos é limitada mesmo com centenas
+de lojas. Como cada loja tem seu arquivo, as escritas de uma loja não
+bloqueiam as demais.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from flask import g, has_app_context
+from sqlalchemy import create_engine
+
+# Identificador válido de loja: letras minúsculas, números e hífens
+PADRAO_LOJA = re.compile(r'^[a-z0-9](?:[a-z0-9-]{0,61}[a-z0-9])?$')
+
+# Chave do ambiente WSGI onde o middleware guarda a loja resolvida
+CHAVE_AMBIENTE = 'sistema_fila.loja'
+
+class LojaNaoEncontrada(Exception):
+    """Loja inexistente (e criação automática desativada) ou identificador inválido."""
+
+class Loja:
+    """
+    Recursos de uma loja mantidos no cache.
+    
+    Atributos:
+        slug (str): Identificador da loja
+        caminho (str): Arquivo SQLite da loja
+        engine (Engine): Engine do SQLAlchemy
+        engines (dict): Mapeamento de binds usado pelo Flask-SQLAlchemy
+        estatisticas (EstatisticasFila): Contadores de /api/status da loja
+    """
+    
+    __slots__ = ('slug', 'caminho', 'engine', 'engines', 'estatisticas')
+
+    def __init__(self, slug, caminho, engine):
+        from src.services.estatisticas import EstatisticasFila
+        
+        self.slug = slug
+        self.caminho = caminho
+        self.engine = engine
+        self.engines = {None: engine}
+        self.estatisticas = EstatisticasFila()
+
+def loja_atual():
+    """
+    Returns:
+        Loja: Loja da requisição (ou do comando) atual, ou None no banco principal
+    """
+    if not has_app_context():
+        return None
+    return g.get('loja')
+
+def chave_loja():
+    """
+    Returns:
+        str: Identificador da loja atual ('' no banco principal), para chavear caches
+    """
+    loja = loja_atual()
+    return loja.slug if loja is not None else ''
+
+class GerenciadorLojas:
+    """
+    Cache LRU dos engines das lojas.
+    
+    Atributos:
+        diretorio (str): Diretório dos arquivos SQLite das lojas
+        maximo_engines (int): Engines mantidos abertos ao mesmo tempo
+        criar_automaticamente (bool): Cria o banco de uma loja desconhecida
+    """
+
+    def __init__(self):
+        self.diretorio = None
+        self.maximo_engines = 64
+        self.criar_automaticamente = False
+        self.opcoes_engine = {}
+        self.lojas = OrderedDict()
+        self.trava = threading.Lock()
+        self._ao_criar = []
+        self._thread = None
+        self._parar = threading.Event()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.diretorio = app.config['TENANT_DATABASE_DIR']
+        self.maximo_engines = app.config.get('TENANT_MAX_ENGINES', 64)
+        self.criar_automaticamente = app.config.get('TENANT_AUTO_CREATE', False)
+        self.opcoes_engine = {
+            **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {}),
+            'pool_size': app.config.get('TENANT_POOL_SIZE', 2),
+            'max_overflow': app.config.get('TENANT_POOL_OVERFLOW', 2)
+        }
+        os.makedirs(self.diretorio, exist_ok=True)
+
+    def ao_criar_engine(self, funcao):
+        """
+        Registra uma função chamada com cada engine novo (ex.: instrumentação).
+        
+        Args:
+            funcao (callable): Recebe o Engine recém-criado
+        """
+        self._ao_criar.append(funcao)
+
+    def caminho(self, slug):
+        """
+        Args:
+            slug (str): Identificador da loja
+        
+        Returns:
+            str: Arquivo SQLite da loja
+        """
+        return os.path.join(self.diretorio, f'{slug}.db')
+
+    def obter(self, slug, criar=None):
+        """
+        Retorna a loja do cache, abrindo (e se preciso criando) seu banco.
+        
+        Args:
+            slug (str): Identificador da loja
+            criar (bool): Cria o banco se não existir (padrão: TENANT_AUTO_CREATE)
+        
+        Returns:
+            Loja: Loja pronta para uso
+        
+        Raises:
+            LojaNaoEncontrada: Identificador inválido ou banco inexistente
+        """
+        with self.trava:
+            loja = self.lojas.get(slug)
+            if loja is not None:
+                self.lojas.move_to_end(slug)
+                return loja
+        
+        if not PADRAO_LOJA.match(slug or ''):
+            raise LojaNaoEncontrada(f'Identificador de loja inválido: {slug!r}')
+        
+        caminho = self.caminho(slug)
+        nova = not os.path.exists(caminho)
+        if nova and not (self.criar_automaticamente if criar is None else criar):
+            raise LojaNaoEncontrada(f'Loja não encontrada: {slug}')
+        
+        engine = create_engine(f'sqlite:///{caminho}', **self.opcoes_engine)
+        loja = Loja(slug, caminho, engine)
+        self._preparar(loja)
+        
+        with self.trava:
+            existente = self.lojas.get(slug)
+            if existente is not None:
+                # Outra thread abriu a mesma loja enquanto esta preparava o banco
+                engine.dispose()
+                self.lojas.move_to_end(slug)
+                return existente
+            
+            self.lojas[slug] = loja
+            removidas = []
+            while len(self.lojas) > self.maximo_engines:
+                removidas.append(self.lojas.popitem(last=False)[1])
+        
+        for removida in removidas:
+            # Conexões em uso continuam válidas e são fechadas ao serem devolvidas
+            removida.engine.dispose()
+        
+        return loja
+
+    def _preparar(self, loja):
+        """Cria as tabelas, aplica migrações e funções registradas e carrega os contadores."""
+        from src.models.user import db
+        from src.models.migracoes import aplicar_migracoes
+        
+        db.metadata.create_all(loja.engine)
+        aplicar_migracoes(loja.engine)
+        for funcao in self._ao_criar:
+            funcao(loja.engine)
+        
+        with self.usar(loja):
+            loja.estatisticas.reconciliar()
+
+    @contextmanager
+    def usar(self, loja):
+        """
+        Direciona a sessão do contexto de aplicação atual para o banco da loja.
+        
+        Uso (comandos de linha de comando):
+            with gerenciador_lojas.usar(gerenciador_lojas.obter('loja1')):
+                Barbeiro.query.all()
+        
+        Args:
+            loja (Loja): Loja a ser usada
+        """
+        from src.models.user import db
+        
+        anterior = g.get('loja')
+        db.session.remove()
+        g.loja = loja
+        try:
+            yield loja
+        finally:
+            db.session.remove()
+            g.loja = anterior
+
+    def listar(self):
+        """
+        Returns:
+            list: Identificadores das lojas com banco no diretório
+        """
+        if not self.diretorio or not os.path.isdir(self.diretorio):
+            return []
+        return sorted(nome[:-3] for nome in os.listdir(self.diretorio)
+                      if nome.endswith('.db') and PADRAO_LOJA.match(nome[:-3]))
+
+    def abertas(self):
+        """
+        Returns:
+            list: Lojas com engine aberto, da menos para a mais recente
+        """
+        with self.trava:
+            return list(self.lojas.values())
+
+    def iniciar_reconciliacao_periodica(self, app, intervalo):
+        """
+        Reconcilia periodicamente os contadores de cada loja aberta.
+        
+        Args:
+            app (Flask): Aplicação Flask
+            intervalo (float): Segundos entre reconciliações
+        """
+        if self._thread is not None or not intervalo:
+            return
+
+        def executar():
+            while not self._parar.wait(intervalo):
+                for loja in self.abertas():
+                    try:
+                        with app.app_context(), self.usar(loja):
+                            loja.estatisticas.reconciliar()
+                    except Exception as e:
+                        app.logger.warning('Falha ao reconciliar contadores da loja %s: %s', loja.slug, e)
+        
+        self._thread = threading.Thread(target=executar, name='reconciliacao-lojas', daemon=True)
+        self._thread.start()
+
+    def fechar(self):
+        """Interrompe a reconciliação e fecha todos os engines."""
+        self._parar.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self._parar.clear()
+        
+        with self.trava:
+            lojas = list(self.lojas.values())
+            self.lojas.clear()
+        for loja in lojas:
+            loja.engine.dispose()
+
+class MiddlewareLojas:
+    """
+    Middleware WSGI que identifica a loja de cada requisição.
+    
+    No modo 'caminho', /lojas/<slug>/api/fila é atendido como /api/fila,
+    com o prefixo movido para SCRIPT_NAME (as URLs geradas pelo Flask o
+    mantêm). No modo 'host', a loja é o primeiro rótulo do host, ou o que
+    sobra do host ao remover TENANT_HOST_SUFFIX.
+    """
+
+    def __init__(self, wsgi_app, modo='caminho', prefixo='/lojas', sufixo_host=None):
+        self.wsgi_app = wsgi_app
+        self.modo = modo
+        self.prefixo = prefixo.rstrip('/')
+        self.sufixo_host = sufixo_host
+
+    def _loja_do_host(self, environ):
+        host = (environ.get('HTTP_HOST') or environ.get('SERVER_NAME') or '').split(':')[0].lower()
+        if self.sufixo_host:
+            if host.endswith(self.sufixo_host) and len(host) > len(self.sufixo_host):
+                return host[:-len(self.sufixo_host)].rstrip('.')
+            return None
+        rotulos = host.split('.')
+        return rotulos[0] if len(rotulos) >= 3 else None
+
+    def _loja_do_caminho(self, environ):
+        caminho = environ.get('PATH_INFO', '')
+        if not caminho.startswith(self.prefixo + '/'):
+            return None
+        
+        resto = caminho[len(self.prefixo) + 1:]
+        slug, barra, caminho_loja = resto.partition('/')
+        environ['SCRIPT_NAME'] = f"{environ.get('SCRIPT_NAME', '')}{self.prefixo}/{slug}"
+        environ['PATH_INFO'] = barra + caminho_loja
+        return slug
+
+    def __call__(self, environ, start_response):
+        if self.modo == 'host':
+            slug = self._loja_do_host(environ)
+        else:
+            slug = self._loja_do_caminho(environ)
+        
+        if slug is not None:
+            environ[CHAVE_AMBIENTE] = slug
+        return self.wsgi_app(environ, start_response)
+
+# Instância única do gerenciador, compartilhada pela aplicação
+gerenciador_lojas = GerenciadorLojas()
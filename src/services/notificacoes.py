@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Barramento de Notificações entre Workers
+
+Com vários workers (gunicorn -w 4), cada processo tem seus próprios
+caches e contadores em memória. Este barramento avisa todos os workers
+da mesma instalação quando a fila, os barbeiros ou os atendimentos
+mudam, sem nenhum broker externo: cada processo abre um socket Unix de
+datagramas em um diretório compartilhado e a publicação envia o evento
+para os sockets dos demais. A entrega leva poucos milissegundos.
+
+Os eventos são publicados automaticamente após o commit de qualquer
+sessão que tenha alterado clientes, barbeiros, atendimentos ou agendamentos.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import socket
+import tempfile
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+# Tipo de evento publicado para cada tabela alterada
+EVENTOS_POR_TABELA = {
+    'clientes': 'fila',
+    'barbeiros': 'barbeiros',
+    'atendimentos': 'atendimentos',
+    'agendamentos': 'agendamentos'
+}
+
+# Tamanho máximo de um evento serializado
+TAMANHO_MAXIMO_EVENTO = 4096
+
+logger = logging.getLogger('sistema_fila.notificacoes')
+
+def diretorio_padrao(uri_banco):
+    """
+    Diretório dos sockets de uma instalação.
+    
+    Workers que usam o mesmo banco compartilham o diretório; instalações
+    diferentes na mesma máquina não recebem os eventos umas das outras.
+    
+    Args:
+        uri_banco (str): SQLALCHEMY_DATABASE_URI da aplicação
+    
+    Returns:
+        str: Caminho do diretório
+    """
+    resumo = hashlib.sha1(uri_banco.encode('utf-8')).hexdigest()[:12]
+    return os.path.join(tempfile.gettempdir(), f'sistema_fila_eventos_{resumo}')
+
+class BarramentoEventos:
+    """
+    Publica e recebe eventos entre os processos da mesma instalação.
+    
+    Atributos:
+        diretorio (str): Diretório dos sockets dos workers
+        inscritos (list): Funções chamadas com (evento, remoto)
+        publicados (int): Eventos publicados por este processo
+        recebidos (int): Eventos recebidos de outros processos
+        descartados (int): Envios que falharam (socket cheio ou erro)
+    """
+
+    def __init__(self):
+        self.diretorio = None
+        self.inscritos = []
+        self.publicados = 0
+        self.recebidos = 0
+        self.descartados = 0
+        self._socket = None
+        self._caminho = None
+        self._pid = None
+        self._thread = None
+        self._trava = threading.Lock()
+
+    def configurar(self, diretorio):
+        """
+        Define o diretório dos sockets. O socket deste processo é aberto
+        na primeira publicação ou requisição (depois do fork do worker).
+        
+        Args:
+            diretorio (str): Diretório compartilhado pelos workers
+        """
+        self.diretorio = diretorio
+        os.makedirs(diretorio, mode=0o700, exist_ok=True)
+
+    def inscrever(self, funcao):
+        """
+        Registra uma função chamada a cada evento.
+        
+        A função recebe (evento, remoto): `remoto` é False quando o evento
+        foi publicado pelo próprio processo. Eventos remotos são entregues
+        na thread receptora, então a função deve ser rápida.
+        
+        Args:
+            funcao (callable): Função inscrita
+        """
+        if funcao not in self.inscritos:
+            self.inscritos.append(funcao)
+
+    def garantir_iniciado(self):
+        """Abre o socket e a thread receptora deste processo, se ainda não abertos."""
+        if self.diretorio is None or self._pid == os.getpid():
+            return
+        
+        with self._trava:
+            if self._pid == os.getpid():
+                return
+            
+            caminho = os.path.join(self.diretorio, f'{os.getpid()}.sock')
+            if os.path.exists(caminho):
+                os.unlink(caminho)
+            
+            receptor = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            receptor.bind(caminho)
+            self._socket = receptor
+            self._caminho = caminho
+            self._pid = os.getpid()
+            
+            self._thread = threading.Thread(target=self._receber, args=(receptor,),
+                                            name='barramento-eventos', daemon=True)
+            self._thread.start()
+
+    def _receber(self, receptor):
+        """Laço da thread receptora."""
+        while True:
+            try:
+                dados = receptor.recv(TAMANHO_MAXIMO_EVENTO)
+            except OSError:
+                return  # socket fechado
+            
+            try:
+                evento = json.loads(dados)
+            except ValueError:
+                continue
+            
+            self.recebidos += 1
+            self._entregar(evento, remoto=True)
+
+    def _entregar(self, evento, remoto):
+        """Chama as funções inscritas, isolando falhas de cada uma."""
+        for funcao in self.inscritos:
+            try:
+                funcao(evento, remoto)
+            except Exception:
+                logger.exception('Falha ao tratar evento %s', evento.get('tipo'))
+
+    def publicar(self, tipo, loja='', **dados):
+        """
+        Publica um evento para este e para os demais processos.
+        
+        Args:
+            tipo (str): Tipo do evento ('fila', 'barbeiros', 'atendimentos', 'agendamentos',
+                'historico' quando atendimentos antigos são excluídos)
+            loja (str): Loja afetada ('' no banco principal)
+            **dados: Informações adicionais do evento
+        """
+        evento = {'tipo': tipo, 'loja': loja, 'origem': os.getpid(), 'momento': time.time(), **dados}
+        self.publicados += 1
+        self._entregar(evento, remoto=False)
+        
+        if self.diretorio is None:
+            return
+        
+        self.garantir_iniciado()
+        mensagem = json.dumps(evento, default=str).encode('utf-8')
+        
+        try:
+            destinos = [entrada.path for entrada in os.scandir(self.diretorio)
+                        if entrada.name.endswith('.sock') and entrada.path != self._caminho]
+        except FileNotFoundError:
+            return
+        
+        for destino in destinos:
+            try:
+                self._socket.sendto(mensagem, socket.MSG_DONTWAIT, destino)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker encerrado sem remover o socket
+                try:
+                    os.unlink(destino)
+                except OSError:
+                    pass
+            except OSError:
+                # Fila do receptor cheia: a reconciliação periódica corrige
+                self.descartados += 1
+
+    def fechar(self):
+        """Fecha o socket deste processo e remove o arquivo."""
+        with self._trava:
+            if self._socket is not None and self._pid == os.getpid():
+                self._socket.close()
+                try:
+                    os.unlink(self._caminho)
+                except OSError:
+                    pass
+            self._socket = None
+            self._pid = None
+
+    def _apos_fork(self):
+        """No processo filho, descarta o socket herdado do processo pai."""
+        self._socket = None
+        self._caminho = None
+        self._pid = None
+        self._thread = None
+        self._trava = threading.Lock()
+
+def _registrar_alteracoes(sessao, contexto_flush):
+    """after_flush: anota os tipos de evento das tabelas alteradas na sessão."""
+    pendentes = sessao.info.setdefault('eventos_pendentes', set())
+    
+    for objeto in sessao.new | sessao.deleted:
+        tipo = EVENTOS_POR_TABELA.get(getattr(objeto, '__tablename__', None))
+        if tipo:
+            pendentes.add(tipo)
+    
+    for objeto in sessao.dirty:
+        tipo = EVENTOS_POR_TABELA.get(getattr(objeto, '__tablename__', None))
+        # Atribuições que não mudaram o valor não geram evento
+        if tipo and tipo not in pendentes and sessao.is_modified(objeto, include_collections=False):
+            pendentes.add(tipo)
+
+def _publicar_pendentes(sessao):
+    """after_commit: publica os eventos anotados durante a transação."""
+    pendentes = sessao.info.pop('eventos_pendentes', None)
+    if not pendentes:
+        return
+    
+    from src.services.lojas import chave_loja
+    
+    loja = chave_loja()
+    for tipo in sorted(pendentes):
+        barramento.publicar(tipo, loja)
+
+def _descartar_pendentes(sessao, *args):
+    """after_rollback: a transação foi desfeita, nada a publicar."""
+    sessao.info.pop('eventos_pendentes', None)
+
+def marcar_alteracao(sessao, tipo):
+    """
+    Anota um evento para ser publicado após o commit da sessão.
+    
+    Necessário em alterações feitas com UPDATE/DELETE em massa, que não
+    passam pelos objetos do ORM.
+    
+    Args:
+        sessao (Session): Sessão do SQLAlchemy
+        tipo (str): Tipo do evento ('fila', 'barbeiros', 'atendimentos')
+    """
+    sessao.info.setdefault('eventos_pendentes', set()).add(tipo)
+
+def instalar_ouvintes_sessao():
+    """Instala os ouvintes que publicam eventos após cada commit."""
+    if not event.contains(Session, 'after_flush', _registrar_alteracoes):
+        event.listen(Session, 'after_flush', _registrar_alteracoes)
+        event.listen(Session, 'after_commit', _publicar_pendentes)
+        event.listen(Session, 'after_rollback', _descartar_pendentes)
+
+# Instância única do barramento, compartilhada pela aplicação
+barramento = BarramentoEventos()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=barramento._apos_fork)
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Serviço: Relatórios sobre o Histórico de Atendimentos
+
+Este arquivo contém os cálculos dos relatórios que percorrem o histórico
+e o cache dos resultados de dias já encerrados.
+
+O histórico só recebe linhas novas (atendimentos concluídos, importações,
+histórico gerado); um dia encerrado muda apenas quando chega um
+atendimento antigo ou quando o histórico de um barbeiro é excluído. Por
+isso o cache guarda, por loja, o maior ID de atendimento já considerado:
+antes de cada relatório uma consulta pela chave primária encontra o
+atendimento mais antigo gravado depois disso, e só os dias a partir dele
+são descartados. Exclusões chegam pelo evento 'historico' do barramento.
+
+As datas do banco estão em UTC; dias e horários de funcionamento dos
+relatórios são os do fuso da barbearia (SHOP_TIMEZONE).
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import heapq
+import threading
+from collections import OrderedDict, defaultdict
+from datetime import timedelta
+
+from sqlalchemy import and_, case, func, or_, select
+from src.utils.fuso_horario import ConversorLocal, fuso_loja, hoje_local, inicio_dia_utc, para_local
+
+UM_DIA = timedelta(days=1)
+
+class CacheRelatorios:
+    """
+    Cache LRU de resultados de relatórios de dias encerrados, por loja.
+    
+    Atributos:
+        maximo (int): Entradas mantidas (um dia de um relatório por entrada)
+        entradas (OrderedDict): (loja, chave) -> (último dia coberto, valor)
+        marcas (dict): Por loja, maior ID de atendimento já considerado
+    """
+
+    def __init__(self):
+        self.maximo = 20000
+        self.entradas = OrderedDict()
+        self.marcas = {}
+        self.trava = threading.Lock()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.maximo = app.config.get('REPORT_CACHE_MAX_ENTRIES', 20000)
+
+    def invalidar(self, loja='', desde=None):
+        """
+        Descarta resultados de uma loja.
+        
+        Args:
+            loja (str): Identificador da loja ('' no banco principal)
+            desde (date): Descarta apenas resultados que cobrem este dia ou
+                posteriores (None descarta todos e a marca da loja)
+        """
+        with self.trava:
+            for chave in [chave for chave, (ultimo_dia, _) in self.entradas.items()
+                          if chave[0] == loja and (desde is None or ultimo_dia >= desde)]:
+                del self.entradas[chave]
+            if desde is None:
+                self.marcas.pop(loja, None)
+
+    def sincronizar(self):
+        """
+        Descarta os dias alterados por atendimentos gravados desde a última consulta.
+        
+        Returns:
+            str: Identificador da loja atual, para chavear as entradas
+        """
+        from src.models.user import db
+        from src.models.atendimento import Atendimento
+        from src.services.lojas import chave_loja
+        
+        loja = chave_loja()
+        with self.trava:
+            marca = self.marcas.get(loja)
+        
+        if marca is None:
+            maior_id = db.session.execute(select(func.max(Atendimento.id))).scalar() or 0
+            with self.trava:
+                self.marcas.setdefault(loja, maior_id)
+            return loja
+        
+        mais_antigo, maior_id = db.session.execute(
+            select(func.min(Atendimento.data_inicio), func.max(Atendimento.id)).where(Atendimento.id > marca)
+        ).one()
+        if maior_id is not None:
+            self.invalidar(loja, para_local(mais_antigo).date())
+            with self.trava:
+                self.marcas[loja] = max(self.marcas.get(loja, 0), maior_id)
+        return loja
+
+    def obter(self, loja, chave):
+        """
+        Args:
+            loja (str): Identificador da loja
+            chave (tuple): Relatório e parâmetros do resultado
+        
+        Returns:
+            Resultado guardado, ou None
+        """
+        with self.trava:
+            guardado = self.entradas.get((loja, *chave))
+            if guardado is None:
+                return None
+            self.entradas.move_to_end((loja, *chave))
+            return guardado[1]
+
+    def guardar(self, loja, chave, valor, ultimo_dia):
+        """
+        Guarda o resultado de um período encerrado.
+        
+        Args:
+            loja (str): Identificador da loja
+            chave (tuple): Relatório e parâmetros do resultado
+            valor: Resultado
+            ultimo_dia (date): Último dia coberto pelo resultado
+        """
+        with self.trava:
+            self.entradas[(loja, *chave)] = (ultimo_dia, valor)
+            self.entradas.move_to_end((loja, *chave))
+            while len(self.entradas) > self.maximo:
+                self.entradas.popitem(last=False)
+
+def varrer_utilizacao(linhas, dias, abertura, fechamento, fuso):
+    """
+    Calcula a ocupação dos barbeiros com uma varredura pelos inícios dos atendimentos.
+    
+    As linhas chegam em ordem de início. Um heap de mínimo guarda o fim
+    dos atendimentos em andamento: antes de cada início saem do heap os
+    que já terminaram, e o número de barbeiros com atendimento em
+    andamento nesse instante é candidato ao pico do dia. Os minutos
+    ocupados de cada barbeiro são a união dos seus intervalos (um
+    atendimento sobreposto a outro do mesmo barbeiro não conta duas
+    vezes), limitada ao horário de funcionamento de cada dia.
+    
+    Dias e horário de funcionamento são locais: a janela de cada dia é
+    convertida para UTC, o formato das datas das linhas.
+    
+    Args:
+        linhas: Iterável de (barbeiro_id, data_inicio, data_fim) em UTC, em ordem de início
+        dias (set): Dias locais (date) a calcular; os demais são ignorados
+        abertura (int): Hora local de abertura
+        fechamento (int): Hora local de fechamento
+        fuso (ZoneInfo): Fuso da barbearia
+    
+    Returns:
+        dict: Por dia, {'ocupado': {barbeiro_id: segundos}, 'pico': barbeiros,
+            'pico_em': datetime local}
+    """
+    resultado = {dia: {'ocupado': defaultdict(float), 'pico': 0, 'pico_em': None} for dia in dias}
+    janelas = {
+        dia: (inicio_dia_utc(dia, fuso, abertura), inicio_dia_utc(dia, fuso, fechamento), resultado[dia]['ocupado'])
+        for dia in dias
+    }
+    local = ConversorLocal(fuso)
+    em_andamento = []
+    atendimentos_abertos = defaultdict(int)
+    trabalhando = 0
+    ocupado_ate = {}
+    
+    for barbeiro_id, inicio, fim in linhas:
+        if fim <= inicio:
+            continue
+        
+        while em_andamento and em_andamento[0][0] <= inicio:
+            _, outro_id = heapq.heappop(em_andamento)
+            atendimentos_abertos[outro_id] -= 1
+            if not atendimentos_abertos[outro_id]:
+                trabalhando -= 1
+        
+        heapq.heappush(em_andamento, (fim, barbeiro_id))
+        atendimentos_abertos[barbeiro_id] += 1
+        if atendimentos_abertos[barbeiro_id] == 1:
+            trabalhando += 1
+        
+        inicio_local = local(inicio)
+        do_dia = resultado.get(inicio_local.date())
+        if do_dia is not None and trabalhando > do_dia['pico']:
+            do_dia['pico'] = trabalhando
+            do_dia['pico_em'] = inicio_local
+        
+        # Trecho ainda não contado (o barbeiro pode ter atendimentos sobrepostos)
+        desde = max(inicio, ocupado_ate.get(barbeiro_id, inicio))
+        if fim <= desde:
+            continue
+        ocupado_ate[barbeiro_id] = fim
+        
+        dia = local(desde).date()
+        ultimo_dia = local(fim).date()
+        while True:
+            janela = janelas.get(dia)
+            if janela is not None:
+                abre, fecha, ocupado = janela
+                trecho = (min(fim, fecha) - max(desde, abre)).total_seconds()
+                if trecho > 0:
+                    ocupado[barbeiro_id] += trecho
+            if dia >= ultimo_dia:
+                break
+            dia += UM_DIA
+    
+    return resultado
+
+def utilizacao_por_dia(primeiro_dia, ultimo_dia, abertura, fechamento):
+    """
+    Ocupação dos barbeiros em cada dia de um período.
+    
+    Dias encerrados vêm do cache; os que faltam são calculados com uma
+    única consulta em ordem de data_inicio (índice ix_atendimentos_data_inicio),
+    lida em blocos, sem carregar o período inteiro em memória.
+    
+    Args:
+        primeiro_dia (date): Primeiro dia local do período
+        ultimo_dia (date): Último dia local do período (incluído)
+        abertura (int): Hora local de abertura
+        fechamento (int): Hora local de fechamento
+    
+    Returns:
+        tuple: ({dia: resultado de varrer_utilizacao}, dias vindos do cache)
+    """
+    from src.models.user import db
+    from src.models.atendimento import Atendimento
+    
+    loja = cache_relatorios.sincronizar()
+    fuso = fuso_loja()
+    hoje = hoje_local(fuso)
+    
+    resultados = {}
+    faltando = set()
+    dia = primeiro_dia
+    while dia <= ultimo_dia:
+        guardado = cache_relatorios.obter(loja, ('utilizacao', dia, abertura, fechamento))
+        if guardado is not None:
+            resultados[dia] = guardado
+        else:
+            faltando.add(dia)
+        dia += timedelta(days=1)
+    
+    if faltando:
+        inicio_periodo = inicio_dia_utc(min(faltando), fuso)
+        fim_periodo = inicio_dia_utc(max(faltando), fuso, 24)
+        
+        # Atendimentos iniciados até um dia antes podem avançar sobre o período
+        linhas = db.session.execute(
+            select(Atendimento.barbeiro_id, Atendimento.data_inicio, Atendimento.data_fim)
+            .where(
+                Atendimento.data_inicio >= inicio_periodo - timedelta(days=1),
+                Atendimento.data_inicio < fim_periodo,
+                Atendimento.data_fim > inicio_periodo
+            )
+            .order_by(Atendimento.data_inicio)
+            .execution_options(yield_per=5000)
+        )
+        calculados = varrer_utilizacao(linhas, faltando, abertura, fechamento, fuso)
+        
+        for dia, resultado in calculados.items():
+            resultado['ocupado'] = dict(resultado['ocupado'])
+            resultados[dia] = resultado
+            if dia < hoje:
+                cache_relatorios.guardar(loja, ('utilizacao', dia, abertura, fechamento), resultado, dia)
+    
+    return resultados, len(resultados) - len(faltando)
+
+def mapa_calor(primeiro_dia, ultimo_dia, barbeiro_id=None):
+    """
+    Chegadas e espera por dia da semana e hora da entrada na fila.
+    
+    Um único GROUP BY sobre as colunas de período, respondido pelo
+    índice ix_atendimentos_periodo sem ler a tabela. Períodos encerrados
+    (que terminam antes de hoje) vêm do cache.
+    
+    Args:
+        primeiro_dia (date): Primeiro dia local do período
+        ultimo_dia (date): Último dia local do período (incluído)
+        barbeiro_id (int): Filtrar por barbeiro (None para todos)
+    
+    Returns:
+        tuple: (lista de (dia_semana, hora, chegadas, espera média, espera máxima),
+            True se veio do cache)
+    """
+    from src.models.user import db
+    from src.models.atendimento import Atendimento
+    
+    loja = cache_relatorios.sincronizar()
+    chave = ('mapa_calor', primeiro_dia, ultimo_dia, barbeiro_id)
+    guardado = cache_relatorios.obter(loja, chave)
+    if guardado is not None:
+        return guardado, True
+    
+    consulta = select(
+        Atendimento.dia_semana,
+        Atendimento.hora,
+        func.count(),
+        func.avg(Atendimento.tempo_espera),
+        func.max(Atendimento.tempo_espera)
+    ).where(Atendimento.dia >= primeiro_dia, Atendimento.dia <= ultimo_dia)
+    if barbeiro_id:
+        consulta = consulta.where(Atendimento.barbeiro_id == barbeiro_id)
+    
+    celulas = [tuple(linha) for linha in db.session.execute(
+        consulta.group_by(Atendimento.dia_semana, Atendimento.hora)
+    )]
+    
+    if ultimo_dia < hoje_local():
+        cache_relatorios.guardar(loja, chave, celulas, ultimo_dia)
+    return celulas, False
+
+def comparar_periodos(periodos, barbeiro_id=None):
+    """
+    Atendimentos e tempos de cada barbeiro em vários períodos, em uma consulta.
+    
+    Cada período vira uma condição sobre data_inicio; uma única passada
+    agrupada por barbeiro soma, com CASE, as linhas de cada período
+    (agregação condicional), e o WHERE lê só os intervalos pedidos pelo
+    índice ix_atendimentos_data_inicio. Períodos podem se sobrepor. Uma
+    comparação que termina antes de hoje vem do cache.
+    
+    Args:
+        periodos (list): (primeiro dia, último dia incluído) de cada período,
+            em dias do fuso da barbearia
+        barbeiro_id (int): Filtrar por barbeiro (None para todos)
+    
+    Returns:
+        tuple: ({barbeiro_id: lista, por período, de (atendimentos, soma da
+            espera, atendimentos com espera, soma do atendimento, atendimentos
+            com tempo de atendimento)}, True se veio do cache)
+    """
+    from src.models.user import db
+    from src.models.atendimento import Atendimento
+    
+    loja = cache_relatorios.sincronizar()
+    chave = ('comparativo', tuple(periodos), barbeiro_id)
+    guardado = cache_relatorios.obter(loja, chave)
+    if guardado is not None:
+        return guardado, True
+    
+    fuso = fuso_loja()
+    condicoes = [
+        and_(Atendimento.data_inicio >= inicio_dia_utc(primeiro_dia, fuso),
+             Atendimento.data_inicio < inicio_dia_utc(ultimo_dia, fuso, 24))
+        for primeiro_dia, ultimo_dia in periodos
+    ]
+    colunas = []
+    for condicao in condicoes:
+        colunas += [
+            func.count(case((condicao, 1))),
+            func.coalesce(func.sum(case((condicao, Atendimento.tempo_espera))), 0),
+            func.count(case((condicao, Atendimento.tempo_espera))),
+            func.coalesce(func.sum(case((condicao, Atendimento.tempo_atendimento))), 0),
+            func.count(case((condicao, Atendimento.tempo_atendimento)))
+        ]
+    
+    consulta = select(Atendimento.barbeiro_id, *colunas).where(or_(*condicoes))
+    if barbeiro_id:
+        consulta = consulta.where(Atendimento.barbeiro_id == barbeiro_id)
+    
+    por_barbeiro = {
+        linha[0]: [tuple(linha[1 + 5 * i:6 + 5 * i]) for i in range(len(periodos))]
+        for linha in db.session.execute(consulta.group_by(Atendimento.barbeiro_id))
+    }
+    
+    ultimo_dia = max(ultimo for _, ultimo in periodos)
+    if ultimo_dia < hoje_local(fuso):
+        cache_relatorios.guardar(loja, chave, por_barbeiro, ultimo_dia)
+    return por_barbeiro, False
+
+# Instância única do cache, compartilhada pela aplicação
+cache_relatorios = CacheRelatorios()
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Registro de Consultas Lentas
+
+Este arquivo registra as consultas SQL que ultrapassam o limite
+configurado em SLOW_QUERY_THRESHOLD_MS. Para cada consulta lenta são
+guardados o SQL normalizado, o formato dos parâmetros (tipos, sem os
+valores), a duração e a rota de origem. Na primeira ocorrência de cada
+impressão digital o plano de execução (EXPLAIN QUERY PLAN) é capturado.
+
+As entradas vão para os logs estruturados (inclusive LOG_FILE, quando
+configurado) e ficam disponíveis em memória para a rota
+/api/debug/slow-queries, protegida por SLOW_QUERY_SECRET.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import logging
+import threading
+from collections import OrderedDict, deque
+from datetime import datetime
+
+from flask import has_request_context, request
+from src.utils.orcamento_consultas import normalizar_sql
+
+# Quantidade máxima de planos de execução guardados
+MAXIMO_PLANOS = 500
+
+logger = logging.getLogger('sistema_fila.consultas_lentas')
+
+def formato_parametros(parametros):
+    """
+    Descreve os parâmetros de uma consulta apenas pelos seus tipos.
+    
+    Args:
+        parametros: Tupla, lista, dicionário ou lista de conjuntos (executemany)
+    
+    Returns:
+        Descrição serializável em JSON (valores nunca são incluídos)
+    """
+    if isinstance(parametros, dict):
+        return {chave: type(valor).__name__ for chave, valor in parametros.items()}
+    
+    if isinstance(parametros, (list, tuple)):
+        if parametros and isinstance(parametros[0], (list, tuple, dict)):
+            return {'executemany': len(parametros), 'formato': formato_parametros(parametros[0])}
+        return [type(valor).__name__ for valor in parametros]
+    
+    return type(parametros).__name__ if parametros is not None else None
+
+class RegistroConsultasLentas:
+    """
+    Registro em memória e em arquivo das consultas lentas.
+    
+    Atributos:
+        limite (float): Duração mínima, em segundos, para registrar uma consulta
+        entradas (deque): Últimas consultas lentas registradas
+        planos (OrderedDict): Plano de execução por impressão digital
+    """
+
+    def __init__(self, limite_ms=100, maximo_entradas=200):
+        self.limite = limite_ms / 1000
+        self.entradas = deque(maxlen=maximo_entradas)
+        self.planos = OrderedDict()
+        self.trava = threading.Lock()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.limite = app.config.get('SLOW_QUERY_THRESHOLD_MS', 100) / 1000
+        self.entradas = deque(maxlen=app.config.get('SLOW_QUERY_MAX_ENTRIES', 200))
+
+    def observar(self, contexto, conn, cursor, statement, parameters, duracao):
+        """
+        Observador SQL: registra a consulta se ela ultrapassou o limite.
+        
+        Args:
+            contexto (ContextoRequisicao): Contexto da requisição atual
+            conn (Connection): Conexão do SQLAlchemy
+            cursor: Cursor DBAPI que executou a consulta
+            statement (str): Instrução SQL
+            parameters: Parâmetros da instrução
+            duracao (float): Duração em segundos
+        """
+        if duracao < self.limite:
+            return
+        
+        impressao = normalizar_sql(statement)
+        rota = None
+        if has_request_context():
+            regra = request.url_rule.rule if request.url_rule else request.path
+            rota = f'{request.method} {regra}'
+        
+        entrada = {
+            'timestamp': datetime.utcnow().isoformat(),
+            'duracao_ms': round(duracao * 1000, 3),
+            'rota': rota,
+            'sql': impressao,
+            'parametros': formato_parametros(parameters),
+            'consulta_na_requisicao': contexto.consultas
+        }
+        
+        with self.trava:
+            primeira_vez = impressao not in self.planos
+            if primeira_vez:
+                # Reserva a vaga para que outra thread não capture o mesmo plano
+                self.planos[impressao] = None
+                if len(self.planos) > MAXIMO_PLANOS:
+                    self.planos.popitem(last=False)
+        
+        if primeira_vez:
+            plano = self._capturar_plano(conn, cursor, statement, parameters)
+            with self.trava:
+                if impressao in self.planos:
+                    self.planos[impressao] = plano
+            entrada['plano'] = plano
+        
+        with self.trava:
+            self.entradas.append(entrada)
+        
+        logger.warning('consulta lenta', extra={'dados': entrada})
+
+    def _capturar_plano(self, conn, cursor, statement, parameters):
+        """
+        Executa EXPLAIN QUERY PLAN direto no driver (sem disparar os ouvintes).
+        
+        Returns:
+            list: Linhas do plano, indentadas pela hierarquia (ou None)
+        """
+        if conn.dialect.name != 'sqlite':
+            return None
+        
+        if isinstance(parameters, list) and parameters and isinstance(parameters[0], (list, tuple, dict)):
+            parameters = parameters[0]
+        
+        try:
+            linhas = cursor.connection.execute('EXPLAIN QUERY PLAN ' + statement, parameters or ()).fetchall()
+        except Exception as e:
+            return [f'plano indisponível: {e}']
+        
+        niveis = {0: -1}
+        plano = []
+        for no_id, pai, _, detalhe in linhas:
+            niveis[no_id] = niveis.get(pai, -1) + 1
+            plano.append('  ' * niveis[no_id] + detalhe)
+        return plano
+
+    def listar(self, limite=None):
+        """
+        Retorna as consultas lentas mais recentes e os planos capturados.
+        
+        Args:
+            limite (int): Quantidade máxima de entradas
+        
+        Returns:
+            dict: Entradas (mais recentes primeiro) e planos por impressão
+        """
+        with self.trava:
+            entradas = list(self.entradas)[::-1]
+            planos = {sql: plano for sql, plano in self.planos.items() if plano is not None}
+        
+        return {
+            'limite_ms': round(self.limite * 1000, 3),
+            'entradas': entradas[:limite] if limite else entradas,
+            'planos': planos
+        }
+
+    def limpar(self):
+        """Descarta as entradas e os planos registrados."""
+        with self.trava:
+            self.entradas.clear()
+            self.planos.clear()
+
+# Instância única do registro, compartilhada pela aplicação
+consultas_lentas = RegistroConsultasLentas()
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Fuso Horário da Barbearia
+
+As datas são gravadas no banco em UTC, sem fuso (datetime.utcnow), mas
+horários de funcionamento, dias e horas dos relatórios são os do relógio
+da barbearia. Este arquivo converte entre os dois a partir de
+SHOP_TIMEZONE (nome IANA, ex.: 'America/Sao_Paulo').
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from datetime import datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+# Fuso usado fora do contexto da aplicação (ex.: scripts)
+FUSO_PADRAO = 'America/Sao_Paulo'
+
+def fuso_loja():
+    """
+    Returns:
+        ZoneInfo: Fuso horário configurado em SHOP_TIMEZONE
+    """
+    from flask import current_app, has_app_context
+    
+    nome = current_app.config.get('SHOP_TIMEZONE', FUSO_PADRAO) if has_app_context() else FUSO_PADRAO
+    return ZoneInfo(nome)
+
+def para_local(data, fuso=None):
+    """
+    Converte uma data gravada no banco (UTC sem fuso) para o horário local.
+    
+    Args:
+        data (datetime): Data em UTC sem fuso
+        fuso (ZoneInfo): Fuso da barbearia (padrão: fuso_loja())
+    
+    Returns:
+        datetime: Data no horário local, sem fuso
+    """
+    return data.replace(tzinfo=timezone.utc).astimezone(fuso or fuso_loja()).replace(tzinfo=None)
+
+def para_utc(data, fuso=None):
+    """
+    Converte um horário local da barbearia para o formato do banco (UTC sem fuso).
+    
+    Args:
+        data (datetime): Data no horário local, sem fuso
+        fuso (ZoneInfo): Fuso da barbearia (padrão: fuso_loja())
+    
+    Returns:
+        datetime: Data em UTC sem fuso
+    """
+    return data.replace(tzinfo=fuso or fuso_loja()).astimezone(timezone.utc).replace(tzinfo=None)
+
+def inicio_dia_utc(dia, fuso=None, hora=0):
+    """
+    Instante, em UTC sem fuso, em que começa uma hora de um dia local.
+    
+    Args:
+        dia (date): Dia no calendário da barbearia
+        fuso (ZoneInfo): Fuso da barbearia (padrão: fuso_loja())
+        hora (int): Hora local (0 a 24; 24 é o início do dia seguinte)
+    
+    Returns:
+        datetime: Instante em UTC sem fuso
+    """
+    if hora == 24:
+        return para_utc(datetime.combine(dia + timedelta(days=1), time(0)), fuso)
+    return para_utc(datetime.combine(dia, time(hora)), fuso)
+
+def hoje_local(fuso=None):
+    """
+    Returns:
+        date: Dia atual no calendário da barbearia
+    """
+    return para_local(datetime.utcnow(), fuso).date()
+
+class ConversorLocal:
+    """
+    Converte muitas datas UTC para o horário local (cargas e relatórios).
+    
+    O deslocamento do fuso é calculado uma vez por hora UTC e reaproveitado,
+    evitando o astimezone de cada linha; as mudanças de horário de verão
+    acontecem em horas cheias.
+    """
+
+    def __init__(self, fuso=None):
+        """
+        Args:
+            fuso (ZoneInfo): Fuso da barbearia (padrão: fuso_loja())
+        """
+        self.fuso = fuso or fuso_loja()
+        self._deslocamentos = {}
+
+    def __call__(self, data):
+        """
+        Args:
+            data (datetime): Data em UTC sem fuso
+        
+        Returns:
+            datetime: Data no horário local, sem fuso
+        """
+        chave = (data.toordinal(), data.hour)
+        deslocamento = self._deslocamentos.get(chave)
+        if deslocamento is None:
+            deslocamento = self._deslocamentos[chave] = \
+                data.replace(tzinfo=timezone.utc).astimezone(self.fuso).utcoffset()
+        return data + deslocamento
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Instrumentação de Requisições e Consultas SQL
+
+Este arquivo mantém o contexto de medição de cada requisição
+(tempo total, quantidade de consultas e tempo gasto no banco)
+e instala os ouvintes do SQLAlchemy que alimentam esse contexto.
+
+Outros módulos podem registrar observadores para receber cada
+consulta executada durante uma requisição.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import threading
+from time import perf_counter
+
+from sqlalchemy import event
+
+# Contexto da requisição em andamento, isolado por thread
+_local = threading.local()
+
+# Observadores chamados a cada consulta executada dentro de uma requisição
+_observadores_sql = []
+
+class ContextoRequisicao:
+    """
+    Acumula as medições de uma única requisição HTTP.
+    
+    Atributos:
+        inicio (float): Instante de início (perf_counter)
+        consultas (int): Quantidade de consultas SQL executadas
+        tempo_db (float): Tempo total gasto no banco, em segundos
+        dados (dict): Espaço livre para os observadores guardarem estado
+    """
+    
+    __slots__ = ('inicio', 'consultas', 'tempo_db', 'dados')
+
+    def __init__(self):
+        self.inicio = perf_counter()
+        self.consultas = 0
+        self.tempo_db = 0.0
+        self.dados = {}
+
+    def duracao(self):
+        """
+        Returns:
+            float: Tempo decorrido desde o início da requisição, em segundos
+        """
+        return perf_counter() - self.inicio
+
+def iniciar_contexto():
+    """
+    Cria o contexto de medição da requisição atual.
+    
+    Returns:
+        ContextoRequisicao: Contexto recém-criado
+    """
+    contexto = ContextoRequisicao()
+    _local.contexto = contexto
+    return contexto
+
+def obter_contexto():
+    """
+    Returns:
+        ContextoRequisicao: Contexto da requisição atual ou None
+    """
+    return getattr(_local, 'contexto', None)
+
+def encerrar_contexto():
+    """Remove o contexto de medição da thread atual."""
+    _local.contexto = None
+
+def registrar_observador_sql(observador):
+    """
+    Registra uma função chamada após cada consulta de uma requisição.
+    
+    A função recebe (contexto, conexao, cursor, sql, parametros, duracao)
+    e deve ser rápida, pois roda no caminho da requisição.
+    
+    Args:
+        observador (callable): Função observadora
+    """
+    if observador not in _observadores_sql:
+        _observadores_sql.append(observador)
+
+def remover_observador_sql(observador):
+    """
+    Remove um observador registrado anteriormente.
+    
+    Args:
+        observador (callable): Função observadora
+    """
+    if observador in _observadores_sql:
+        _observadores_sql.remove(observador)
+
+def _antes_execucao(conn, cursor, statement, parameters, context, executemany):
+    """Guarda o instante de início da consulta na conexão."""
+    conn.info.setdefault('instrumentacao_inicio', []).append(perf_counter())
+
+def _depois_execucao(conn, cursor, statement, parameters, context, executemany):
+    """Contabiliza a consulta no contexto da requisição atual."""
+    inicio = conn.info['instrumentacao_inicio'].pop()
+    contexto = getattr(_local, 'contexto', None)
+    if contexto is None:
+        return
+    
+    duracao = perf_counter() - inicio
+    contexto.consultas += 1
+    contexto.tempo_db += duracao
+    
+    for observador in _observadores_sql:
+        observador(contexto, conn, cursor, statement, parameters, duracao)
+
+def _erro_execucao(contexto_erro):
+    """Descarta o instante de início de uma consulta que falhou."""
+    conn = contexto_erro.connection
+    if conn is not None and conn.info.get('instrumentacao_inicio'):
+        conn.info['instrumentacao_inicio'].pop()
+
+def instalar_ouvintes_sql(engine):
+    """
+    Instala os ouvintes de execução de consultas em um engine.
+    
+    Args:
+        engine (Engine): Engine do SQLAlchemy a ser instrumentado
+    """
+    if not event.contains(engine, 'before_cursor_execute', _antes_execucao):
+        event.listen(engine, 'before_cursor_execute', _antes_execucao)
+        event.listen(engine, 'after_cursor_execute', _depois_execucao)
+        event.listen(engine, 'handle_error', _erro_execucao)
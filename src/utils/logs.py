@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Logs Estruturados
+
+Este arquivo configura os logs da aplicação a partir de LOG_LEVEL e
+LOG_FILE. Cada registro é gravado como uma linha JSON. A thread da
+requisição apenas coloca o registro em uma fila; a formatação e a
+escrita no console e no arquivo acontecem na thread do QueueListener.
+Se a fila encher, registros são descartados em vez de atrasar a
+requisição.
+
+Vários workers podem gravar o mesmo arquivo: ele é reaberto quando a
+rotação externa (logrotate) o move. A rotação por tamanho feita pela
+aplicação (LOG_ROTATE_BY_SIZE) só é segura com um único processo.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler, WatchedFileHandler
+
+# Logger raiz dos módulos do sistema (os demais são filhos: sistema_fila.acesso, ...)
+LOGGER_SISTEMA = 'sistema_fila'
+
+# Atributos padrão de um LogRecord, que não entram no JSON como campos extras
+_ATRIBUTOS_PADRAO = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+# Listener em execução (substituído se os logs forem reconfigurados)
+_listener = None
+
+class FormatadorJSON(logging.Formatter):
+    """
+    Formata cada registro como um objeto JSON em uma linha.
+    
+    Campos passados em `extra` (ex.: extra={'dados': {...}}) são incluídos;
+    o dicionário `dados` é mesclado no nível principal do objeto, sem
+    sobrescrever os campos padrão.
+    """
+
+    def format(self, record):
+        registro = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            'nivel': record.levelname,
+            'logger': record.name,
+            'mensagem': record.getMessage()
+        }
+        
+        for chave, valor in record.__dict__.items():
+            if chave in _ATRIBUTOS_PADRAO:
+                continue
+            if chave == 'dados' and isinstance(valor, dict):
+                for campo, conteudo in valor.items():
+                    registro.setdefault(campo, conteudo)
+            else:
+                registro[chave] = valor
+        
+        if record.exc_info:
+            registro['excecao'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            registro['excecao'] = record.exc_text
+        
+        return json.dumps(registro, ensure_ascii=False, default=str)
+
+class FilaLogHandler(QueueHandler):
+    """
+    QueueHandler que nunca bloqueia: com a fila cheia o registro é descartado.
+    
+    Atributos:
+        descartados (int): Registros descartados por falta de espaço
+    """
+
+    def __init__(self, fila):
+        super().__init__(fila)
+        self.descartados = 0
+
+    def prepare(self, record):
+        """
+        Resolve a mensagem antes de enfileirar, deixando o JSON para o listener.
+        
+        Diferente do QueueHandler padrão, não aplica um formatador aqui:
+        apenas junta a mensagem aos argumentos e converte a exceção em texto.
+        """
+        registro = copy.copy(record)
+        registro.msg = record.getMessage()
+        registro.args = None
+        if record.exc_info:
+            registro.exc_text = logging.Formatter().formatException(record.exc_info)
+            registro.exc_info = None
+        return registro
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+def configurar_logs(app):
+    """
+    Configura o pipeline de logs a partir das configurações da aplicação.
+    
+    Os registros do logger da aplicação (app.logger) e dos loggers
+    'sistema_fila.*' passam pela mesma fila.
+    
+    Args:
+        app (Flask): Instância da aplicação Flask
+    """
+    global _listener
+    
+    nivel = logging.getLevelName(str(app.config.get('LOG_LEVEL', 'INFO')).upper())
+    if not isinstance(nivel, int):
+        nivel = logging.INFO
+    
+    formatador = FormatadorJSON()
+    destinos = [logging.StreamHandler(sys.stderr)]
+    
+    arquivo = app.config.get('LOG_FILE')
+    if arquivo and app.config.get('LOG_ROTATE_BY_SIZE'):
+        destinos.append(RotatingFileHandler(
+            arquivo,
+            maxBytes=app.config.get('LOG_MAX_BYTES', 10 * 1024 * 1024),
+            backupCount=app.config.get('LOG_BACKUP_COUNT', 5),
+            encoding='utf-8',
+            delay=True
+        ))
+    elif arquivo:
+        destinos.append(WatchedFileHandler(arquivo, encoding='utf-8', delay=True))
+    
+    for destino in destinos:
+        destino.setFormatter(formatador)
+    
+    if _listener is not None:
+        _listener.stop()
+        for destino in _listener.handlers:
+            destino.close()
+    
+    fila = queue.Queue(maxsize=app.config.get('LOG_QUEUE_SIZE', 10000))
+    handler = FilaLogHandler(fila)
+    _listener = QueueListener(fila, *destinos, respect_handler_level=True)
+    _listener.start()
+    
+    for nome in (LOGGER_SISTEMA, app.logger.name):
+        logger = logging.getLogger(nome)
+        for antigo in list(logger.handlers):
+            logger.removeHandler(antigo)
+        logger.addHandler(handler)
+        logger.setLevel(nivel)
+        logger.propagate = False
+
+def encerrar_logs():
+    """Esvazia a fila e interrompe o listener (chamado ao finalizar o processo)."""
+    global _listener
+    
+    if _listener is not None:
+        _listener.stop()
+        for destino in _listener.handlers:
+            destino.close()
+        _listener = None
+
+atexit.register(encerrar_logs)
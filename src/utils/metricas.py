@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Coletor de Métricas por Endpoint
+
+Este arquivo mantém histogramas de latência e de tempo de banco
+por rota, além da contagem de consultas SQL, e exporta tudo no
+formato de texto do Prometheus.
+
+A coleta usa travas segmentadas (uma por fatia de threads), de forma
+que requisições simultâneas raramente disputam a mesma trava e o custo
+por requisição fica na casa de poucos microssegundos.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import itertools
+import threading
+from bisect import bisect_left
+
+# Limites padrão dos buckets dos histogramas, em segundos
+BUCKETS_PADRAO = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Quantidade de segmentos independentes do coletor
+TOTAL_SEGMENTOS = 16
+
+class _Serie:
+    """
+    Valores acumulados de uma combinação (método, rota).
+    
+    Os histogramas guardam a contagem de cada bucket individualmente;
+    os valores cumulativos exigidos pelo Prometheus são calculados
+    apenas na exportação.
+    """
+    
+    __slots__ = ('buckets_requisicao', 'soma_requisicao',
+                 'buckets_db', 'soma_db', 'consultas')
+
+    def __init__(self, total_buckets):
+        self.buckets_requisicao = [0] * (total_buckets + 1)
+        self.soma_requisicao = 0.0
+        self.buckets_db = [0] * (total_buckets + 1)
+        self.soma_db = 0.0
+        self.consultas = 0
+
+class _Segmento:
+    """Conjunto de séries protegido por uma trava própria."""
+    
+    __slots__ = ('trava', 'series')
+
+    def __init__(self):
+        self.trava = threading.Lock()
+        self.series = {}
+
+class ColetorMetricas:
+    """
+    Coletor de métricas de requisições HTTP e consultas SQL.
+    
+    Cada thread grava sempre no mesmo segmento, atribuído em rodízio na
+    sua primeira medição; a leitura (exportação) soma todos os segmentos.
+    """
+
+    def __init__(self, buckets=BUCKETS_PADRAO):
+        self.buckets = tuple(sorted(buckets))
+        self._segmentos = [_Segmento() for _ in range(TOTAL_SEGMENTOS)]
+        # O identificador da thread não serve de índice: no glibc é o
+        # endereço da pilha, múltiplo de potências de 2 (todas as threads
+        # cairiam no mesmo segmento)
+        self._proximo_segmento = itertools.count()
+        self._local = threading.local()
+
+    def configurar_buckets(self, buckets):
+        """
+        Redefine os limites dos histogramas, descartando o que foi coletado.
+        
+        Args:
+            buckets (iterable): Limites superiores em segundos
+        """
+        self.buckets = tuple(sorted(buckets))
+        self.limpar()
+
+    def limpar(self):
+        """Descarta todas as medições acumuladas."""
+        for segmento in self._segmentos:
+            with segmento.trava:
+                segmento.series = {}
+
+    def registrar(self, metodo, rota, duracao, tempo_db, consultas):
+        """
+        Registra as medições de uma requisição concluída.
+        
+        Args:
+            metodo (str): Método HTTP
+            rota (str): Regra da rota (ex.: /api/barbeiros/<int:barbeiro_id>)
+            duracao (float): Duração total em segundos
+            tempo_db (float): Tempo gasto no banco em segundos
+            consultas (int): Quantidade de consultas SQL executadas
+        """
+        buckets = self.buckets
+        indice_requisicao = bisect_left(buckets, duracao)
+        indice_db = bisect_left(buckets, tempo_db)
+        segmento = getattr(self._local, 'segmento', None)
+        if segmento is None:
+            segmento = self._local.segmento = self._segmentos[next(self._proximo_segmento) % TOTAL_SEGMENTOS]
+        
+        with segmento.trava:
+            serie = segmento.series.get((metodo, rota))
+            if serie is None:
+                serie = segmento.series[(metodo, rota)] = _Serie(len(buckets))
+            serie.buckets_requisicao[indice_requisicao] += 1
+            serie.soma_requisicao += duracao
+            serie.buckets_db[indice_db] += 1
+            serie.soma_db += tempo_db
+            serie.consultas += consultas
+
+    def _consolidar(self):
+        """
+        Soma as séries de todos os segmentos.
+        
+        Returns:
+            dict: Séries consolidadas por (método, rota)
+        """
+        consolidado = {}
+        total_buckets = len(self.buckets)
+        
+        for segmento in self._segmentos:
+            with segmento.trava:
+                series = list(segmento.series.items())
+                copias = [(chave, list(s.buckets_requisicao), s.soma_requisicao,
+                           list(s.buckets_db), s.soma_db, s.consultas)
+                          for chave, s in series]
+            
+            for chave, b_req, s_req, b_db, s_db, consultas in copias:
+                total = consolidado.get(chave)
+                if total is None:
+                    total = consolidado[chave] = _Serie(total_buckets)
+                for i, valor in enumerate(b_req):
+                    total.buckets_requisicao[i] += valor
+                for i, valor in enumerate(b_db):
+                    total.buckets_db[i] += valor
+                total.soma_requisicao += s_req
+                total.soma_db += s_db
+                total.consultas += consultas
+        
+        return consolidado
+
+    def exportar_prometheus(self):
+        """
+        Gera o texto de exposição no formato do Prometheus.
+        
+        Returns:
+            str: Métricas em formato texto (versão 0.0.4)
+        """
+        series = sorted(self._consolidar().items())
+        linhas = []
+
+        def histograma(nome, descricao, obter_buckets, obter_soma):
+            linhas.append(f'# HELP {nome} {descricao}')
+            linhas.append(f'# TYPE {nome} histogram')
+            for (metodo, rota), serie in series:
+                rotulos = f'metodo="{metodo}",rota="{_escapar(rota)}"'
+                acumulado = 0
+                contagens = obter_buckets(serie)
+                for limite, valor in zip(self.buckets, contagens):
+                    acumulado += valor
+                    linhas.append(f'{nome}_bucket{{{rotulos},le="{limite}"}} {acumulado}')
+                acumulado += contagens[-1]
+                linhas.append(f'{nome}_bucket{{{rotulos},le="+Inf"}} {acumulado}')
+                linhas.append(f'{nome}_sum{{{rotulos}}} {obter_soma(serie):.6f}')
+                linhas.append(f'{nome}_count{{{rotulos}}} {acumulado}')
+        
+        histograma('fila_http_requisicao_segundos',
+                   'Duracao das requisicoes HTTP por rota.',
+                   lambda s: s.buckets_requisicao, lambda s: s.soma_requisicao)
+        histograma('fila_sql_tempo_requisicao_segundos',
+                   'Tempo gasto no banco de dados por requisicao.',
+                   lambda s: s.buckets_db, lambda s: s.soma_db)
+        
+        linhas.append('# HELP fila_sql_consultas_total Consultas SQL executadas por rota.')
+        linhas.append('# TYPE fila_sql_consultas_total counter')
+        for (metodo, rota), serie in series:
+            linhas.append(
+                f'fila_sql_consultas_total{{metodo="{metodo}",rota="{_escapar(rota)}"}} {serie.consultas}'
+            )
+        
+        return '\n'.join(linhas) + '\n'
+
+def _escapar(valor):
+    """
+    Escapa um valor de rótulo segundo o formato do Prometheus.
+    
+    Args:
+        valor (str): Valor original
+    
+    Returns:
+        str: Valor escapado
+    """
+    return valor.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def formatar_server_timing(duracao, tempo_db, consultas):
+    """
+    Monta o valor do cabeçalho Server-Timing de uma resposta.
+    
+    Args:
+        duracao (float): Duração total em segundos
+        tempo_db (float): Tempo gasto no banco em segundos
+        consultas (int): Quantidade de consultas SQL
+    
+    Returns:
+        str: Valor do cabeçalho
+    """
+    return (f'app;dur={duracao * 1000:.2f}, '
+            f'db;dur={tempo_db * 1000:.2f};desc="{consultas} consultas"')
+
+# Instância única do coletor, compartilhada pela aplicação
+metricas = ColetorMetricas()
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Orçamento de Consultas e Detecção de N+1
+
+Este arquivo implementa uma guarda usada em desenvolvimento e testes.
+Cada consulta executada durante a requisição é reduzida a uma
+impressão digital (SQL normalizado, sem valores). Ao final da requisição
+a guarda verifica:
+
+- se o total de consultas ultrapassou o orçamento declarado na rota;
+- se a mesma consulta se repetiu muitas vezes variando apenas os
+  parâmetros (padrão típico de N+1).
+
+Em testes a violação gera uma exceção; em desenvolvimento, um aviso no log.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import re
+from functools import lru_cache
+
+# Expressões usadas na normalização do SQL
+_RE_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMERO = re.compile(r'\b\d+(?:\.\d+)?\b')
+_RE_LISTA_IN = re.compile(r'\bIN\s*\((?:\s*(?:\?|%\(\w+\)s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)', re.IGNORECASE)
+_RE_ESPACOS = re.compile(r'\s+')
+
+class OrcamentoConsultasExcedido(AssertionError):
+    """Violação do orçamento de consultas de uma rota."""
+
+def orcamento_consultas(maximo, repeticoes=None):
+    """
+    Decorador que declara o número máximo de consultas de uma rota.
+    
+    Deve ser aplicado abaixo do decorador de rota:
+
+        @cliente_bp.route('/fila', methods=['GET'])
+        @orcamento_consultas(3)
+        def obter_fila_completa():
+            ...
+    
+    Args:
+        maximo (int): Quantidade máxima de consultas SQL permitidas
+            (None: sem limite, para rotas de carga em massa)
+        repeticoes (int): Repetições permitidas da mesma consulta, para
+            rotas que processam um lote de tamanho limitado (padrão:
+            QUERY_REPEAT_LIMIT; 0 desativa a detecção de N+1)
+    """
+    def decorador(funcao):
+        funcao.orcamento_consultas = maximo
+        if repeticoes is not None:
+            funcao.limite_repeticoes = repeticoes
+        return funcao
+    return decorador
+
+@lru_cache(maxsize=2048)
+def normalizar_sql(sql):
+    """
+    Reduz uma instrução SQL à sua impressão digital.
+    
+    Valores literais viram '?', listas de IN são colapsadas e os
+    espaços são normalizados, de forma que consultas que diferem
+    apenas nos parâmetros produzem a mesma impressão.
+    
+    Args:
+        sql (str): Instrução SQL original
+    
+    Returns:
+        str: SQL normalizado
+    """
+    normalizado = _RE_TEXTO.sub('?', sql)
+    normalizado = _RE_NUMERO.sub('?', normalizado)
+    normalizado = _RE_LISTA_IN.sub('IN (?)', normalizado)
+    return _RE_ESPACOS.sub(' ', normalizado).strip()
+
+def observar_consulta(contexto, conn, cursor, statement, parameters, duracao):
+    """
+    Observador SQL que conta as impressões digitais da requisição.
+    
+    Args:
+        contexto (ContextoRequisicao): Contexto da requisição atual
+        statement (str): Instrução SQL executada
+    """
+    impressoes = contexto.dados.get('impressoes')
+    if impressoes is None:
+        impressoes = contexto.dados['impressoes'] = {}
+    
+    impressao = normalizar_sql(statement)
+    impressoes[impressao] = impressoes.get(impressao, 0) + 1
+
+def verificar_orcamento(contexto, view, orcamento_padrao, limite_repeticoes):
+    """
+    Verifica se a requisição respeitou o orçamento de consultas.
+    
+    Args:
+        contexto (ContextoRequisicao): Contexto da requisição concluída
+        view (callable): Função da rota atendida (pode ser None)
+        orcamento_padrao (int): Orçamento usado quando a rota não declara um
+        limite_repeticoes (int): Repetições a partir das quais se suspeita de N+1
+    
+    Returns:
+        list: Descrição de cada violação encontrada (vazia se tudo certo)
+    """
+    violacoes = []
+    orcamento = getattr(view, 'orcamento_consultas', orcamento_padrao)
+    limite_repeticoes = getattr(view, 'limite_repeticoes', limite_repeticoes)
+    
+    if orcamento is not None and contexto.consultas > orcamento:
+        violacoes.append(
+            f'{contexto.consultas} consultas executadas (orçamento: {orcamento})'
+        )
+    
+    for impressao, repeticoes in contexto.dados.get('impressoes', {}).items():
+        if limite_repeticoes and repeticoes >= limite_repeticoes:
+            violacoes.append(
+                f'possível N+1: consulta repetida {repeticoes}x: {impressao[:200]}'
+            )
+    
+    return violacoes
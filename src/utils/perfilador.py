@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Perfilador de Requisições Sob Demanda
+
+Este arquivo permite perfilar uma única requisição em produção ou
+homologação, sem reiniciar o servidor. Quando PROFILING_ENABLED está
+ativo, uma requisição que traz o header X-Profile com o segredo
+configurado é executada sob o cProfile; ao final, as funções mais
+custosas e a linha do tempo das consultas SQL ficam disponíveis em
+/api/debug/profiles/<id>.
+
+Com o perfilador desativado nenhum hook é registrado.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import cProfile
+import hmac
+import pstats
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime
+from time import perf_counter
+
+from src.utils.orcamento_consultas import normalizar_sql
+
+def segredo_confere(recebido, esperado):
+    """
+    Compara o segredo recebido com o configurado em tempo constante.
+    
+    Args:
+        recebido (str): Valor enviado no header
+        esperado (str): Segredo configurado (vazio desativa o acesso)
+    
+    Returns:
+        bool: True se o segredo confere
+    """
+    if not recebido or not esperado:
+        return False
+    return hmac.compare_digest(recebido.encode('utf-8'), esperado.encode('utf-8'))
+
+def _nome_funcao(chave):
+    """Formata a chave (arquivo, linha, função) do pstats."""
+    arquivo, linha, funcao = chave
+    if arquivo == '~':
+        return funcao  # funções nativas, ex.: <built-in method time.sleep>
+    return f'{arquivo}:{linha}({funcao})'
+
+class PerfilRequisicao:
+    """
+    Perfil em andamento de uma requisição.
+    
+    Atributos:
+        id (str): Identificador do perfil
+        perfil (cProfile.Profile): Perfilador ativo na thread da requisição
+        inicio (float): Instante de início (perf_counter)
+        consultas (list): Linha do tempo das consultas SQL
+    """
+    
+    __slots__ = ('id', 'perfil', 'inicio', 'consultas')
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:16]
+        self.perfil = cProfile.Profile()
+        self.inicio = perf_counter()
+        self.consultas = []
+
+class Perfilador:
+    """
+    Inicia, encerra e guarda os perfis das requisições.
+    
+    Apenas um perfil roda por vez: o cProfile atua na thread que o
+    ativou, e perfis simultâneos distorceriam os tempos um do outro.
+    
+    Atributos:
+        top_n (int): Quantidade de funções mais custosas guardadas
+        perfis (OrderedDict): Perfis concluídos, do mais antigo ao mais novo
+    """
+
+    def __init__(self, top_n=30, maximo_perfis=50):
+        self.top_n = top_n
+        self.maximo_perfis = maximo_perfis
+        self.perfis = OrderedDict()
+        self.trava = threading.Lock()
+        self._em_execucao = threading.Lock()
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.top_n = app.config.get('PROFILING_TOP_N', 30)
+        self.maximo_perfis = app.config.get('PROFILING_MAX_PROFILES', 50)
+
+    def iniciar(self):
+        """
+        Começa a perfilar a requisição atual.
+        
+        Returns:
+            PerfilRequisicao: Perfil iniciado, ou None se outro já estiver rodando
+        """
+        if not self._em_execucao.acquire(blocking=False):
+            return None
+        
+        perfil = PerfilRequisicao()
+        perfil.perfil.enable()
+        return perfil
+
+    def observar(self, contexto, conn, cursor, statement, parameters, duracao):
+        """Observador SQL: adiciona a consulta à linha do tempo do perfil ativo."""
+        perfil = contexto.dados.get('perfil')
+        if perfil is None:
+            return
+        
+        fim = perf_counter() - perfil.inicio
+        perfil.consultas.append({
+            'inicio_ms': round((fim - duracao) * 1000, 3),
+            'duracao_ms': round(duracao * 1000, 3),
+            'sql': normalizar_sql(statement)
+        })
+
+    def encerrar(self, perfil, metodo, rota, status):
+        """
+        Encerra o perfil, agrega por função e guarda o resultado.
+        
+        Args:
+            perfil (PerfilRequisicao): Perfil iniciado por iniciar()
+            metodo (str): Método HTTP da requisição
+            rota (str): Regra da rota (ou caminho, se não houver regra)
+            status (int): Status HTTP da resposta
+        
+        Returns:
+            dict: Resultado guardado
+        """
+        perfil.perfil.disable()
+        duracao = perf_counter() - perfil.inicio
+        self._em_execucao.release()
+        
+        estatisticas = pstats.Stats(perfil.perfil)
+        linhas = sorted(estatisticas.stats.items(), key=lambda item: item[1][3], reverse=True)
+        
+        funcoes = []
+        for chave, (chamadas_primitivas, chamadas, proprio, acumulado, _) in linhas[:self.top_n]:
+            funcoes.append({
+                'funcao': _nome_funcao(chave),
+                'chamadas': chamadas,
+                'chamadas_primitivas': chamadas_primitivas,
+                'tempo_proprio_ms': round(proprio * 1000, 3),
+                'tempo_acumulado_ms': round(acumulado * 1000, 3)
+            })
+        
+        resultado = {
+            'id': perfil.id,
+            'criado_em': datetime.utcnow().isoformat(),
+            'requisicao': f'{metodo} {rota}',
+            'status_resposta': status,
+            'duracao_ms': round(duracao * 1000, 3),
+            'total_consultas': len(perfil.consultas),
+            'tempo_db_ms': round(sum(c['duracao_ms'] for c in perfil.consultas), 3),
+            'funcoes': funcoes,
+            'consultas': perfil.consultas
+        }
+        
+        with self.trava:
+            self.perfis[perfil.id] = resultado
+            while len(self.perfis) > self.maximo_perfis:
+                self.perfis.popitem(last=False)
+        
+        return resultado
+
+    def descartar(self, perfil):
+        """Interrompe um perfil sem guardar o resultado (requisição com erro)."""
+        perfil.perfil.disable()
+        self._em_execucao.release()
+
+    def obter(self, perfil_id):
+        """
+        Args:
+            perfil_id (str): Identificador do perfil
+        
+        Returns:
+            dict: Perfil guardado ou None
+        """
+        with self.trava:
+            return self.perfis.get(perfil_id)
+
+    def listar(self):
+        """
+        Returns:
+            list: Resumo dos perfis guardados, do mais recente ao mais antigo
+        """
+        with self.trava:
+            perfis = list(self.perfis.values())[::-1]
+        
+        return [{
+            'id': p['id'],
+            'criado_em': p['criado_em'],
+            'requisicao': p['requisicao'],
+            'duracao_ms': p['duracao_ms'],
+            'total_consultas': p['total_consultas']
+        } for p in perfis]
+
+# Instância única do perfilador, compartilhada pela aplicação
+perfilador = Perfilador()
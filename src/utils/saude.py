@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Utilitários: Verificação de Prontidão do Banco de Dados
+
+Este arquivo contém a verificação usada por /readyz: um SELECT 1 e a
+confirmação de que o banco aceita escrita. O resultado fica em cache
+por READINESS_CACHE_SECONDS e apenas uma verificação roda por vez no
+processo, de modo que sondas frequentes do orquestrador não geram
+carga no banco. Nenhuma das verificações escreve ou trava tabelas.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import text
+
+# Nome exibido de cada dialeto do SQLAlchemy
+NOMES_BANCOS = {
+    'sqlite': 'SQLite',
+    'postgresql': 'PostgreSQL',
+    'mysql': 'MySQL',
+    'mariadb': 'MariaDB',
+    'mssql': 'SQL Server',
+    'oracle': 'Oracle'
+}
+
+def nome_banco(engine):
+    """
+    Args:
+        engine (Engine): Engine do SQLAlchemy
+    
+    Returns:
+        str: Nome legível do banco de dados configurado
+    """
+    nome = engine.dialect.name
+    return NOMES_BANCOS.get(nome, nome)
+
+def _verificar_escrita(engine, conexao):
+    """
+    Verifica se o banco aceita escrita, sem escrever nada.
+    
+    Args:
+        engine (Engine): Engine do SQLAlchemy
+        conexao (Connection): Conexão já aberta
+    
+    Returns:
+        bool: True se aceita escrita; None se não há como verificar
+    """
+    dialeto = engine.dialect.name
+    
+    if dialeto == 'sqlite':
+        caminho = engine.url.database
+        if not caminho or caminho == ':memory:':
+            return True
+        # O SQLite também precisa criar o journal no diretório do arquivo
+        diretorio = os.path.dirname(os.path.abspath(caminho))
+        return os.access(caminho, os.W_OK) and os.access(diretorio, os.W_OK)
+    
+    if dialeto == 'postgresql':
+        return conexao.execute(text('SHOW transaction_read_only')).scalar() == 'off'
+    
+    if dialeto in ('mysql', 'mariadb'):
+        return not conexao.execute(text('SELECT @@global.read_only')).scalar()
+    
+    return None
+
+class VerificadorProntidao:
+    """
+    Verifica a prontidão do banco com cache e uma verificação por vez.
+    
+    Atributos:
+        validade (float): Segundos em que um resultado é reaproveitado
+        tempo_limite (float): Segundos até a verificação ser considerada falha
+        resultado (dict): Último resultado obtido
+    """
+
+    def __init__(self, validade=5.0, tempo_limite=2.0):
+        self.validade = validade
+        self.tempo_limite = tempo_limite
+        self.resultado = None
+        self._obtido_em = 0.0
+        self._verificando = threading.Lock()
+        self._thread = None
+
+    def configurar(self, app):
+        """
+        Aplica as configurações da aplicação.
+        
+        Args:
+            app (Flask): Instância da aplicação Flask
+        """
+        self.validade = app.config.get('READINESS_CACHE_SECONDS', 5)
+        self.tempo_limite = app.config.get('READINESS_TIMEOUT_SECONDS', 2)
+
+    def _executar(self, engine, saida):
+        """Executa as verificações (em thread separada, para respeitar o tempo limite)."""
+        try:
+            with engine.connect() as conexao:
+                conexao.execute(text('SELECT 1'))
+                saida['escrita'] = _verificar_escrita(engine, conexao)
+            saida['conectado'] = True
+        except Exception as e:
+            saida['conectado'] = False
+            saida['erro'] = str(e)
+
+    def _verificar(self, engine):
+        """
+        Executa uma verificação respeitando o tempo limite.
+        
+        Returns:
+            dict: Resultado da verificação
+        """
+        inicio = time.perf_counter()
+        saida = {}
+        
+        if self._thread is not None and self._thread.is_alive():
+            # A verificação anterior ainda está presa no banco: não abre outra conexão
+            thread = self._thread
+        else:
+            thread = threading.Thread(target=self._executar, args=(engine, saida), daemon=True)
+            thread.start()
+            self._thread = thread
+        thread.join(self.tempo_limite)
+        
+        if thread.is_alive():
+            saida = {'conectado': False, 'erro': f'tempo limite de {self.tempo_limite}s excedido'}
+        
+        conectado = saida.get('conectado', False)
+        escrita = saida.get('escrita')
+        resultado = {
+            'pronto': conectado and escrita is not False,
+            'conectado': conectado,
+            'escrita': escrita,
+            'tipo': nome_banco(engine),
+            'duracao_ms': round((time.perf_counter() - inicio) * 1000, 3),
+            'verificado_em': datetime.utcnow().isoformat()
+        }
+        if 'erro' in saida:
+            resultado['erro'] = saida['erro']
+        elif escrita is False:
+            resultado['erro'] = 'banco de dados somente leitura'
+        return resultado
+
+    def verificar(self, engine):
+        """
+        Retorna o resultado em cache ou faz uma nova verificação.
+        
+        Se outra thread já estiver verificando, o último resultado é
+        devolvido em vez de abrir mais uma conexão.
+        
+        Args:
+            engine (Engine): Engine do SQLAlchemy
+        
+        Returns:
+            dict: Resultado da verificação (com 'em_cache')
+        """
+        resultado = self.resultado
+        if resultado is not None and time.monotonic() - self._obtido_em < self.validade:
+            return {**resultado, 'em_cache': True}
+        
+        if not self._verificando.acquire(blocking=resultado is None):
+            return {**resultado, 'em_cache': True}
+        
+        try:
+            # Outra thread pode ter verificado enquanto esta aguardava a trava
+            if self.resultado is not None and time.monotonic() - self._obtido_em < self.validade:
+                return {**self.resultado, 'em_cache': True}
+            
+            resultado = self._verificar(engine)
+            self.resultado = resultado
+            self._obtido_em = time.monotonic()
+            return {**resultado, 'em_cache': False}
+        finally:
+            self._verificando.release()
+
+# Instância única do verificador, compartilhada pela aplicação
+verificador_prontidao = VerificadorProntidao()
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Testes: Configuração Compartilhada
+
+Cada teste recebe uma aplicação própria (configuração de testes) com
+um banco SQLite em arquivo temporário, para que conexões diferentes
+(ex.: importação e requisições da API) se comportem como em produção.
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import os
+
+os.environ['FLASK_ENV'] = 'testing'
+
+import pytest
+from src.config import TestingConfig
+from src.main import criar_aplicacao
+from src.models.user import db
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    """Aplicação com banco SQLite em arquivo temporário."""
+    monkeypatch.setattr(TestingConfig, 'SQLALCHEMY_DATABASE_URI', f'sqlite:///{tmp_path / "teste.db"}')
+    aplicacao = criar_aplicacao()
+    yield aplicacao
+    with aplicacao.app_context():
+        db.session.remove()
+        db.engine.dispose()
+
+@pytest.fixture
+def cliente_http(app):
+    """Cliente HTTP de testes da aplicação."""
+    return app.test_client()
@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Testes: Importação de Histórico
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import io
+import json
+
+from src.models.user import db
+from src.models.atendimento import Atendimento
+from src.models.barbeiro import Barbeiro
+from src.models.cliente import ClienteArquivado
+from src.services.historico import InseridorHistorico
+from src.services.importacao import CABECALHO_CSV, ImportadorAtendimentos
+
+def _csv_atendimentos(quantidade, nome_barbeiro):
+    """CSV no layout da exportação com `quantidade` atendimentos concluídos."""
+    linhas = [','.join(CABECALHO_CSV)]
+    for i in range(quantidade):
+        linhas.append(f'{i + 1},{i + 1},Importado {i},,{nome_barbeiro},'
+                      f'01/03/2024 09:{i:02d}:00,01/03/2024 09:{i + 1:02d}:00,01/03/2024 10:{i:02d}:00,1,59,60')
+    return '\n'.join(linhas) + '\n'
+
+def test_cliente_cadastrado_durante_importacao_recebe_id_novo(app, cliente_http):
+    """Um cliente cadastrado entre as transações da importação não reutiliza IDs importados."""
+    with app.app_context():
+        barbeiro = Barbeiro.query.first()
+        barbeiro_id, nome_barbeiro = barbeiro.id, barbeiro.nome
+    
+    cadastrados = []
+    
+    def cadastrar_cliente(inseridor):
+        resposta = cliente_http.post('/api/clientes', json={
+            'nome': f'Cliente Presencial {len(cadastrados)}',
+            'barbeiro_id': barbeiro_id,
+            'numero_ficha': 900 + len(cadastrados)
+        })
+        assert resposta.status_code == 201
+        cadastrados.append(resposta.get_json()['cliente']['id'])
+    
+    with app.app_context():
+        with db.engine.connect() as conexao:
+            inseridor = InseridorHistorico(conexao, tamanho_lote=2, linhas_por_transacao=2,
+                                           ao_confirmar=cadastrar_cliente)
+            importador = ImportadorAtendimentos(inseridor)
+            importador.importar(io.StringIO(_csv_atendimentos(6, nome_barbeiro)), 'csv')
+    
+    assert importador.importadas == 6
+    assert len(cadastrados) > 1
+    
+    with app.app_context():
+        importados = {cliente_id for (cliente_id,) in db.session.query(Atendimento.cliente_id)}
+        arquivados = {cliente_id for (cliente_id,) in db.session.query(ClienteArquivado.id)}
+    assert len(importados) == 6
+    assert importados == arquivados
+    assert not importados & set(cadastrados)
+    
+    for cliente_id in cadastrados:
+        assert cliente_http.post(f'/api/barbeiros/{barbeiro_id}/proximo').status_code == 200
+        resposta = cliente_http.put(f'/api/clientes/{cliente_id}/concluir')
+        assert resposta.status_code == 200, resposta.get_json()
+
+def _ndjson_atendimento(numero, **campos):
+    """Linha NDJSON de um atendimento concluído, com campos substituídos por `campos`."""
+    linha = {
+        'numero_ficha': numero,
+        'nome_cliente': f'Importado {numero}',
+        'barbeiro_id': 1,
+        'data_entrada': '2024-03-01T09:00:00',
+        'data_inicio': '2024-03-01T09:10:00',
+        'data_fim': '2024-03-01T09:40:00'
+    }
+    linha.update(campos)
+    return json.dumps(linha)
+
+def test_importacao_rejeita_linhas_invalidas_sem_interromper(cliente_http):
+    """Linhas com tipos inesperados são rejeitadas uma a uma; as válidas são gravadas."""
+    linhas = [
+        _ndjson_atendimento(1),
+        _ndjson_atendimento(2, nome_cliente=5),
+        _ndjson_atendimento(3, barbeiro=7),
+        _ndjson_atendimento(4, nome_cliente=['lista']),
+        _ndjson_atendimento(5, barbeiro={'nome': 'x'}),
+        _ndjson_atendimento(6, numero_ficha=True),
+        _ndjson_atendimento(7, data_inicio=20240301),
+        '[1, 2]',
+        _ndjson_atendimento(8)
+    ]
+    
+    resposta = cliente_http.post('/api/atendimentos/importar?formato=ndjson&criar_barbeiros=false',
+                                 data='\n'.join(linhas), content_type='application/x-ndjson')
+    
+    dados = resposta.get_json()
+    assert resposta.status_code == 200, dados
+    assert dados['importadas'] == 3
+    assert dados['rejeitadas'] == 6
+    assert [erro['linha'] for erro in dados['erros']] == [3, 4, 5, 6, 7, 8]
+
+def test_importacao_fora_do_utf8_informa_linhas_gravadas(app, cliente_http):
+    """Texto fora do UTF-8 responde 400 e informa os atendimentos já confirmados."""
+    app.config['IMPORT_BATCH_SIZE'] = 10
+    app.config['IMPORT_ROWS_PER_TRANSACTION'] = 10
+    corpo = '\n'.join(_ndjson_atendimento(numero) for numero in range(1, 201)).encode() + b'\n\xff\xfe\n'
+    
+    resposta = cliente_http.post('/api/atendimentos/importar?formato=ndjson',
+                                 data=corpo, content_type='application/x-ndjson')
+    
+    dados = resposta.get_json()
+    assert resposta.status_code == 400, dados
+    assert 'UTF-8' in dados['erro']
+    assert dados['importadas'] > 0
+    with app.app_context():
+        assert Atendimento.query.count() == dados['importadas']
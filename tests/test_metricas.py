@@ -0,0 +1,30 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Testes: Coletor de Métricas
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+import threading
+
+from src.utils.metricas import TOTAL_SEGMENTOS, ColetorMetricas
+
+def test_threads_gravam_em_segmentos_diferentes():
+    """Threads simultâneas são distribuídas entre todos os segmentos."""
+    coletor = ColetorMetricas()
+    barreira = threading.Barrier(TOTAL_SEGMENTOS)
+    
+    def registrar():
+        barreira.wait()
+        coletor.registrar('GET', '/api/fila', 0.002, 0.001, 1)
+    
+    threads = [threading.Thread(target=registrar) for _ in range(TOTAL_SEGMENTOS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    assert all(segmento.series for segmento in coletor._segmentos)
+    assert sum(serie.consultas for segmento in coletor._segmentos for serie in segmento.series.values()) == TOTAL_SEGMENTOS
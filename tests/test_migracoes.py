@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Testes: Migrações do Banco de Dados
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import inspect, text, update
+from src.models.user import db
+from src.models.atendimento import Atendimento
+from src.models.migracoes import preencher_periodo_atendimentos
+
+def test_periodo_preenchido_no_fuso_da_barbearia(app):
+    """Inserção e preenchimento da migração usam o dia e a hora locais."""
+    app.config['SHOP_TIMEZONE'] = 'America/Sao_Paulo'
+    with app.app_context():
+        # Sexta-feira, 22h30 em São Paulo (sábado, 01h30 em UTC)
+        entrada = datetime(2024, 3, 9, 1, 30)
+        db.session.add(Atendimento(cliente_id=1, barbeiro_id=1, numero_ficha=1, nome_cliente='Cliente',
+                                   data_entrada=entrada, data_inicio=entrada + timedelta(minutes=5)))
+        db.session.commit()
+        
+        esperado = [(date(2024, 3, 8), 4, 22)]
+        assert db.session.query(Atendimento.dia, Atendimento.dia_semana, Atendimento.hora).all() == esperado
+        
+        db.session.execute(update(Atendimento).values(dia=None, dia_semana=None, hora=None))
+        db.session.commit()
+        assert preencher_periodo_atendimentos(db.engine)
+        assert db.session.query(Atendimento.dia, Atendimento.dia_semana, Atendimento.hora).all() == esperado
+
+def test_comando_preenche_periodos_e_cria_indices(app):
+    """O comando preencher-periodos completa o histórico e os índices que a inicialização deixa de fora."""
+    with app.app_context():
+        entrada = datetime(2024, 3, 9, 15, 0)
+        db.session.add(Atendimento(cliente_id=1, barbeiro_id=1, numero_ficha=1, nome_cliente='Cliente',
+                                   data_entrada=entrada, data_inicio=entrada + timedelta(minutes=5)))
+        db.session.commit()
+        db.session.execute(update(Atendimento).values(dia=None, dia_semana=None, hora=None))
+        db.session.execute(text('DROP INDEX ix_atendimentos_periodo'))
+        db.session.commit()
+    
+    resultado = app.test_cli_runner().invoke(args=['preencher-periodos'])
+    
+    assert resultado.exit_code == 0, resultado.output
+    assert '✓ 1 atendimentos preenchidos' in resultado.output
+    with app.app_context():
+        assert db.session.query(Atendimento.dia, Atendimento.hora).all() == [(date(2024, 3, 9), 12)]
+        assert 'ix_atendimentos_periodo' in {indice['name'] for indice in inspect(db.engine).get_indexes('atendimentos')}
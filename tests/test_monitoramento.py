@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Testes: Rotas de Monitoramento
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+def test_consultas_lentas_exigem_segredo(app, cliente_http):
+    """Sem o segredo configurado e enviado, as rotas de consultas lentas não respondem."""
+    assert cliente_http.get('/api/debug/slow-queries').status_code == 404
+    assert cliente_http.delete('/api/debug/slow-queries').status_code == 404
+    
+    app.config['SLOW_QUERY_SECRET'] = 'segredo'
+    assert cliente_http.get('/api/debug/slow-queries').status_code == 403
+    assert cliente_http.delete('/api/debug/slow-queries',
+                               headers={'X-Debug-Secret': 'outro'}).status_code == 403
+    assert cliente_http.get('/api/debug/slow-queries',
+                            headers={'X-Debug-Secret': 'segredo'}).status_code == 200
+    assert cliente_http.delete('/api/debug/slow-queries',
+                               headers={'X-Debug-Secret': 'segredo'}).status_code == 200
+    
+    app.config['SLOW_QUERY_LOG_ENABLED'] = False
+    assert cliente_http.delete('/api/debug/slow-queries',
+                               headers={'X-Debug-Secret': 'segredo'}).status_code == 404
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""
+Sistema de Fila Digital para Barbearia
+Testes: Relatórios sobre o Histórico
+
+ATENÇÃO: Este código é propriedade intelectual protegida.
+Uso não autorizado é proibido por lei.
+"""
+
+from datetime import datetime
+
+from src.models.user import db
+from src.models.atendimento import Atendimento
+
+def _gravar_atendimento(barbeiro_id, entrada, inicio, fim):
+    """Grava um atendimento concluído (datas em UTC sem fuso)."""
+    db.session.add(Atendimento(cliente_id=1, barbeiro_id=barbeiro_id, numero_ficha=1, nome_cliente='Cliente',
+                               data_entrada=entrada, data_inicio=inicio, data_fim=fim,
+                               tempo_espera=int((inicio - entrada).total_seconds() // 60),
+                               tempo_atendimento=int((fim - inicio).total_seconds() // 60)))
+    db.session.commit()
+
+def test_utilizacao_usa_horario_local_da_barbearia(app, cliente_http):
+    """O horário de funcionamento e o pico são do fuso da barbearia, não de UTC."""
+    app.config['SHOP_TIMEZONE'] = 'America/Sao_Paulo'
+    with app.app_context():
+        # 18h-19h em São Paulo (UTC-3): dentro do horário de funcionamento
+        _gravar_atendimento(1, datetime(2024, 3, 4, 20, 50), datetime(2024, 3, 4, 21, 0), datetime(2024, 3, 4, 22, 0))
+        # 7h-8h em São Paulo: antes da abertura
+        _gravar_atendimento(2, datetime(2024, 3, 4, 9, 50), datetime(2024, 3, 4, 10, 0), datetime(2024, 3, 4, 11, 0))
+    
+    resposta = cliente_http.get('/api/relatorios/utilizacao?data_inicio=2024-03-04&data_fim=2024-03-04'
+                                '&abertura=9&fechamento=20')
+    
+    dados = resposta.get_json()
+    assert resposta.status_code == 200, dados
+    ocupados = {item['barbeiro_id']: item['minutos_ocupados'] for item in dados['utilizacao_por_barbeiro']}
+    assert ocupados == {1: 60.0}
+    assert dados['picos_por_dia'] == [{'data': '2024-03-04', 'barbeiros_simultaneos': 1, 'pico_em': '07:00'}]